@@ -0,0 +1,167 @@
+# Typed AST built by the Parser and walked by the code generator and optimization passes.
+# Every node uses __slots__ so large programs stay compact. Statements remember the
+# 1-based source line they start on.
+
+
+class Node:
+    __slots__ = ()
+
+
+# program ::= {statement}
+class Program(Node):
+    __slots__ = ("body", "arrays", "types", "temps", "parallel")
+
+    def __init__(self, body, arrays=None):
+        self.body = body  # list of statements
+        self.arrays = arrays if arrays is not None else {}  # array of a DIM -> its size
+        self.types = None  # infer.Types once type inference ran, otherwise all vars are floats
+        self.temps = {}  # var made by a pass (see loops.py) -> its C type
+        self.parallel = {}  # id(For) -> clauses of its OpenMP pragma (see parallel.py)
+
+
+# Statements
+# --------------------------------------
+
+
+# LET name = value, or LET name(index) = value for an element of an array
+class Let(Node):
+    __slots__ = ("name", "value", "line", "index")
+
+    def __init__(self, name, value, line=None, index=None):
+        self.name = name
+        self.value = value
+        self.line = line
+        self.index = index  # expression, None when name is a var
+
+
+class Print(Node):
+    __slots__ = ("value", "line")
+
+    def __init__(self, value, line=None):
+        self.value = value  # str for a string literal, otherwise an expression
+        self.line = line
+
+
+class If(Node):
+    __slots__ = ("condition", "body", "line")
+
+    def __init__(self, condition, body, line=None):
+        self.condition = condition
+        self.body = body
+        self.line = line
+
+
+class While(Node):
+    __slots__ = ("condition", "body", "line")
+
+    def __init__(self, condition, body, line=None):
+        self.condition = condition
+        self.body = body
+        self.line = line
+
+
+# FOR (LET name = start; condition; stepName = step)
+class For(Node):
+    __slots__ = ("name", "start", "condition", "stepName", "step", "body", "line")
+
+    def __init__(self, name, start, condition, stepName, step, body, line=None):
+        self.name = name
+        self.start = start
+        self.condition = condition
+        self.stepName = stepName
+        self.step = step
+        self.body = body
+        self.line = line
+
+
+class Label(Node):
+    __slots__ = ("name", "line")
+
+    def __init__(self, name, line=None):
+        self.name = name
+        self.line = line
+
+
+class Goto(Node):
+    __slots__ = ("name", "line")
+
+    def __init__(self, name, line=None):
+        self.name = name
+        self.line = line
+
+
+# INPUT name, or INPUT name(index)
+class Input(Node):
+    __slots__ = ("name", "line", "index")
+
+    def __init__(self, name, line=None, index=None):
+        self.name = name
+        self.line = line
+        self.index = index
+
+
+# DIM name(size): the array exists in the whole program, with every element at 0, so the
+# statement itself does nothing (see Program.arrays)
+class Dim(Node):
+    __slots__ = ("name", "size", "line")
+
+    def __init__(self, name, size, line=None):
+        self.name = name
+        self.size = size
+        self.line = line
+
+
+# Expressions
+# --------------------------------------
+
+
+# Arithmetic (+ - * /) and comparison (== != < <= > >=) operators
+class BinOp(Node):
+    __slots__ = ("left", "op", "right")
+
+    def __init__(self, left, op, right):
+        self.left = left
+        self.op = op
+        self.right = right
+
+
+class Unary(Node):
+    __slots__ = ("op", "operand")
+
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+
+
+class Number(Node):
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text  # Kept as written, so "1.0" stays a double and "1" an int in C
+
+
+class Ident(Node):
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+# name(index), an element of an array declared by DIM. Indexes start at 0.
+class Index(Node):
+    __slots__ = ("name", "index")
+
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+
+
+# Parenthesized expression, kept so the generated C matches the source
+class Group(Node):
+    __slots__ = ("expr",)
+
+    def __init__(self, expr):
+        self.expr = expr
+
+
+COMPARISON_OPS = ("==", "!=", "<", "<=", ">", ">=")
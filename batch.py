@@ -0,0 +1,161 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from compiler import compileFile
+from errors import CompileError
+
+# Batch mode compiles many .yolo files, each into its own .c file, on a pool of worker
+# processes. A file that fails to compile is reported and the others carry on.
+
+
+# Outcome of compiling one file
+class BatchResult:
+    __slots__ = ("source", "output", "error", "messages", "size", "cached", "seconds")
+
+    def __init__(self, source, output, error, messages, size, cached, seconds):
+        self.source = source
+        self.output = output
+        self.error = error  # None on success, otherwise the compiler's error message
+        self.messages = messages  # what the passes reported, e.g. removed dead code
+        self.size = size  # chars of source, 0 if it could not be read
+        self.cached = cached  # the C code came from the compile cache
+        self.seconds = seconds
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# Expand the inputs into (source path, path relative to its input) pairs. Directories are
+# searched recursively for .yolo files, a manifest lists one path per line (relative to
+# the manifest, blank lines and # comments are skipped).
+def collectSources(inputs, manifest=None):
+    paths = list(inputs)
+    if manifest is not None:
+        base = os.path.dirname(manifest)
+        with open(manifest, "r") as manifestFile:
+            for line in manifestFile:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    paths.append(os.path.join(base, line))
+
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for dirPath, dirNames, fileNames in os.walk(path):
+                for fileName in fileNames:
+                    if fileName.endswith(".yolo"):
+                        source = os.path.join(dirPath, fileName)
+                        found.append((source, os.path.relpath(source, path)))
+            sources.extend(sorted(found))
+        else:
+            sources.append((path, os.path.basename(path)))
+    return sources
+
+
+# Where the C code of a source goes: next to it, or under outDir keeping the layout of
+# its input directory
+def outputPath(source, relative, outDir=None):
+    path = source if outDir is None else os.path.join(outDir, relative)
+    if path.endswith(".yolo"):
+        path = path[: -len(".yolo")]
+    return path + ".c"
+
+
+# Compile one (source, output, options, cache) job. Runs in a worker process, so every
+# failure has to come back as a result.
+def compileJob(job):
+    source, output, options, cache = job
+    messages = []
+    start = time.perf_counter()
+    try:
+        parent = os.path.dirname(output)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        size, cached = compileFile(source, output, options, messages, cache)
+        error = None
+    except CompileError as e:
+        size, cached = 0, False
+        error = str(e)
+    except Exception as e:
+        # Unreadable file, or a bug in a pass: this file fails, the batch goes on
+        size, cached = 0, False
+        error = type(e).__name__ + ": " + str(e)
+    seconds = time.perf_counter() - start
+    return BatchResult(source, output, error, messages, size, cached, seconds)
+
+
+# Failed result of a source whose C code would overwrite that of another source
+def clashResult(source, output):
+    error = "another input also compiles to " + output
+    return BatchResult(source, output, error, [], 0, False, 0.0)
+
+
+# Compile the sources on `workers` processes (one per CPU by default, 1 compiles in this
+# process) and yield the results in the order of the sources. Sources that would write
+# the same .c file all fail instead of racing on it.
+def compileBatch(sources, options, outDir=None, workers=None, cache=None):
+    jobs = [
+        (source, outputPath(source, relative, outDir), options, cache)
+        for source, relative in sources
+    ]
+    counts = {}
+    for job in jobs:
+        key = os.path.normcase(os.path.abspath(job[1]))
+        counts[key] = counts.get(key, 0) + 1
+    clashes = [counts[os.path.normcase(os.path.abspath(job[1]))] > 1 for job in jobs]
+    runnable = [job for job, clash in zip(jobs, clashes) if not clash]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(runnable) < 2:
+        results = map(compileJob, runnable)
+        for job, clash in zip(jobs, clashes):
+            yield clashResult(job[0], job[1]) if clash else next(results)
+        return
+    # Hand out jobs in chunks to save round trips, small enough to keep every worker busy
+    chunkSize = max(1, len(runnable) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(compileJob, runnable, chunksize=chunkSize)
+        for job, clash in zip(jobs, clashes):
+            yield clashResult(job[0], job[1]) if clash else next(results)
+
+
+# Compile and print one line per file and a summary, return the number of failures.
+# Hits and misses are counted here, the workers only have copies of the cache.
+def runBatch(sources, options, outDir=None, workers=None, cache=None, out=sys.stdout):
+    start = time.perf_counter()
+    failed = 0
+    size = 0
+    count = 0
+    hits = 0
+    for result in compileBatch(sources, options, outDir, workers, cache):
+        count += 1
+        size += result.size
+        if result.ok:
+            hits += result.cached
+            status = "cached " if result.cached else "ok     "
+            print(status + result.source + " -> " + result.output, file=out)
+        else:
+            failed += 1
+            print("FAILED " + result.source + ": " + result.error, file=out)
+        for message in result.messages:
+            print("       " + message, file=out)
+    seconds = time.perf_counter() - start
+    print(
+        "{} compiled, {} failed in {:.2f}s ({:.1f} files/s, {:.0f} KB/s of source)".format(
+            count - failed,
+            failed,
+            seconds,
+            count / seconds if seconds else 0.0,
+            size / 1024 / seconds if seconds else 0.0,
+        ),
+        file=out,
+    )
+    if cache is not None:
+        cache.saveStats({".c": hits}, {".c": count - failed - hits})
+        cache.evict()
+        print("{} of {} from the cache".format(hits, count), file=out)
+    return failed
@@ -0,0 +1,91 @@
+# Throughput of compileSource, compiling thousands of small programs in one process, on
+# one thread and on several threads at once. One program in ten is invalid and raises a
+# CompileError. Every thread count must give each program the same C, or the same error,
+# as compiling them one by one.
+# Usage: python -m benchmarks.api [programs] [max threads, default 8 or one per CPU]
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.generators import letChain, nested, hugeExpressions, labels
+from compiler import Options, compileSource
+from errors import CompileError
+
+# name -> options
+OPTIONS = {
+    "default": Options(),
+    "fast lexer": Options("fast"),
+    "all passes": Options("fast", optimize=True, dce=True, inferTypes=True, loops=True),
+}
+
+
+# count small programs of 10 to 30 lines, every tenth with an error
+def smallPrograms(count):
+    programs = []
+    for i in range(count):
+        lines = 10 + i % 21
+        kind = i % 4
+        if kind == 0:
+            source = letChain(lines, seed=i)
+        elif kind == 1:
+            source = nested(lines, depth=4, seed=i)
+        elif kind == 2:
+            source = hugeExpressions(lines // 2, terms=8, seed=i)
+        else:
+            source = labels(lines, seed=i)
+        if i % 10 == 9:
+            source += "PRINT undeclared\n" if i % 20 == 9 else "LET x = 1.\n"
+        programs.append(source)
+    return programs
+
+
+# C of a program, or its error message
+def compileOne(source, options) -> str:
+    try:
+        return compileSource(source, options).code
+    except CompileError as error:
+        return "error: " + str(error)
+
+
+# (compiles per second, outputs) of compiling the programs on `threads` threads
+def measure(programs, options, threads):
+    start = time.perf_counter()
+    if threads == 1:
+        outputs = [compileOne(source, options) for source in programs]
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            outputs = list(pool.map(compileOne, programs, [options] * len(programs)))
+    return len(programs) / (time.perf_counter() - start), outputs
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    maxThreads = int(sys.argv[2]) if len(sys.argv) > 2 else max(8, os.cpu_count() or 1)
+    programs = smallPrograms(count)
+    threadCounts = [1]
+    while threadCounts[-1] * 2 <= maxThreads:
+        threadCounts.append(threadCounts[-1] * 2)
+    print(
+        "%d programs, %.0f lines on average, %d invalid"
+        % (
+            count,
+            sum(source.count("\n") for source in programs) / count,
+            sum(1 for i in range(count) if i % 10 == 9),
+        )
+    )
+    header = "%-12s" % "options"
+    for threads in threadCounts:
+        header += " %12s" % ("%d thread%s/s" % (threads, "" if threads == 1 else "s"))
+    print(header + " %10s" % "us/compile")
+    for name, options in OPTIONS.items():
+        line = "%-12s" % name
+        expected = None
+        for threads in threadCounts:
+            rate, outputs = measure(programs, options, threads)
+            if expected is None:
+                expected = outputs
+                single = rate
+            elif outputs != expected:
+                sys.exit("%s on %d threads gave other results" % (name, threads))
+            line += " %12.0f" % rate
+        print(line + " %10.0f" % (1e6 / single))
@@ -0,0 +1,89 @@
+# Compare a program over n numbers written with one var per number, the only way before
+# DIM, with the same program over a DIM array: time to compile it to C, size of the C,
+# time cc -O2 takes to build it, and the best of 3 runs. Both must print the same.
+# Usage: python -m benchmarks.arrays [size] [repeats]
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from compiler import Options, parseProgram, runPasses
+from emit import Emitter
+from codegen import CGenerator
+
+
+# Fill n numbers from the repeat counter r, then add them up, repeats times
+def unrolled(size, repeats):
+    lines = ["LET total = 0"]
+    lines.append("FOR (LET r = 0; r < %d; r = r + 1) REPEAT" % repeats)
+    for k in range(size):
+        lines.append("    LET v%d = r + %d * 3" % (k, k))
+    for k in range(size):
+        lines.append("    LET total = total + v%d" % k)
+    lines += ["ENDFOR", "PRINT total"]
+    return "\n".join(lines) + "\n"
+
+
+def dimmed(size, repeats):
+    return """DIM v({n})
+LET total = 0
+FOR (LET r = 0; r < {repeats}; r = r + 1) REPEAT
+    FOR (LET k = 0; k < {n}; k = k + 1) REPEAT
+        LET v(k) = r + k * 3
+    ENDFOR
+    FOR (LET k = 0; k < {n}; k = k + 1) REPEAT
+        LET total = total + v(k)
+    ENDFOR
+ENDFOR
+PRINT total
+""".format(
+        n=size, repeats=repeats
+    )
+
+
+def build(source, directory, name):
+    cPath = os.path.join(directory, name + ".c")
+    exePath = os.path.join(directory, name)
+    start = time.perf_counter()
+    options = Options(inferTypes=True)
+    program = runPasses(parseProgram(source, options), options)
+    emitter = Emitter(cPath)
+    CGenerator(emitter).program(program)
+    emitter.writeFile()
+    emitter.close()
+    compileSeconds = time.perf_counter() - start
+    start = time.perf_counter()
+    subprocess.run(["cc", "-O2", "-o", exePath, cPath], check=True)
+    ccSeconds = time.perf_counter() - start
+    return exePath, compileSeconds, os.path.getsize(cPath), ccSeconds
+
+
+def timeRun(exePath):
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        result = subprocess.run([exePath], capture_output=True, text=True, check=True)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result.stdout
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    print(
+        "%-9s %10s %10s %10s %9s" % ("program", "yolo", "C bytes", "cc -O2", "run")
+    )
+    outputs = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, write in (("unrolled", unrolled), ("DIM", dimmed)):
+            source = write(size, repeats)
+            exePath, compileSeconds, cBytes, ccSeconds = build(source, directory, name)
+            runSeconds, output = timeRun(exePath)
+            outputs.append(output)
+            print(
+                "%-9s %9.3fs %10d %9.3fs %8.3fs"
+                % (name, compileSeconds, cBytes, ccSeconds, runSeconds)
+            )
+    if outputs[0] != outputs[1]:
+        print("OUTPUT DIFFERS")
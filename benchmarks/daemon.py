@@ -0,0 +1,127 @@
+# Time compiling the same program again and again: cold, starting `python main.py` for
+# each compile, and warm, through a compiler daemon (daemon.py) started for the run,
+# from a new `python client.py` each time and from requests on an open connection. Also
+# times requests sent by several threads at once. Every way must give the same C.
+# Usage: python -m benchmarks.daemon [repeats] [threads]
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from benchmarks.generators import letChain, nested
+from client import DaemonClient
+
+PACKAGE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> program
+PROGRAMS = {
+    "hello": 'PRINT "hello"\n',
+    "1K lines": nested(1000),
+    "10K lines": letChain(10000),
+}
+
+
+# Median seconds of a command run repeats times, and its last stdout
+def timeCommand(command, repeats, cwd):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = subprocess.run(
+            command, cwd=cwd, capture_output=True, text=True, check=True
+        )
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result.stdout
+
+
+def timeRequests(client, source, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = client.compile(source)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), response["c"]
+
+
+# Compiles per second with threads clients sending repeats requests each
+def throughput(socketPath, source, threads, repeats):
+    def work():
+        client = DaemonClient(socketPath)
+        for _ in range(repeats):
+            client.compile(source)
+        client.close()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * repeats / (time.perf_counter() - start)
+
+
+def waitForSocket(path, daemon) -> None:
+    while not os.path.exists(path):
+        if daemon.poll() is not None:
+            sys.exit("the daemon did not start")
+        time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    python = sys.executable
+    with tempfile.TemporaryDirectory() as directory:
+        socketPath = os.path.join(directory, "yolo.sock")
+        daemon = subprocess.Popen(
+            [python, os.path.join(PACKAGE, "daemon.py"), "--socket", socketPath]
+        )
+        try:
+            waitForSocket(socketPath, daemon)
+            client = DaemonClient(socketPath)
+            columns = ("program", "main.py", "client.py", "request", "speedup")
+            print("%-10s %10s %10s %10s %8s %14s" % (columns + ("compiles/s",)))
+            for name, source in PROGRAMS.items():
+                sourcePath = os.path.join(directory, "program.yolo")
+                with open(sourcePath, "w") as sourceFile:
+                    sourceFile.write(source)
+                # main.py writes out.c in its working directory and echoes it
+                mainPy = os.path.join(PACKAGE, "main.py")
+                cold, _ = timeCommand(
+                    [python, mainPy, sourcePath, "--no-cache"], repeats, directory
+                )
+                with open(os.path.join(directory, "out.c")) as outFile:
+                    expected = outFile.read()
+                thin, thinC = timeCommand(
+                    [
+                        python,
+                        os.path.join(PACKAGE, "client.py"),
+                        sourcePath,
+                        "--socket",
+                        socketPath,
+                    ],
+                    repeats,
+                    directory,
+                )
+                warm, warmC = timeRequests(client, source, repeats)
+                rate = throughput(socketPath, source, threads, repeats)
+                print(
+                    "%-10s %9.1fms %9.1fms %9.1fms %7.0fx %14.0f%s"
+                    % (
+                        name,
+                        cold * 1000,
+                        thin * 1000,
+                        warm * 1000,
+                        cold / warm,
+                        rate,
+                        "" if expected == thinC == warmC else "  C DIFFERS",
+                    )
+                )
+            client.request({"command": "shutdown"})
+            client.close()
+            daemon.wait(10)
+        finally:
+            if daemon.poll() is None:
+                daemon.terminate()
+                daemon.wait()
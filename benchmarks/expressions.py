@@ -0,0 +1,78 @@
+# Time parsing expression heavy programs with the recursive descent Parser and with
+# PrecedenceParser: long flat expressions, parens nested as deep as the recursive parser
+# allows, and parens nested far deeper, which only PrecedenceParser parses. The tokens
+# are made up front (TokenStream), so only the parsers are timed. Both must give the
+# same C.
+# Usage: python -m benchmarks.expressions [lines] [repeats]
+import statistics
+import sys
+import time
+from benchmarks.generators import hugeExpressions
+from codegen import CGenerator
+from emit import Emitter
+from parse import Parser
+from precedence_parse import PrecedenceParser
+from token_stream import TokenStream
+
+
+# `lines` LETs of parens nested `depth` deep around mixed operators
+def nestedParens(lines, depth):
+    expression = "a"
+    for level in range(depth):
+        expression = "(" + expression + " " + "+-*/"[level % 4] + " 2)"
+    return "LET a = 1\n" + ("LET a = " + expression + "\n") * lines
+
+
+# (median seconds, C) of parsing source repeats times, None if the parser can't
+def parse(parserClass, source, repeats):
+    times = []
+    for _ in range(repeats):
+        tokens = TokenStream(source)
+        start = time.perf_counter()
+        try:
+            program = parserClass(tokens).program()
+        except RecursionError:
+            return None, None
+        times.append(time.perf_counter() - start)
+    emitter = Emitter()
+    CGenerator(emitter).program(program)
+    code = emitter.header + emitter.code
+    emitter.close()
+    return statistics.median(times), code
+
+
+if __name__ == "__main__":
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    programs = {
+        "24 terms": hugeExpressions(lines),
+        "240 terms": hugeExpressions(lines // 10, terms=240),
+        "depth 50": nestedParens(lines // 10, 50),
+        "depth 200": nestedParens(lines // 40, 200),
+        "depth 20000": nestedParens(1, 20000),
+    }
+    print(
+        "%-12s %10s %12s %12s %8s"
+        % ("program", "tokens", "recursive", "precedence", "speedup")
+    )
+    for name, source in programs.items():
+        tokens = len(TokenStream(source))
+        recursive, recursiveC = parse(Parser, source, repeats)
+        precedence, precedenceC = parse(PrecedenceParser, source, repeats)
+        if recursive is None:
+            print(
+                "%-12s %10d %12s %11.1fms %8s"
+                % (name, tokens, "too deep", precedence * 1000, "")
+            )
+            continue
+        print(
+            "%-12s %10d %11.1fms %11.1fms %7.2fx%s"
+            % (
+                name,
+                tokens,
+                recursive * 1000,
+                precedence * 1000,
+                recursive / precedence,
+                "" if recursiveC == precedenceC else "  C DIFFERS",
+            )
+        )
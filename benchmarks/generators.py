@@ -0,0 +1,75 @@
+# Generators of large, valid yolo programs with a given number of lines, each stressing a
+# different part of the compiler
+import random
+
+
+# Straight-line LETs, each reading the previous vars: symbol lookups and declarations
+def letChain(lines, seed=0):
+    rng = random.Random(seed)
+    out = ["LET v0 = 1"]
+    for i in range(1, lines):
+        a = rng.randrange(i)
+        b = rng.randrange(i)
+        out.append("LET v%d = v%d + v%d * %d - %d.5" % (i, a, b, rng.randint(1, 9), i % 7))
+    return "\n".join(out) + "\n"
+
+
+# IF/WHILE/FOR nested `depth` levels deep, repeated until the program is long enough
+def nested(lines, depth=16, seed=0):
+    rng = random.Random(seed)
+    out = ["LET x = 0"]
+    while len(out) < lines:
+        closers = []
+        for level in range(depth):
+            kind = rng.randrange(3)
+            if kind == 0:
+                out.append("IF (x < %d) THEN" % (level + 100))
+                closers.append("ENDIF")
+            elif kind == 1:
+                out.append("WHILE (x > %d) REPEAT" % (level + 1000))
+                closers.append("ENDWHILE")
+            else:
+                name = "i%d" % level
+                out.append("FOR (LET %s = 0; %s < 2; %s = %s + 1) REPEAT" % ((name,) * 4))
+                closers.append("ENDFOR")
+            out.append("LET x = x + %d" % level)
+        out.extend(reversed(closers))
+    return "\n".join(out) + "\n"
+
+
+# Lines holding long expressions of `terms` operands with parenthesized groups
+def hugeExpressions(lines, terms=24, seed=0):
+    rng = random.Random(seed)
+    out = ["LET a = 1", "LET b = 2"]
+    while len(out) < lines:
+        parts = []
+        for i in range(terms):
+            operand = rng.choice(("a", "b", str(rng.randint(1, 99)), "%d.25" % i))
+            if i % 10 == 9:
+                operand = "(" + operand + " * a - b)"
+            parts.append(operand)
+            parts.append(rng.choice("+-*/"))
+        out.append("LET a = " + " ".join(parts[:-1]))
+    return "\n".join(out) + "\n"
+
+
+# Many LABELs, each with GOTOs to earlier and later labels
+def labels(lines, seed=0):
+    rng = random.Random(seed)
+    count = max(1, lines // 5)
+    out = ["LET n = 0"]
+    for i in range(count):
+        out.append("LABEL l%d" % i)
+        out.append("LET n = n + 1")
+        out.append("IF (n > %d) THEN" % (i + 5))
+        out.append("GOTO l%d" % rng.randrange(count))
+        out.append("ENDIF")
+    return "\n".join(out) + "\n"
+
+
+GENERATORS = {
+    "let-chain": letChain,
+    "nested": nested,
+    "expressions": hugeExpressions,
+    "labels": labels,
+}
@@ -0,0 +1,112 @@
+# Time INPUT on large numeric inputs: the generated block reader (runtime.INPUT) against
+# the scanf("%f") + scanf("%*s") code INPUT used to be, swapped into the same generated C.
+# Both builds must print the same thing.
+# Usage: python -m benchmarks.input [values]
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from compiler import Options, parseProgram, runPasses, generate
+from emit import Emitter
+
+# Reads until the input runs out (INPUT then keeps the value, so the sentinel stays)
+PROGRAM = """LET count = 0
+LET total = 0
+LET x = 0
+WHILE (x != 123456789) REPEAT
+    LET x = 123456789
+    INPUT x
+    IF (x != 123456789) THEN
+        LET count = count + 1
+        LET total = total + x
+    ENDIF
+ENDWHILE
+PRINT count
+PRINT total
+"""
+
+# name -> one value of the input
+INPUTS = {
+    "integers": lambda rand: str(rand.randint(0, 99999)),
+    "decimals": lambda rand: "%.3f" % rand.uniform(-1000, 1000),
+    "scientific": lambda rand: "%.6e" % rand.uniform(-1e6, 1e6),
+    "mixed": lambda rand: rand.choice(
+        ["%d" % rand.randint(-999, 999), "%.2f" % rand.uniform(0, 100), "n/a", "1e-3"]
+    ),
+}
+
+INPUT_CALL = re.compile(r"yolo_input_(float|double)\(&(\w+)\);")
+
+
+# The C INPUT was compiled to before the block reader
+def scanfInput(match):
+    format = "%f" if match.group(1) == "float" else "%lf"
+    name = match.group(2)
+    return (
+        "yolo_flush();\n"
+        'if(0==scanf("' + format + '", &' + name + ")) {\n"
+        + name
+        + " = 0;\n"
+        'scanf("%*s");\n'
+        "}"
+    )
+
+
+def build(code, directory, name):
+    cPath = os.path.join(directory, name + ".c")
+    exePath = os.path.join(directory, name)
+    with open(cPath, "w") as cFile:
+        cFile.write(code)
+    subprocess.run(["cc", "-O2", "-o", exePath, cPath], check=True)
+    return exePath
+
+
+def timeRun(exePath, inputPath):
+    with open(inputPath, "rb") as inputFile:
+        start = time.perf_counter()
+        result = subprocess.run([exePath], stdin=inputFile, capture_output=True, check=True)
+    return time.perf_counter() - start, result.stdout
+
+
+if __name__ == "__main__":
+    values = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    rand = random.Random(1)
+    print(
+        "%-12s %-6s %9s %10s %10s %8s"
+        % ("input", "types", "MB", "scanf", "block", "speedup")
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        builds = {}
+        for typeName, options in (("float", Options()), ("typed", Options(inferTypes=True))):
+            program = runPasses(parseProgram(PROGRAM, options), options)
+            emitter = Emitter()
+            generate(program, emitter)
+            code = emitter.header + emitter.code
+            emitter.close()
+            builds[typeName] = (
+                build(INPUT_CALL.sub(scanfInput, code), directory, typeName + "_scanf"),
+                build(code, directory, typeName + "_block"),
+            )
+        for inputName, value in INPUTS.items():
+            inputPath = os.path.join(directory, inputName + ".txt")
+            with open(inputPath, "w") as inputFile:
+                inputFile.write("\n".join(value(rand) for _ in range(values)) + "\n")
+            size = os.path.getsize(inputPath) / 1e6
+            for typeName, (scanfPath, blockPath) in builds.items():
+                scanfSeconds, scanfOutput = timeRun(scanfPath, inputPath)
+                blockSeconds, blockOutput = timeRun(blockPath, inputPath)
+                print(
+                    "%-12s %-6s %9.1f %9.3fs %9.3fs %7.1fx%s"
+                    % (
+                        inputName,
+                        typeName,
+                        size,
+                        scanfSeconds,
+                        blockSeconds,
+                        scanfSeconds / blockSeconds,
+                        "" if scanfOutput == blockOutput else "  OUTPUT DIFFERS",
+                    )
+                )
@@ -0,0 +1,66 @@
+# Compare tokens/second of Lexer, FastLexer and TokenStream on a large generated program,
+# and the memory needed to hold every token as Token objects vs a TokenStream.
+# Usage: python -m benchmarks.lexer [lines]
+import sys
+import time
+import tracemalloc
+from lexer import Lexer
+from fast_lexer import FastLexer
+from token_stream import TokenStream
+from token_1 import TokenType
+
+SAMPLE = """LET total = 0  # running total
+FOR (LET i = 0; i < 100; i = i + 1) REPEAT
+    LET total = total + (i * 2.5 - 1) / 3
+    IF (total >= 1000) THEN
+        PRINT "big number"
+    ENDIF
+ENDFOR
+WHILE (total != 0) REPEAT
+    LET total = total - 1
+ENDWHILE
+INPUT value
+PRINT value
+"""
+
+
+def countTokens(lexer) -> int:
+    count = 0
+    token = lexer.getToken()
+    while token.kind != TokenType.EOF:
+        count += 1
+        token = lexer.getToken()
+    return count
+
+
+def bench(lexerClass, source):
+    start = time.perf_counter()
+    count = countTokens(lexerClass(source))
+    return count, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    sampleLines = SAMPLE.count("\n")
+    source = SAMPLE * (lines // sampleLines)
+    print("%d lines, %d chars" % (source.count("\n"), len(source)))
+    for lexerClass in (Lexer, FastLexer, TokenStream):
+        count, seconds = bench(lexerClass, source)
+        print(
+            "%-12s %9d tokens %7.3fs %12.0f tokens/s"
+            % (lexerClass.__name__, count, seconds, count / seconds)
+        )
+
+    tracemalloc.start()
+    lexer = FastLexer(source)
+    tokens = []
+    token = lexer.getToken()
+    while token.kind != TokenType.EOF:
+        tokens.append(token)
+        token = lexer.getToken()
+    print("Token objects %8.1f MB" % (tracemalloc.get_traced_memory()[0] / 1e6))
+    del tokens, lexer, token
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    stream = TokenStream(source)
+    print("TokenStream   %8.1f MB" % ((tracemalloc.get_traced_memory()[0] - before) / 1e6))
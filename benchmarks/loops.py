@@ -0,0 +1,119 @@
+# Time loop heavy programs with and without the loop optimizations (loops.py), in the
+# bytecode VM and built with cc at -O0 and -O2, and check every build prints the same.
+# The C programs run 100 times longer loops than the VM, and the best of 3 runs counts.
+# Usage: python -m benchmarks.loops [scale]
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from compiler import Options, parseProgram, runPasses
+from emit import Emitter
+from codegen import CGenerator
+from vm import compileBytecode, VM
+
+# name -> program, {n} is replaced by the scale
+PROGRAMS = {
+    "invariants": """LET width = 300
+LET height = 200
+LET scale = 1.5
+LET total = 0
+FOR (LET y = 0; y < {n} / width; y = y + 1) REPEAT
+    FOR (LET x = 0; x < width; x = x + 1) REPEAT
+        LET total = total + x * scale * (width + height) / (height * height + 1)
+    ENDFOR
+ENDFOR
+PRINT total
+""",
+    "matrix index": """LET rows = 100
+LET cols = 250
+LET total = 0
+FOR (LET r = 0; r < {n} / cols; r = r + 1) REPEAT
+    FOR (LET c = 0; c < cols; c = c + 1) REPEAT
+        LET total = total + r * cols + c * 3 + (r / 7) * rows
+    ENDFOR
+ENDFOR
+PRINT total
+""",
+    "while stride": """LET stride = 9
+LET total = 0
+FOR (LET r = 0; r < {n} / 1000; r = r + 1) REPEAT
+    LET k = 0
+    WHILE (k < 1000) REPEAT
+        LET total = total + k * stride + k * 4 + stride * stride
+        IF (k * stride > 4000) THEN
+            LET total = total - k * 4
+        ENDIF
+        LET k = k + 1
+    ENDWHILE
+ENDFOR
+PRINT total
+""",
+}
+
+
+def timeVM(source, options):
+    program = runPasses(parseProgram(source, options), options)
+    bytecode = compileBytecode(program)
+    output = io.StringIO()
+    start = time.perf_counter()
+    VM(bytecode, io.StringIO(""), output).run()
+    return time.perf_counter() - start, output.getvalue()
+
+
+def timeC(source, options, directory, level):
+    cPath = os.path.join(directory, "bench.c")
+    exePath = os.path.join(directory, "bench")
+    program = runPasses(parseProgram(source, options), options)
+    emitter = Emitter(cPath)
+    CGenerator(emitter).program(program)
+    emitter.writeFile()
+    emitter.close()
+    subprocess.run(["cc", level, "-o", exePath, cPath], check=True)
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        result = subprocess.run([exePath], capture_output=True, text=True, check=True)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result.stdout
+
+
+if __name__ == "__main__":
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    print(
+        "%-20s %-7s %9s %9s %8s"
+        % ("program", "run", "plain", "--loops", "speedup")
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for typeName, typed in (("", False), (" typed", True)):
+            plain = Options(inferTypes=typed)
+            optimized = Options(inferTypes=typed, loops=True)
+            for name, template in PROGRAMS.items():
+                source = template.replace("{n}", str(scale))
+                cSource = template.replace("{n}", str(scale * 100))
+                runs = [("vm", lambda options: timeVM(source, options))]
+                for level in ("-O0", "-O2"):
+                    runs.append(
+                        (
+                            "cc " + level,
+                            lambda options, level=level: timeC(
+                                cSource, options, directory, level
+                            ),
+                        )
+                    )
+                for runName, timeRun in runs:
+                    plainSeconds, plainOutput = timeRun(plain)
+                    loopSeconds, loopOutput = timeRun(optimized)
+                    print(
+                        "%-20s %-7s %8.3fs %8.3fs %7.2fx%s"
+                        % (
+                            name + typeName,
+                            runName,
+                            plainSeconds,
+                            loopSeconds,
+                            plainSeconds / loopSeconds,
+                            "" if plainOutput == loopOutput else "  OUTPUT DIFFERS",
+                        )
+                    )
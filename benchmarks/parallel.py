@@ -0,0 +1,107 @@
+# Time loop heavy programs built with --parallel (parallel.py) on one thread and on every
+# CPU, against the plain sequential build, all with cc -O2 and the best of 3 runs. Each
+# build must print the same as the sequential one, sums of floats aside (reductions add
+# them up in another order).
+# Usage: python -m benchmarks.parallel [scale] [threads]
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from compiler import Options, parseProgram, runPasses, optionFlags
+from emit import Emitter
+from codegen import CGenerator
+
+# name -> program, {n} is replaced by the scale
+PROGRAMS = {
+    "sum of products": """LET total = 0
+FOR (LET i = 0; i < {n}; i = i + 1) REPEAT
+    LET x = i / 3
+    LET total = total + x * x - i
+ENDFOR
+PRINT total
+""",
+    "nested counting": """LET rows = {n} / 2000
+LET hits = 0
+FOR (LET r = 0; r < rows; r = r + 1) REPEAT
+    FOR (LET c = 0; c < 2000; c = c + 1) REPEAT
+        IF ((r * 7 + c * 13) / 11 * 11 == r * 7 + c * 13) THEN
+            LET hits = hits + 1
+        ENDIF
+    ENDFOR
+ENDFOR
+PRINT hits
+""",
+    "logistic map": """LET count = {n} / 200
+LET high = 0
+FOR (LET i = 0; i < count; i = i + 1) REPEAT
+    LET x = 0.1 + 0.8 * i / count
+    LET k = 0
+    WHILE (k < 200) REPEAT
+        LET x = 3.7 * x * (1 - x)
+        LET k = k + 1
+    ENDWHILE
+    IF (x > 0.5) THEN
+        LET high = high + 1
+    ENDIF
+ENDFOR
+PRINT high
+""",
+}
+
+
+def build(source, options, directory, name):
+    cPath = os.path.join(directory, name + ".c")
+    exePath = os.path.join(directory, name)
+    program = runPasses(parseProgram(source, options), options)
+    emitter = Emitter(cPath)
+    CGenerator(emitter).program(program)
+    emitter.writeFile()
+    emitter.close()
+    command = ["cc", "-O2", "-o", exePath, cPath] + optionFlags(options)
+    subprocess.run(command, check=True)
+    return exePath
+
+
+def timeRun(exePath, threads):
+    environment = dict(os.environ, OMP_NUM_THREADS=str(threads))
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [exePath], capture_output=True, text=True, check=True, env=environment
+        )
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result.stdout
+
+
+if __name__ == "__main__":
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 100000000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    print(
+        "%-18s %9s %9s %12s %8s"
+        % ("program", "seq", "1 thread", str(threads) + " threads", "speedup")
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for name, template in PROGRAMS.items():
+            source = template.replace("{n}", str(scale))
+            sequential = build(source, Options(inferTypes=True), directory, "seq")
+            parallel = build(
+                source, Options(inferTypes=True, parallel=True), directory, "omp"
+            )
+            seqSeconds, seqOutput = timeRun(sequential, 1)
+            oneSeconds, oneOutput = timeRun(parallel, 1)
+            manySeconds, manyOutput = timeRun(parallel, threads)
+            same = seqOutput == oneOutput == manyOutput
+            print(
+                "%-18s %8.3fs %8.3fs %11.3fs %7.2fx%s"
+                % (
+                    name,
+                    seqSeconds,
+                    oneSeconds,
+                    manySeconds,
+                    seqSeconds / manySeconds,
+                    "" if same else "  OUTPUT DIFFERS",
+                )
+            )
@@ -0,0 +1,54 @@
+# Peak memory and speed of lexing generated files of growing size: FastLexer on the text
+# read with read(), StreamLexer on the memory-mapped file (compiler.openSource). Memory
+# is what Python allocates (tracemalloc), the mapped file is page cache the kernel can
+# drop.
+# Usage: python -m benchmarks.stream [max lines]
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from benchmarks.lexer import SAMPLE, countTokens
+from compiler import Options, openSource
+from fast_lexer import FastLexer
+from stream_lexer import StreamLexer
+
+
+# (tokens, seconds, peak MB) of lexing the file at path
+def measure(path, lexer):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with openSource(path, Options(lexer)) as source:
+        lexerClass = StreamLexer if lexer == "stream" else FastLexer
+        count = countTokens(lexerClass(source))
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, seconds, peak / 1e6
+
+
+if __name__ == "__main__":
+    maxLines = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    sampleLines = SAMPLE.count("\n")
+    print("%10s %8s %22s %22s" % ("lines", "MB", "fast: peak, tokens/s", "stream"))
+    lines = 10000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "program.yolo")
+        while lines <= maxLines:
+            with open(path, "w") as sourceFile:
+                sourceFile.write(SAMPLE * (lines // sampleLines))
+            results = [measure(path, lexer) for lexer in ("fast", "stream")]
+            if results[0][0] != results[1][0]:
+                sys.exit("the lexers found different numbers of tokens")
+            print(
+                "%10d %8.1f %10.1fMB %10.0f %10.1fMB %10.0f"
+                % (
+                    lines,
+                    os.path.getsize(path) / 1e6,
+                    results[0][2],
+                    results[0][0] / results[0][1],
+                    results[1][2],
+                    results[1][0] / results[1][1],
+                )
+            )
+            lines *= 10
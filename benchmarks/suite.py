@@ -0,0 +1,206 @@
+# Compiler throughput benchmark. For every generator and size it times each phase
+# separately and measures the peak memory each phase allocates:
+#   lex    tokenize the source (TokenStream does it up front, the others are drained)
+#   parse  build the AST from an already lexed TokenStream
+#   emit   generate the C code into an Emitter and write it out
+# Results are saved as JSON so runs on two commits can be compared.
+# Usage: python -m benchmarks.suite [--sizes 1000,1000000] [--generators nested,labels]
+#                                   [--out results.json] [--compare old.json]
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from compiler import LEXERS
+from token_1 import TokenType
+from token_stream import TokenStream
+from parse import Parser
+from emit import Emitter
+from codegen import CGenerator
+from benchmarks.generators import GENERATORS
+
+PHASES = ("lex", "parse", "emit")
+DEFAULT_SIZES = "1000,10000,100000"
+
+
+def lexPhase(source, lexerClass):
+    lexer = lexerClass(source)
+    if lexerClass is not TokenStream:
+        token = lexer.getToken()
+        while token.kind != TokenType.EOF:
+            token = lexer.getToken()
+    return lexer
+
+
+def emitPhase(program):
+    emitter = Emitter()
+    CGenerator(emitter).program(program)
+    sink = io.StringIO()
+    emitter.writeTo(sink)
+    emitter.close()
+    return sink
+
+
+# Run fn(*args) once and return (result, seconds, peak bytes allocated or None). The input
+# of a phase is built before it starts, so only the phase itself is measured.
+def measure(fn, args, memory):
+    if memory:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+# Measure every phase on one program. Times are the best of `repeat` runs without
+# tracemalloc, which slows allocation-heavy code down a lot, the peaks come from one more
+# traced run.
+def benchProgram(source, lexerClass, memory, repeat=1):
+    timings = {phase: float("inf") for phase in PHASES}
+    peaks = {phase: None for phase in PHASES}
+    runs = [False] * repeat + ([True] if memory else [])
+    for traced in runs:
+        measured = {}
+        _, measured["lex"], peaks["lex"] = measure(lexPhase, (source, lexerClass), traced)
+        tokens = TokenStream(source)  # Built outside the parse measurement
+        program, measured["parse"], peaks["parse"] = measure(
+            Parser(tokens).program, (), traced
+        )
+        _, measured["emit"], peaks["emit"] = measure(emitPhase, (program,), traced)
+        if not traced:
+            for phase in PHASES:
+                timings[phase] = min(timings[phase], measured[phase])
+    results = {}
+    for phase in PHASES:
+        results[phase] = {"seconds": timings[phase], "peakBytes": peaks[phase]}
+    return len(TokenStream(source)), results
+
+
+def gitCommit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return None
+    return result.stdout.strip() or None
+
+
+def key(entry):
+    return (entry["generator"], entry["lines"], entry["phase"])
+
+
+# Print new/old time and memory ratios, return the number of slowdowns over threshold
+def compare(old, new, threshold, out=sys.stdout) -> int:
+    oldEntries = {key(entry): entry for entry in old["results"]}
+    print(
+        "\nvs %s (%s): time and peak memory, new / old"
+        % (old.get("commit"), old.get("date")),
+        file=out,
+    )
+    regressions = 0
+    for entry in new["results"]:
+        previous = oldEntries.get(key(entry))
+        if previous is None:
+            continue
+        ratio = entry["seconds"] / previous["seconds"] if previous["seconds"] else 1.0
+        memory = ""
+        if entry["peakBytes"] and previous["peakBytes"]:
+            memory = "%6.2fx" % (entry["peakBytes"] / previous["peakBytes"])
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(
+            "%-12s %8d %-6s %6.2fx %7s%s"
+            % (entry["generator"], entry["lines"], entry["phase"], ratio, memory, flag),
+            file=out,
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--sizes", default=DEFAULT_SIZES, help="program sizes in lines")
+    argParser.add_argument(
+        "--generators", default=",".join(GENERATORS), help="programs to generate"
+    )
+    argParser.add_argument(
+        "--lexer", choices=LEXERS, default="array", help="lexer timed in the lex phase"
+    )
+    argParser.add_argument(
+        "--repeat", type=int, default=1, help="timed runs per phase, the best counts"
+    )
+    argParser.add_argument("--no-memory", action="store_true", help="skip tracemalloc")
+    argParser.add_argument("--out", help="write the results to this JSON file")
+    argParser.add_argument("--compare", help="JSON file of an earlier run to compare with")
+    argParser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown reported as a regression (default: 0.1)",
+    )
+    args = argParser.parse_args()
+
+    report = {
+        "commit": gitCommit(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "lexer": args.lexer,
+        "results": [],
+    }
+    print(
+        "%-12s %8s %9s %-6s %9s %12s %10s"
+        % ("generator", "lines", "tokens", "phase", "seconds", "lines/s", "peak MB")
+    )
+    for name in args.generators.split(","):
+        for lines in (int(size) for size in args.sizes.split(",")):
+            source = GENERATORS[name](lines)
+            tokenCount, results = benchProgram(
+                source, LEXERS[args.lexer], not args.no_memory, args.repeat
+            )
+            for phase in PHASES:
+                seconds = results[phase]["seconds"]
+                peak = results[phase]["peakBytes"]
+                report["results"].append(
+                    {
+                        "generator": name,
+                        "lines": lines,
+                        "tokens": tokenCount,
+                        "phase": phase,
+                        "seconds": seconds,
+                        "linesPerSecond": lines / seconds if seconds else None,
+                        "peakBytes": peak,
+                    }
+                )
+                print(
+                    "%-12s %8d %9d %-6s %9.3f %12.0f %10s"
+                    % (
+                        name,
+                        lines,
+                        tokenCount,
+                        phase,
+                        seconds,
+                        lines / seconds if seconds else 0,
+                        "-" if peak is None else "%.1f" % (peak / 1e6),
+                    )
+                )
+
+    if args.out:
+        with open(args.out, "w") as outFile:
+            json.dump(report, outFile, indent=1)
+    if args.compare:
+        with open(args.compare, "r") as oldFile:
+            regressions = compare(json.load(oldFile), report, args.threshold)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,104 @@
+# Time running programs in the bytecode VM against the C path (generate C, build it with
+# cc -O2 like build.sh, run it), and check both print the same thing.
+# Usage: python -m benchmarks.vm [scale]
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from compiler import Options, parseProgram, runPasses
+from emit import Emitter
+from codegen import CGenerator
+from vm import compileBytecode, VM
+
+# name -> program, {n} is replaced by the scale
+PROGRAMS = {
+    "hello": 'PRINT "hello"\n',
+    "fibonacci": """LET a = 0
+LET b = 1
+FOR (LET i = 0; i < {n}; i = i + 1) REPEAT
+    LET t = a + b
+    LET a = b
+    LET b = t
+ENDFOR
+PRINT a
+""",
+    "nested loops": """LET total = 0
+FOR (LET i = 0; i < {n} / 100; i = i + 1) REPEAT
+    FOR (LET j = 0; j < 100; j = j + 1) REPEAT
+        IF (j > i) THEN
+            LET total = total + (i * j) / 3.5
+        ENDIF
+    ENDFOR
+ENDFOR
+PRINT total
+""",
+    "goto loop": """LET n = 0
+LABEL top
+LET n = n + 1
+IF (n < {n}) THEN
+    GOTO top
+ENDIF
+PRINT n
+""",
+    "prints": """FOR (LET i = 0; i < {n} / 10; i = i + 1) REPEAT
+    PRINT i * 1.5
+    PRINT "line"
+ENDFOR
+""",
+}
+
+
+def timeVM(source, options):
+    start = time.perf_counter()
+    program = runPasses(parseProgram(source, options), options)
+    bytecode = compileBytecode(program)
+    compiled = time.perf_counter()
+    output = io.StringIO()
+    VM(bytecode, io.StringIO(""), output).run()
+    return compiled - start, time.perf_counter() - compiled, output.getvalue()
+
+
+def timeC(source, options, directory):
+    cPath = os.path.join(directory, "bench.c")
+    exePath = os.path.join(directory, "bench")
+    start = time.perf_counter()
+    program = runPasses(parseProgram(source, options), options)
+    emitter = Emitter(cPath)
+    CGenerator(emitter).program(program)
+    emitter.writeFile()
+    emitter.close()
+    generated = time.perf_counter()
+    subprocess.run(["cc", "-O2", "-o", exePath, cPath], check=True)
+    built = time.perf_counter()
+    result = subprocess.run([exePath], capture_output=True, text=True, check=True)
+    return generated - start, built - generated, time.perf_counter() - built, result.stdout
+
+
+if __name__ == "__main__":
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(
+        "%-20s %10s %10s %10s | %10s %10s %10s %10s"
+        % ("program", "vm compile", "vm run", "vm total", "C gen", "cc", "C run", "C total")
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for optionName, options in (("", Options()), (" typed", Options(inferTypes=True))):
+            for name, template in PROGRAMS.items():
+                source = template.replace("{n}", str(scale))
+                vmCompile, vmRun, vmOutput = timeVM(source, options)
+                cGen, cBuild, cRun, cOutput = timeC(source, options, directory)
+                print(
+                    "%-20s %9.3fs %9.3fs %9.3fs | %9.3fs %9.3fs %9.3fs %9.3fs%s"
+                    % (
+                        name + optionName,
+                        vmCompile,
+                        vmRun,
+                        vmCompile + vmRun,
+                        cGen,
+                        cBuild,
+                        cRun,
+                        cGen + cBuild + cRun,
+                        "" if vmOutput == cOutput else "  OUTPUT DIFFERS",
+                    )
+                )
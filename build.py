@@ -0,0 +1,325 @@
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from stats import CompileStats
+from compiler import (
+    LEXERS,
+    PARSERS,
+    Options,
+    parseProgram,
+    runPasses,
+    compileFile,
+    openSource,
+    exitOnError,
+    buildExecutable,
+    pipeExecutable,
+    optionFlags,
+)
+from cache import CompileCache
+
+# Build driver: compile a .yolo file to C and build it into an executable with the chosen
+# C compiler and optimization flags, optionally with profile-guided optimization (PGO).
+#
+# With --pipe the C code never touches the disk: it is streamed into the C compiler's
+# stdin. --run runs the executable right after the build.
+#
+# PGO builds an instrumented executable, runs it on training inputs to record which
+# branches and loops are hot, then rebuilds with that profile. gcc reads the profile
+# directly, clang's raw profiles are merged with llvm-profdata first.
+COMPILERS = ("cc", "gcc", "clang")
+PRESETS = {
+    "debug": ["-O0", "-g"],
+    "release": ["-O2"],
+    "native": ["-O3", "-march=native", "-flto"],
+}
+
+
+# "gcc" or "clang", cc is either one depending on the system
+def compilerFamily(command) -> str:
+    result = subprocess.run(
+        [command, "--version"], capture_output=True, text=True, check=True
+    )
+    return "clang" if "clang" in result.stdout else "gcc"
+
+
+# C compiler flags for the options, explicit flags come after the preset so they win
+def compilerFlags(preset=None, level=None, native=False, lto=False):
+    flags = list(PRESETS[preset]) if preset is not None else []
+    if level is not None:
+        flags.append("-O" + level)
+    if native:
+        flags.append("-march=native")
+    if lto:
+        flags.append("-flto")
+    if not any(flag.startswith("-O") for flag in flags):
+        flags.append("-O2")
+    return flags
+
+
+def runCommand(command) -> None:
+    try:
+        subprocess.run(command, check=True)
+    except FileNotFoundError:
+        sys.exit("Build error: " + command[0] + " not found")
+    except subprocess.CalledProcessError:
+        sys.exit("Build error: " + " ".join(command) + " failed")
+
+
+# Run an executable once per training input (empty input if there are none) and return
+# the total wall time
+def timeRun(exePath, inputs, timeout) -> float:
+    start = time.perf_counter()
+    for inputPath in inputs or [None]:
+        stdin = open(inputPath, "rb") if inputPath is not None else subprocess.DEVNULL
+        try:
+            subprocess.run(
+                [exePath],
+                stdin=stdin,
+                stdout=subprocess.DEVNULL,
+                timeout=timeout,
+                check=True,
+            )
+        except subprocess.TimeoutExpired:
+            sys.exit("Build error: " + exePath + " ran over " + str(timeout) + "s")
+        except subprocess.CalledProcessError as e:
+            sys.exit("Build error: " + exePath + " exited with " + str(e.returncode))
+        finally:
+            if inputPath is not None:
+                stdin.close()
+    return time.perf_counter() - start
+
+
+# Median of a few timed runs, the first one also warms the page cache
+def medianRun(exePath, inputs, timeout, repeat) -> float:
+    return statistics.median(timeRun(exePath, inputs, timeout) for _ in range(repeat))
+
+
+# Build cPath into exePath with PGO. Returns (time without PGO, time with PGO).
+def buildWithProfile(cPath, exePath, command, flags, inputs, timeout, repeat):
+    family = compilerFamily(command)
+    with tempfile.TemporaryDirectory() as directory:
+        # gcc names profile files after the output, every build here uses the same one
+        work = os.path.join(directory, "program")
+        profileDir = os.path.join(directory, "profile")
+
+        runCommand([command, *flags, "-o", work, cPath])
+        baseline = medianRun(work, inputs, timeout, repeat)
+
+        if family == "gcc":
+            generate = ["-fprofile-generate=" + profileDir, "-fprofile-update=single"]
+            use = [
+                "-fprofile-use=" + profileDir,
+                "-fprofile-correction",
+                "-Wno-missing-profile",
+            ]
+        else:
+            merged = os.path.join(directory, "merged.profdata")
+            generate = [
+                "-fprofile-instr-generate=" + os.path.join(profileDir, "%p.profraw")
+            ]
+            use = ["-fprofile-instr-use=" + merged]
+        runCommand([command, *flags, *generate, "-o", work, cPath])
+        timeRun(work, inputs, timeout)  # Training run, writes the profile
+        if not os.path.isdir(profileDir) or not os.listdir(profileDir):
+            sys.exit("Build error: the training run wrote no profile")
+        if family == "clang":
+            raw = [os.path.join(profileDir, name) for name in os.listdir(profileDir)]
+            runCommand(["llvm-profdata", "merge", "-output=" + merged] + raw)
+        runCommand([command, *flags, *use, "-o", work, cPath])
+        optimized = medianRun(work, inputs, timeout, repeat)
+        shutil.copy2(work, exePath)
+    return baseline, optimized
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(
+        usage="python ./build.py target.yolo [-o out] [--cc gcc] [-O3] [--native] [--lto] [--pgo]\n       python ./build.py target.yolo --pipe --run [< input]"
+    )
+    argParser.add_argument("source", help="yolo source file")
+    argParser.add_argument(
+        "-o",
+        "--output",
+        help="executable to write (default: out, or a temp file with --run), the C "
+        "goes to OUTPUT.c",
+    )
+    argParser.add_argument(
+        "--pipe",
+        action="store_true",
+        help="stream the C into the C compiler instead of writing OUTPUT.c (no cache)",
+    )
+    argParser.add_argument(
+        "--run",
+        action="store_true",
+        help="run the executable after the build, with this stdin, and exit with its "
+        "status",
+    )
+    argParser.add_argument(
+        "--cc", choices=COMPILERS, default="cc", help="C compiler (default: cc)"
+    )
+    argParser.add_argument(
+        "-O",
+        dest="level",
+        choices=("0", "1", "2", "3"),
+        help="C optimization level, -O0 to -O3 (default: 2)",
+    )
+    argParser.add_argument(
+        "--preset",
+        choices=PRESETS,
+        help="debug: -O0 -g, release: -O2, native: -O3 -march=native -flto",
+    )
+    argParser.add_argument(
+        "--native", action="store_true", help="optimize for this CPU (-march=native)"
+    )
+    argParser.add_argument(
+        "--lto", action="store_true", help="link time optimization (-flto)"
+    )
+    argParser.add_argument(
+        "--pgo",
+        action="store_true",
+        help="train an instrumented build, then rebuild with the recorded profile",
+    )
+    argParser.add_argument(
+        "--train",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="stdin of a PGO training run, repeat for several runs (default: no input)",
+    )
+    argParser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="PGO: timed runs per build, the median is reported",
+    )
+    argParser.add_argument(
+        "--timeout", type=float, default=60, help="PGO: seconds a run may take"
+    )
+    # Options of the yolo compiler itself, spelled out since -O is the C level here
+    argParser.add_argument("--lexer", choices=LEXERS, default="basic", help="yolo lexer")
+    argParser.add_argument(
+        "--parser", choices=PARSERS, default="recursive", help="yolo expression parser"
+    )
+    argParser.add_argument("--optimize", action="store_true", help="fold constants")
+    argParser.add_argument("--dce", action="store_true", help="remove dead code")
+    argParser.add_argument(
+        "--infer-types", action="store_true", help="infer int/double types"
+    )
+    argParser.add_argument(
+        "--instrument", action="store_true", help="per-line profiling build"
+    )
+    argParser.add_argument(
+        "--loops", action="store_true", help="loop invariants and strength reduction"
+    )
+    argParser.add_argument(
+        "--parallel", action="store_true", help="OpenMP loops, built with -fopenmp"
+    )
+    argParser.add_argument(
+        "--bounds-check", action="store_true", help="check array indexes at run time"
+    )
+    argParser.add_argument("--no-cache", action="store_true", help="always rebuild")
+    argParser.add_argument("--cache-dir", help="where cached C and executables are kept")
+    args = argParser.parse_args()
+
+    if args.pipe and args.pgo:
+        argParser.error("--pgo builds from OUTPUT.c, it can't be combined with --pipe")
+
+    options = Options.fromArgs(args)
+    cache = None if args.no_cache or args.pipe else CompileCache(args.cache_dir)
+    flags = compilerFlags(args.preset, args.level, args.native, args.lto)
+    flags += optionFlags(options)
+    directory = None
+    output = args.output
+    if output is None:
+        if args.run:
+            directory = tempfile.TemporaryDirectory()
+            output = os.path.join(directory.name, "program")
+        else:
+            output = "out"
+    cPath = output + ".c"
+    # Status lines go to stderr when the program's output follows on stdout
+    status = sys.stderr if args.run else sys.stdout
+
+    try:
+        if args.pipe:
+            stats = CompileStats()
+            try:
+                # Lexing is part of the parse step, timing each token would slow it down
+                with exitOnError():
+                    with openSource(args.source, options) as sourceCode:
+                        with stats.phase("parse"):
+                            program = parseProgram(sourceCode, options)
+                    program = runPasses(program, options, stats=stats)
+                pipeExecutable(program, output, options, args.cc, flags, stats)
+            except FileNotFoundError as e:
+                sys.exit("Build error: " + e.filename + " not found")
+            except subprocess.CalledProcessError:
+                sys.exit("Build error: " + args.cc + " failed on the piped C code")
+            steps = ", ".join(
+                "{} {:.3f}s".format(name, seconds)
+                for name, seconds in stats.phases.items()
+            )
+            print(
+                "{} -> {} ({} {}, piped): {}".format(
+                    args.source, output, args.cc, " ".join(flags), steps
+                ),
+                file=status,
+            )
+        else:
+            start = time.perf_counter()
+            with exitOnError():
+                compileFile(args.source, cPath, options, cache=cache)
+            generated = time.perf_counter()
+            if args.pgo:
+                baseline, optimized = buildWithProfile(
+                    cPath, output, args.cc, flags, args.train, args.timeout, args.repeat
+                )
+            else:
+                try:
+                    cached = buildExecutable(cPath, output, cache, args.cc, flags)
+                except FileNotFoundError:
+                    sys.exit("Build error: " + args.cc + " not found")
+                except subprocess.CalledProcessError:
+                    sys.exit("Build error: " + args.cc + " failed on " + cPath)
+            built = time.perf_counter()
+
+            print(
+                "{} -> {} -> {} ({} {}): yolo {:.3f}s, build {:.3f}s{}".format(
+                    args.source,
+                    cPath,
+                    output,
+                    args.cc,
+                    " ".join(flags),
+                    generated - start,
+                    built - generated,
+                    " (cached)" if not args.pgo and cached else "",
+                ),
+                file=status,
+            )
+            if args.pgo:
+                print(
+                    "PGO: {:.3f}s without the profile, {:.3f}s with it, {:.2f}x "
+                    "speedup".format(
+                        baseline,
+                        optimized,
+                        baseline / optimized if optimized else float("inf"),
+                    ),
+                    file=status,
+                )
+            if cache is not None:
+                cache.saveStats()
+                cache.evict()
+
+        if args.run:
+            status.flush()
+            start = time.perf_counter()
+            returnCode = subprocess.run([os.path.abspath(output)]).returncode
+            print("run {:.3f}s".format(time.perf_counter() - start), file=sys.stderr)
+            sys.exit(returnCode)
+    finally:
+        if directory is not None:
+            directory.cleanup()
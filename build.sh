@@ -4,10 +4,9 @@ if [ $# -eq 0 ]; then
     exit 1
 fi
 
-# Use the first argument with the Python script
-python main.py "$1"
-
-g++ -o out out.c
+# Compile the first argument to out.c and build it into out with cc -O2. Extra arguments
+# go to build.py, e.g. --cc clang, -O3, --native, --lto, --pgo --train input.txt
+python build.py "$1" -o out "${@:2}"
 
 if [ $? -eq 0 ]; then
     echo "Compilation successful."
@@ -0,0 +1,228 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# Content-addressed cache of generated C and built executables. An entry is keyed by the
+# sha256 of everything that decides its contents: the source, the compiler's own code and
+# the options (plus the C compiler and its flags for executables), so it never has to be
+# invalidated, only evicted. Entries are plain files, written to a temp file and renamed
+# into place so concurrent compiles (batch mode) never see half an entry. A hit touches
+# the entry's mtime, eviction removes entries unused for maxAge and then the least
+# recently used ones until the cache fits in maxBytes. Hits and misses are counted per
+# kind of entry (suffix), so C and executable lookups have their own totals.
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "yolo")
+STATS_FILE = "stats.json"
+STATS_LOCK = "stats.lock"  # held while the totals are updated, see saveStats()
+NOTES = ".notes"  # Suffix of the lines stored with an entry, see store()
+KINDS = {".c": "C", ".exe": "executables"}
+
+_compilerVersion = None
+
+
+# Hash of the compiler's own modules, any change to them gives new cache keys
+def compilerVersion() -> str:
+    global _compilerVersion
+    if _compilerVersion is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".py"):
+                digest.update(name.encode())
+                with open(os.path.join(directory, name), "rb") as module:
+                    digest.update(module.read())
+        _compilerVersion = digest.hexdigest()
+    return _compilerVersion
+
+
+class CompileCache:
+    def __init__(self, directory=None, maxBytes=256 << 20, maxAge=30 * 24 * 3600):
+        self.directory = directory or os.environ.get("YOLO_CACHE_DIR") or DEFAULT_DIR
+        self.maxBytes = maxBytes
+        self.maxAge = maxAge  # seconds since last use
+        self.hits = dict.fromkeys(KINDS, 0)
+        self.misses = dict.fromkeys(KINDS, 0)
+
+    # Key of the C code generated from sourceCode with the given compiler.Options. A
+    # binary stream (compiler.openSource) is read in chunks, then rewound for the
+    # parser. A pipe can't be rewound, its key is None and it is compiled uncached.
+    def key(self, sourceCode, options):
+        if not isinstance(sourceCode, str) and not rewindable(sourceCode):
+            return None
+        digest = hashlib.sha256()
+        digest.update(compilerVersion().encode())
+        digest.update(json.dumps(vars(options), sort_keys=True).encode())
+        if isinstance(sourceCode, str):
+            digest.update(sourceCode.encode())
+        else:
+            for chunk in iter(lambda: sourceCode.read(1 << 16), b""):
+                digest.update(chunk)
+            sourceCode.seek(0)
+        return digest.hexdigest()
+
+    # Key of an executable built from the C file at cPath by the described C compiler
+    def buildKey(self, cPath, compiler) -> str:
+        digest = hashlib.sha256()
+        digest.update(compiler.encode())
+        with open(cPath, "rb") as cFile:
+            digest.update(cFile.read())
+        return digest.hexdigest()
+
+    def path(self, key, suffix) -> str:
+        return os.path.join(self.directory, key[:2], key + suffix)
+
+    # Copy the entry to target and return True, or return False on a miss. With a notes
+    # list the lines stored with the entry are appended to it, an entry whose notes were
+    # evicted is a miss.
+    def fetch(self, key, suffix, target, notes=None) -> bool:
+        entry = self.path(key, suffix)
+        try:
+            if notes is not None:
+                with open(entry + NOTES, "r") as notesFile:
+                    lines = notesFile.read().splitlines()
+                os.utime(entry + NOTES)
+            shutil.copy2(entry, target)
+            os.utime(entry)  # Mark as recently used
+        except FileNotFoundError:
+            # Also happens when another process evicts the entry while we copy it
+            self.misses[suffix] += 1
+            return False
+        if notes is not None:
+            notes.extend(lines)
+        self.hits[suffix] += 1
+        return True
+
+    # Copy the file at source into the cache under key, with notes (lines, e.g. what the
+    # passes reported) that a hit gives back. The notes go in first, so an entry is never
+    # there without them.
+    def store(self, key, suffix, source, notes=None) -> None:
+        entry = self.path(key, suffix)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        if notes is not None:
+            self.place(entry + NOTES, lambda temp: writeLines(temp, notes))
+        self.place(entry, lambda temp: shutil.copy2(source, temp))
+
+    # Fill a temp file next to entry with write(tempPath), then rename it into place
+    def place(self, entry, write) -> None:
+        handle, temp = tempfile.mkstemp(dir=os.path.dirname(entry))
+        os.close(handle)
+        try:
+            write(temp)
+            os.replace(temp, entry)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    # (path, size, last use) of every entry
+    def entries(self):
+        result = []
+        if not os.path.isdir(self.directory):
+            return result
+        for shard in os.listdir(self.directory):
+            shardPath = os.path.join(self.directory, shard)
+            if not os.path.isdir(shardPath):
+                continue
+            for name in os.listdir(shardPath):
+                path = os.path.join(shardPath, name)
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                result.append((path, info.st_size, info.st_mtime))
+        return result
+
+    # Remove stale entries, then the least recently used until the cache fits. Returns
+    # the number of entries removed.
+    def evict(self) -> int:
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for path, size, used in entries)
+        oldest = time.time() - self.maxAge
+        removed = 0
+        for path, size, used in entries:
+            if used >= oldest and total <= self.maxBytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    # Add this run's hits and misses ({suffix: count}) to the totals kept in the cache
+    # directory. Processes sharing the cache take turns through a lock file, so none of
+    # their counts are lost.
+    def saveStats(self, hits=None, misses=None) -> dict:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, STATS_LOCK), "a") as lockFile:
+            fcntl.flock(lockFile, fcntl.LOCK_EX)
+            stats = self.loadStats()
+            for suffix, count in (self.hits if hits is None else hits).items():
+                stats["hits"][suffix] += count
+            for suffix, count in (self.misses if misses is None else misses).items():
+                stats["misses"][suffix] += count
+            self.place(
+                os.path.join(self.directory, STATS_FILE),
+                lambda temp: writeJson(temp, stats),
+            )
+        return stats
+
+    # Totals as {"hits": {suffix: count}, "misses": {suffix: count}}. Totals of an older
+    # version that counted every lookup together are dropped.
+    def loadStats(self) -> dict:
+        stats = {"hits": dict.fromkeys(KINDS, 0), "misses": dict.fromkeys(KINDS, 0)}
+        try:
+            with open(os.path.join(self.directory, STATS_FILE), "r") as statsFile:
+                saved = json.load(statsFile)
+        except (FileNotFoundError, ValueError):
+            return stats
+        for total in ("hits", "misses"):
+            if isinstance(saved.get(total), dict):
+                for suffix in KINDS:
+                    stats[total][suffix] = saved[total].get(suffix, 0)
+        return stats
+
+    def describe(self) -> str:
+        stats = self.loadStats()
+        entries = [entry for entry in self.entries() if not entry[0].endswith(NOTES)]
+        parts = []
+        for suffix, name in KINDS.items():
+            hits = stats["hits"][suffix]
+            misses = stats["misses"][suffix]
+            parts.append(
+                "{}: {} hits, {} misses ({:.0f}% hit rate)".format(
+                    name,
+                    hits,
+                    misses,
+                    100 * hits / (hits + misses) if hits + misses else 0,
+                )
+            )
+        return "cache {}: {} entries, {:.1f} KB, {}".format(
+            self.directory,
+            len(entries),
+            sum(size for path, size, used in self.entries()) / 1024,
+            ", ".join(parts),
+        )
+
+
+# Whether a binary stream can be read twice: a file or an mmap.mmap, not a pipe
+def rewindable(stream) -> bool:
+    try:
+        stream.seek(stream.tell())
+    except (AttributeError, OSError, ValueError):
+        return False
+    return True
+
+
+def writeLines(path, lines) -> None:
+    with open(path, "w") as linesFile:
+        for line in lines:
+            linesFile.write(line + "\n")
+
+
+def writeJson(path, value) -> None:
+    with open(path, "w") as jsonFile:
+        json.dump(value, jsonFile)
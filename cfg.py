@@ -0,0 +1,220 @@
+from ast_nodes import (
+    Let,
+    Print,
+    If,
+    While,
+    For,
+    Label,
+    Goto,
+    Input,
+    Dim,
+    BinOp,
+    Unary,
+    Ident,
+    Index,
+    Group,
+)
+from optimize import constantValue
+
+
+# One node per simple statement, per IF/WHILE condition and per FOR init/condition/step.
+# Vars are keyed by name, except FOR vars which are (name, id of the FOR) because C
+# scopes them to the loop. An array is one var: storing into an element also uses the
+# array, since the other elements keep their values.
+class CFGNode:
+    __slots__ = ("statement", "part", "uses", "defs", "successors")
+
+    def __init__(self, statement, part, uses=frozenset(), defs=frozenset()):
+        self.statement = statement  # AST statement this node comes from, None for entry/exit
+        self.part = part  # "entry", "exit", "statement", "condition", "init" or "step"
+        self.uses = uses
+        self.defs = defs
+        self.successors = []
+
+
+class CFG:
+    def __init__(self, program) -> None:
+        self.nodes = []
+        self.statementNodes = {}  # id(statement) -> its nodes
+        self.labels = {}  # label name -> its node
+        self.gotos = []  # (node, label name)
+        self.scope = []  # (name, key) of the FOR loops we are in
+
+        self.entry = self.addNode(None, "entry")
+        self.exit = self.addNode(None, "exit")
+        ends = self.block(program.body, [self.entry])
+        self.link(ends, self.exit)
+        for node, label in self.gotos:
+            node.successors.append(self.labels[label])
+
+    def addNode(self, statement, part, uses=frozenset(), defs=frozenset()):
+        node = CFGNode(statement, part, uses, defs)
+        self.nodes.append(node)
+        if statement is not None:
+            self.statementNodes.setdefault(id(statement), []).append(node)
+        return node
+
+    def link(self, predecessors, node) -> None:
+        for predecessor in predecessors:
+            predecessor.successors.append(node)
+
+    def varKey(self, name):
+        for scopeName, key in reversed(self.scope):
+            if scopeName == name:
+                return key
+        return name
+
+    def uses(self, node):
+        kind = type(node)
+        if kind is Ident:
+            return {self.varKey(node.name)}
+        if kind is Index:
+            return {node.name} | self.uses(node.index)
+        if kind is BinOp:
+            return self.uses(node.left) | self.uses(node.right)
+        if kind is Unary:
+            return self.uses(node.operand)
+        if kind is Group:
+            return self.uses(node.expr)
+        return set()
+
+    # (always false, always true) for a condition made only of literals
+    def constantCondition(self, condition):
+        value = constantValue(condition)
+        if value is None:
+            return False, False
+        return value[0] == 0, value[0] != 0
+
+    # Add the nodes of a list of statements after the given predecessors, and return the
+    # nodes that fall through to whatever follows the list
+    def block(self, body, predecessors):
+        for statement in body:
+            predecessors = self.statement(statement, predecessors)
+        return predecessors
+
+    # Vars read to find where a LET or INPUT stores
+    def targetUses(self, statement):
+        if statement.index is None:
+            return set()
+        return {statement.name} | self.uses(statement.index)
+
+    def statement(self, statement, predecessors):
+        kind = type(statement)
+        if kind is Let:
+            node = self.addNode(
+                statement,
+                "statement",
+                frozenset(self.uses(statement.value) | self.targetUses(statement)),
+                frozenset((self.varKey(statement.name),)),
+            )
+        elif kind is Input:
+            # A weak update like an array store: at the end of the input the var keeps
+            # its value, so that value is still live
+            key = self.varKey(statement.name)
+            node = self.addNode(
+                statement,
+                "statement",
+                frozenset(self.targetUses(statement) | {key}),
+                frozenset((key,)),
+            )
+        elif kind is Print:
+            uses = () if isinstance(statement.value, str) else self.uses(statement.value)
+            node = self.addNode(statement, "statement", frozenset(uses))
+        elif kind is Label:
+            node = self.addNode(statement, "statement")
+            self.labels[statement.name] = node
+        elif kind is Dim:
+            node = self.addNode(statement, "statement")
+        elif kind is Goto:
+            node = self.addNode(statement, "statement")
+            self.link(predecessors, node)
+            self.gotos.append((node, statement.name))
+            return []
+        elif kind is If:
+            condition = self.addNode(
+                statement, "condition", frozenset(self.uses(statement.condition))
+            )
+            self.link(predecessors, condition)
+            isFalse, isTrue = self.constantCondition(statement.condition)
+            ends = self.block(statement.body, [] if isFalse else [condition])
+            if not isTrue:
+                ends.append(condition)
+            return ends
+        elif kind is While:
+            condition = self.addNode(
+                statement, "condition", frozenset(self.uses(statement.condition))
+            )
+            self.link(predecessors, condition)
+            isFalse, isTrue = self.constantCondition(statement.condition)
+            ends = self.block(statement.body, [] if isFalse else [condition])
+            self.link(ends, condition)
+            return [] if isTrue else [condition]
+        elif kind is For:
+            key = (statement.name, id(statement))
+            self.scope.append((statement.name, key))
+            init = self.addNode(
+                statement,
+                "init",
+                frozenset(self.uses(statement.start)),
+                frozenset((key,)),
+            )
+            self.link(predecessors, init)
+            condition = self.addNode(
+                statement, "condition", frozenset(self.uses(statement.condition))
+            )
+            init.successors.append(condition)
+            isFalse, isTrue = self.constantCondition(statement.condition)
+            ends = self.block(statement.body, [] if isFalse else [condition])
+            step = self.addNode(
+                statement,
+                "step",
+                frozenset(self.uses(statement.step)),
+                frozenset((self.varKey(statement.stepName),)),
+            )
+            self.link(ends, step)
+            step.successors.append(condition)
+            self.scope.pop()
+            return [] if isTrue else [condition]
+        self.link(predecessors, node)
+        return [node]
+
+
+# Ids of the nodes that can be reached from the entry
+def reachable(cfg):
+    seen = {id(cfg.entry)}
+    pending = [cfg.entry]
+    while pending:
+        node = pending.pop()
+        for successor in node.successors:
+            if id(successor) not in seen:
+                seen.add(id(successor))
+                pending.append(successor)
+    return seen
+
+
+# Backward liveness: id(node) -> set of var keys live right after the node
+def liveness(cfg):
+    predecessors = {id(node): [] for node in cfg.nodes}
+    for node in cfg.nodes:
+        for successor in node.successors:
+            predecessors[id(successor)].append(node)
+
+    liveIn = {id(node): frozenset() for node in cfg.nodes}
+    liveOut = {id(node): set() for node in cfg.nodes}
+    pending = list(cfg.nodes)
+    queued = {id(node) for node in pending}
+    while pending:
+        node = pending.pop()
+        queued.discard(id(node))
+        out = set()
+        for successor in node.successors:
+            out |= liveIn[id(successor)]
+        liveOut[id(node)] = out
+        newIn = node.uses | (out - node.defs)
+        if newIn != liveIn[id(node)]:
+            liveIn[id(node)] = newIn
+            for predecessor in predecessors[id(node)]:
+                if id(predecessor) not in queued:
+                    queued.add(id(predecessor))
+                    pending.append(predecessor)
+    return liveOut
@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+# Thin client of the compiler daemon (daemon.py). It only imports the standard library,
+# so a compile costs a Python start, one request and no compiler imports.
+
+# compiler.LEXERS and compiler.PARSERS, not imported to stay light
+LEXERS = ("basic", "fast", "array", "stream")
+PARSERS = ("recursive", "precedence")
+
+
+# Socket the daemon listens on by default: $YOLO_SOCKET, or one per user in $TMPDIR.
+# tempfile.gettempdir would add its imports to every client start.
+def defaultSocket() -> str:
+    path = os.environ.get("YOLO_SOCKET")
+    if path:
+        return path
+    directory = os.environ.get("TMPDIR", "/tmp")
+    return os.path.join(directory, "yolo-%d.sock" % os.getuid())
+
+
+# A connection to the daemon, requests are sent and answered one at a time
+class DaemonClient:
+    def __init__(self, path=None) -> None:
+        self.path = path if path is not None else defaultSocket()
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.socket.connect(self.path)
+        except OSError:
+            self.socket.close()  # callers retry while the daemon starts
+            raise
+        self.file = self.socket.makefile("rb")
+        self.nextId = 0
+
+    # Send a request (see daemon.py for the fields) and return the daemon's answer
+    def request(self, message):
+        self.nextId += 1
+        message = dict(message, id=self.nextId)
+        self.socket.sendall(json.dumps(message).encode() + b"\n")
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("the daemon closed the connection")
+        return json.loads(line)
+
+    def compile(self, source, options=None):
+        return self.request(
+            {"command": "compile", "source": source, "options": options or {}}
+        )
+
+    def run(self, source, options=None, stdin="", timeout=None):
+        message = {
+            "command": "run",
+            "source": source,
+            "options": options or {},
+            "stdin": stdin,
+        }
+        if timeout is not None:
+            message["timeout"] = timeout
+        return self.request(message)
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(
+        usage="python ./client.py target.yolo [-o out.c] [--run]\n       python ./client.py --ping | --shutdown"
+    )
+    argParser.add_argument("source", nargs="?", help="yolo source file")
+    argParser.add_argument(
+        "-o", "--output", help="write the C code here instead of stdout"
+    )
+    argParser.add_argument(
+        "--run",
+        action="store_true",
+        help="run the program in the daemon's VM, stdin is its input",
+    )
+    argParser.add_argument(
+        "--timeout",
+        type=float,
+        help="with --run, stop the program after this many seconds",
+    )
+    argParser.add_argument(
+        "--socket", help="socket of the daemon (default: $YOLO_SOCKET)"
+    )
+    argParser.add_argument("--ping", action="store_true", help="check the daemon is up")
+    argParser.add_argument("--shutdown", action="store_true", help="stop the daemon")
+    argParser.add_argument("--lexer", choices=LEXERS, default="basic")
+    argParser.add_argument("--parser", choices=PARSERS, default="recursive")
+    argParser.add_argument("-O", "--optimize", action="store_true")
+    argParser.add_argument("--dce", action="store_true")
+    argParser.add_argument("--infer-types", action="store_true")
+    argParser.add_argument("--loops", action="store_true")
+    argParser.add_argument("--parallel", action="store_true")
+    argParser.add_argument("--bounds-check", action="store_true")
+    argParser.add_argument("--instrument", action="store_true")
+    args = argParser.parse_args()
+
+    try:
+        client = DaemonClient(args.socket)
+    except OSError as e:
+        sys.exit(
+            "No compiler daemon on "
+            + (args.socket or defaultSocket())
+            + " ("
+            + e.strerror
+            + "), start one with python daemon.py"
+        )
+    if args.ping or args.shutdown:
+        response = client.request({"command": "ping" if args.ping else "shutdown"})
+        print(response.get("status", response.get("error")))
+        sys.exit(0 if response["ok"] else 1)
+    if args.source is None:
+        argParser.error("a source file is required")
+
+    with open(args.source, "r") as sourceFile:
+        source = sourceFile.read()
+    # Same fields as compiler.Options
+    options = {
+        "lexer": args.lexer,
+        "parser": args.parser,
+        "optimize": args.optimize,
+        "dce": args.dce,
+        "inferTypes": args.infer_types,
+        "loops": args.loops,
+        "parallel": args.parallel,
+        "boundsCheck": args.bounds_check,
+        "instrument": args.instrument,
+    }
+    if args.run:
+        # A terminal is not read, the program would wait for it even without INPUT
+        stdin = "" if sys.stdin.isatty() else sys.stdin.read()
+        response = client.run(source, options, stdin, args.timeout)
+    else:
+        response = client.compile(source, options)
+    client.close()
+
+    for line in response.get("report", ()):
+        print(line, file=sys.stderr)
+    if args.run:
+        sys.stdout.write(response.get("output", ""))
+    elif response["ok"]:
+        if args.output is None:
+            sys.stdout.write(response["c"])
+        else:
+            with open(args.output, "w") as outFile:
+                outFile.write(response["c"])
+    if not response["ok"]:
+        sys.exit(response["error"])
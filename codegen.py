@@ -0,0 +1,381 @@
+import runtime
+from ast_nodes import (
+    Let,
+    Print,
+    If,
+    While,
+    For,
+    Label,
+    Goto,
+    Input,
+    Dim,
+    BinOp,
+    Unary,
+    Number,
+    Ident,
+    Index,
+    Group,
+)
+from infer import ExpressionTypes, INTEGRAL
+
+# Binding strength of binary operators, used to parenthesize trees built by passes
+PRECEDENCE = {
+    "==": 1,
+    "!=": 1,
+    "<": 2,
+    "<=": 2,
+    ">": 2,
+    ">=": 2,
+    "+": 3,
+    "-": 3,
+    "*": 4,
+    "/": 4,
+}
+
+
+# Walks the AST and writes C through an Emitter. The C types of expressions
+# (ExpressionTypes) tell which array indexes need a conversion to an integer.
+class CGenerator(ExpressionTypes):
+    coalescePrints = True  # join consecutive PRINTs of strings into one write
+    parallelLoops = True  # put the OpenMP pragmas of parallel.py before FOR loops
+    boundsCheck = False  # check array indexes at run time (--bounds-check)
+
+    def __init__(self, emitter) -> None:
+        super().__init__()
+        self.emitter = emitter
+        self.declared = set()  # vars that have a declaration (or belong to a FOR)
+        self.arrays = {}  # arrays of the program -> their size
+        self.parallel = {}  # id(For) -> clauses of its OpenMP pragma
+        self.output = False  # whether the program uses the output buffer
+        self.printed = set()  # what its PRINTs write: "text", "int" and "fixed"
+        self.input = set()  # C types of the vars it reads from stdin
+        self.indexes = False  # whether it checks array indexes
+        self.line = 0  # source line of the statement being generated
+
+    # program ::= {statement}
+    def program(self, program) -> None:
+        self.types = program.types
+        self.temps = program.temps
+        self.arrays = program.arrays
+        self.parallel = program.parallel
+        self.begin()
+        self.statements(program.body)
+        self.end()
+
+    # Arrays are static, so they start zeroed and can be larger than the stack
+    def begin(self) -> None:
+        self.emitter.includeLine("#include <stdio.h>")
+        self.emitter.headerLine("int main(){")
+        for name, size in self.arrays.items():
+            self.emitter.headerLine(
+                "static " + self.varType(name) + " " + name + "[" + str(size) + "];"
+            )
+
+    def end(self) -> None:
+        if self.output:
+            self.emitter.emitLine("yolo_flush();")
+            self.emitter.includeLine("#include <string.h>")
+            self.emitter.preludeLine(runtime.OUTPUT)
+        if self.printed:
+            self.emitter.preludeLine(runtime.WRITE)
+        if "int" in self.printed or "fixed" in self.printed:
+            self.emitter.preludeLine(runtime.DIGITS)
+        if "int" in self.printed:
+            self.emitter.preludeLine(runtime.PRINT_INT)
+        if "fixed" in self.printed:
+            self.emitter.preludeLine(runtime.PRINT_FIXED)
+        if self.input:
+            self.emitter.includeLine("#include <errno.h>")
+            self.emitter.includeLine("#include <stdlib.h>")
+            self.emitter.includeLine("#include <unistd.h>")
+            self.emitter.preludeLine(runtime.INPUT)
+        if "float" in self.input:
+            self.emitter.preludeLine(runtime.INPUT_FLOAT)
+        if "double" in self.input:
+            self.emitter.preludeLine(runtime.INPUT_DOUBLE)
+        if self.indexes:
+            self.emitter.includeLine("#include <stdlib.h>")
+            self.emitter.preludeLine(runtime.INDEX)
+        self.emitter.emitLine("return 0;")
+        self.emitter.emitLine("}")
+
+    def statement(self, node) -> None:
+        self.line = node.line or 0
+        getattr(self, STATEMENTS[type(node)])(node)
+
+    # A run of PRINTs of strings becomes a single write
+    def statements(self, body) -> None:
+        strings = []
+        for statement in body:
+            if (
+                self.coalescePrints
+                and type(statement) is Print
+                and isinstance(statement.value, str)
+            ):
+                strings.append(statement.value)
+                continue
+            if strings:
+                self.printStrings(strings)
+                strings = []
+            self.statement(statement)
+        if strings:
+            self.printStrings(strings)
+
+    def block(self, body) -> None:
+        self.statements(body)
+        self.emitter.emitLine("}")
+
+    # Declare a var in the header the first time it is assigned
+    def declare(self, name) -> None:
+        if name not in self.declared:
+            self.declared.add(name)
+            if name in self.temps:
+                self.emitter.headerLine(self.temps[name] + " " + name + ";")
+            elif self.types is None:
+                self.emitter.headerLine("float " + name + ";")
+            else:
+                self.emitter.headerLine(
+                    self.types.vars.get(name, "double") + " " + name + ";"
+                )
+
+    # Statements
+    # --------------------------------------
+
+    # PRINT writes to the output buffer of runtime.OUTPUT, numbers as printf("%.2f\n")
+    # would print them
+    def printStatement(self, node) -> None:
+        self.output = True
+        if isinstance(node.value, str):
+            # Print simple string
+            self.printStrings([node.value])
+        elif self.types is None:
+            # We get an expression so lets print the resulting float
+            self.printed.add("fixed")
+            self.emitter.emitLine(
+                "yolo_print_fixed((float)(" + self.expression(node.value) + "));"
+            )
+        elif self.types.printTypes[id(node)] == "int":
+            # Integers print as "%d.00" like "%.2f" would, an int is read from a wider
+            # value like printf("%d") read it
+            self.printed.add("int")
+            self.emitter.emitLine(
+                "yolo_print_int((int)(" + self.expression(node.value) + "));"
+            )
+        elif self.types.printTypes[id(node)] == "long long":
+            self.printed.add("int")
+            self.emitter.emitLine(
+                "yolo_print_int(" + self.expression(node.value) + ");"
+            )
+        else:
+            self.printed.add("fixed")
+            self.emitter.emitLine(
+                "yolo_print_fixed(" + self.expression(node.value) + ");"
+            )
+
+    # Strings can't hold a quote, backslash or newline, so they are C literals as is
+    def printStrings(self, strings) -> None:
+        self.output = True
+        self.printed.add("text")
+        self.emitter.emitLine('YOLO_PUTS("' + "\\n".join(strings) + '\\n");')
+
+    def ifStatement(self, node) -> None:
+        self.emitter.emitLine("if(" + self.expression(node.condition) + "){")
+        self.block(node.body)
+
+    def whileStatement(self, node) -> None:
+        self.emitter.emitLine("while(" + self.expression(node.condition) + "){")
+        self.loopBody(node)
+
+    def forStatement(self, node) -> None:
+        # The loop var lives in the for statement, later LETs must not redeclare it
+        self.declared.add(node.name)
+        self.declared.add(node.stepName)
+        self.scopes.append(node.name)
+        if self.parallelLoops and id(node) in self.parallel:
+            pragma = "#pragma omp parallel for " + self.parallel[id(node)]
+            self.emitter.emitLine(pragma.rstrip())
+        self.emitter.emitLine(
+            "for(int "
+            + node.name
+            + "="
+            + self.expression(node.start)
+            + ";"
+            + self.expression(node.condition)
+            + ";"
+            + node.stepName
+            + "="
+            + self.expression(node.step)
+            + "){"
+        )
+        self.loopBody(node)
+        self.scopes.pop()
+
+    # Body of a WHILE or FOR, and the closing brace
+    def loopBody(self, node) -> None:
+        self.block(node.body)
+
+    def labelStatement(self, node) -> None:
+        self.emitter.emitLine(node.name + ":")
+
+    def gotoStatement(self, node) -> None:
+        self.emitter.emitLine("goto " + node.name + ";")
+
+    def letStatement(self, node) -> None:
+        self.emitter.emitLine(self.target(node) + " = " + self.expression(node.value) + ";")
+
+    # INPUT shows what was printed so far and reads a number like scanf("%f") would,
+    # see runtime.INPUT
+    def inputStatement(self, node) -> None:
+        target = self.target(node)
+        self.output = True
+        ctype = "float" if self.types is None else "double"
+        self.input.add(ctype)
+        self.emitter.emitLine("yolo_input_" + ctype + "(&" + target + ");")
+
+    # Arrays are declared by begin()
+    def dimStatement(self, node) -> None:
+        pass
+
+    # C text of the var or array element a LET or INPUT stores into
+    def target(self, node) -> str:
+        if node.index is not None:
+            return self.element(node.name, node.index)
+        self.declare(node.name)
+        return node.name
+
+    # C text of name(index)
+    def element(self, name, index) -> str:
+        return self.expression(Index(name, index))
+
+    # Expressions
+    # --------------------------------------
+
+    # Return the C text of an expression. The tree is walked with an explicit stack of
+    # nodes and C pieces still to write, and the pieces are joined once at the end, so
+    # long operator chains and deep parens neither hit the recursion limit nor copy
+    # their text once per operator.
+    def expression(self, node) -> str:
+        kind = type(node)
+        if kind is Number:
+            return node.text
+        if kind is Ident:
+            if node.name not in self.declared:
+                self.declare(node.name)  # All its assignments were optimized away
+            return node.name
+        pieces = []
+        rightStarts = []  # index in pieces where the right operand of a + or - starts
+        stack = [node]
+        push = stack.append
+        while stack:
+            item = stack.pop()
+            kind = type(item)
+            if kind is str:
+                pieces.append(item)
+            elif kind is BinOp:
+                # Operands only need parens in trees built by passes, the parser keeps
+                # the source's own parens as Group nodes. Pieces go on the stack in
+                # reverse order.
+                op = item.op
+                precedence = PRECEDENCE[op]
+                right = item.right
+                rightKind = type(right)
+                if rightKind is Number:
+                    text = right.text  # Negative after constant folding
+                    push(" " + text if text[0] == op else text)  # a- -1, not a--1
+                elif rightKind is BinOp and PRECEDENCE[right.op] <= precedence:
+                    stack += (")", right, "(")
+                elif (rightKind is Unary or rightKind is BinOp) and op in "+-":
+                    stack += ((op,), right, RIGHT_START)  # It may start with a sign too
+                else:
+                    push(right)
+                left = item.left
+                leftKind = type(left)
+                cast = self.types is not None and id(item) in self.types.realDivisions
+                if leftKind is Number or leftKind is Ident:
+                    # Written now, it comes next anyway
+                    if leftKind is Number:
+                        text = left.text
+                    else:
+                        text = left.name
+                        if text not in self.declared:
+                            self.declare(text)
+                    pieces.append(("(double)" + text if cast else text) + op)
+                    continue
+                push(op)
+                if cast:
+                    # The cast would only bind to the first operand of a left operator
+                    if leftKind is BinOp:
+                        stack += (")", left, "(double)(")
+                    else:
+                        stack += (left, "(double)")
+                elif leftKind is BinOp and PRECEDENCE[left.op] < precedence:
+                    stack += (")", left, "(")
+                else:
+                    push(left)
+            elif kind is Ident:
+                if item.name not in self.declared:
+                    self.declare(item.name)  # All its assignments were optimized away
+                pieces.append(item.name)
+            elif kind is Number:
+                pieces.append(item.text)
+            elif item is RIGHT_START:
+                rightStarts.append(len(pieces))
+            elif kind is tuple:
+                # a- -b, not the decrement a--b
+                start = rightStarts.pop()
+                if pieces[start][0] == item[0]:
+                    pieces[start] = " " + pieces[start]
+            elif kind is Index:
+                self.elementPieces(item, stack)
+            elif kind is Unary:
+                operand = item.operand
+                operandKind = type(operand)
+                # Folding drops parens and makes negative numbers: -(-x), not the
+                # decrement --x
+                if (
+                    operandKind is BinOp
+                    or operandKind is Unary
+                    or operandKind is Number
+                    and operand.text[0] == "-"
+                ):
+                    stack += (")", operand, item.op + "(")
+                else:
+                    stack += (operand, item.op)
+            elif kind is Group:
+                stack += (")", item.expr, "(")
+            else:
+                raise TypeError("Not an expression: " + kind.__name__)
+        return "".join(pieces)
+
+    # Push what name(index) writes, in reverse order. A float index is truncated like C
+    # converts it to an integer, with bounds checking yolo_index does it and stops the
+    # program if it is out of range.
+    def elementPieces(self, node, stack) -> None:
+        name = node.name
+        if self.boundsCheck:
+            self.output = True  # yolo_index flushes the output before exiting
+            self.indexes = True
+            size = str(self.arrays[name])
+            end = ", " + size + ', "' + name + '", ' + str(self.line) + ")]"
+            stack += (end, node.index, name + "[yolo_index(")
+        elif self.typeOf(node.index) not in INTEGRAL:
+            stack += (")]", node.index, name + "[(long long)(")
+        else:
+            stack += ("]", node.index, name + "[")
+
+
+# Stack marker of CGenerator.expression: the right operand of a + or - starts here
+RIGHT_START = object()
+
+# Statement node -> CGenerator method, looked up by name so subclasses can override them
+STATEMENTS = {
+    Print: "printStatement",
+    If: "ifStatement",
+    While: "whileStatement",
+    For: "forStatement",
+    Label: "labelStatement",
+    Goto: "gotoStatement",
+    Let: "letStatement",
+    Input: "inputStatement",
+    Dim: "dimStatement",
+}
@@ -0,0 +1,336 @@
+import contextlib
+import mmap
+import os
+import re
+import stat
+import subprocess
+import sys
+import time
+from lexer import Lexer
+from fast_lexer import FastLexer
+from token_stream import TokenStream
+from stream_lexer import StreamLexer
+from parse import Parser
+from precedence_parse import PrecedenceParser
+from emit import Emitter
+from codegen import CGenerator
+from optimize import foldConstants
+from infer import inferTypes
+from dce import eliminateDeadCode
+from loops import optimizeLoops
+from parallel import findParallelLoops
+from errors import CompileError, Diagnostic, NestingError
+
+LEXERS = {
+    "basic": Lexer,
+    "fast": FastLexer,
+    "array": TokenStream,
+    "stream": StreamLexer,
+}
+PARSERS = {"recursive": Parser, "precedence": PrecedenceParser}
+REPORT_LINE = re.compile(r"line (\d+): ")  # Start of the lines passes report
+
+
+# What to do with a source file. Only plain values, so options can be sent to worker
+# processes.
+class Options:
+    def __init__(
+        self,
+        lexer="basic",
+        optimize=False,
+        dce=False,
+        inferTypes=False,
+        instrument=False,
+        loops=False,
+        parallel=False,
+        boundsCheck=False,
+        parser="recursive",
+    ):
+        self.lexer = lexer  # key of LEXERS
+        self.optimize = optimize
+        self.dce = dce
+        self.inferTypes = inferTypes
+        self.instrument = instrument  # profiling build, see instrument.py
+        self.loops = loops
+        self.parallel = parallel  # OpenMP loops, see parallel.py
+        self.boundsCheck = boundsCheck  # check array indexes at run time
+        self.parser = parser  # key of PARSERS
+
+    @classmethod
+    def fromArgs(cls, args):
+        return cls(
+            args.lexer,
+            args.optimize,
+            args.dce,
+            args.infer_types,
+            args.instrument,
+            args.loops,
+            args.parallel,
+            args.bounds_check,
+            args.parser,
+        )
+
+
+# Source of a file for parseProgram: its text, or for the stream lexer the file itself,
+# memory-mapped when it is a regular file, so the text is never in memory as a whole
+@contextlib.contextmanager
+def openSource(sourcePath, options):
+    if options.lexer != "stream":
+        with open(sourcePath, "r") as sourceFile:
+            yield sourceFile.read()
+        return
+    with open(sourcePath, "rb") as sourceFile:
+        info = os.fstat(sourceFile.fileno())
+        if not stat.S_ISREG(info.st_mode) or info.st_size == 0:
+            yield sourceFile  # An empty file or a pipe can't be mapped
+            return
+        with mmap.mmap(sourceFile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+# Raise a NestingError when the recursive parser or a pass (they recurse into
+# expressions) meets an expression nested deeper than Python's recursion limit
+@contextlib.contextmanager
+def nestingLimit(what, phase="parse"):
+    try:
+        yield
+    except RecursionError:
+        raise NestingError("Expression nested too deeply for " + what, phase) from None
+
+
+# Exit with the message of a compile error, the way the command line tools report one
+@contextlib.contextmanager
+def exitOnError():
+    try:
+        yield
+    except CompileError as error:
+        sys.exit(str(error))
+
+
+# Parse source code into a Program, raises a CompileError (LexError, ParseError, ...) on
+# an invalid program. sourceCode is a str, or for the stream lexer also a stream (see
+# openSource).
+# With stats (a stats.CompileStats) the lex, parse and tree phases are timed and the
+# sizes of the token stream, AST and symbol tables counted.
+def parseProgram(sourceCode, options, tree=None, stats=None):
+    what = "the " + options.parser + " parser"
+    if options.parser == "recursive":
+        what += ", --parser precedence has no limit"
+    limit = nestingLimit(what)
+    if stats is None:
+        lexer = LEXERS[options.lexer](sourceCode)
+        with limit:
+            return PARSERS[options.parser](lexer, tree=tree).program()
+
+    from stats import TimedLexer, TimedTree, countNodes
+
+    with stats.phase("lex"):
+        lexer = TimedLexer(LEXERS[options.lexer](sourceCode))  # TokenStream lexes here
+    if tree is not None:
+        tree = TimedTree(tree)
+    stats.notify("start", "parse")
+    start = time.perf_counter()
+    parser = PARSERS[options.parser](lexer, tree=tree)
+    with limit:
+        program = parser.program()
+    seconds = time.perf_counter() - start - lexer.seconds
+    stats.addTime("lex", lexer.seconds)
+    if tree is not None:
+        seconds -= tree.seconds
+        stats.addTime("tree", tree.seconds)
+        stats.count("treeNodes", tree.node_count)
+    stats.addTime("parse", seconds)
+    stats.notify("end", "parse", seconds)
+    stats.count("tokens", lexer.tokens)
+    stats.count("astNodes", countNodes(program.body))
+    stats.count("symbols", len(parser.symbols))
+    stats.count("arrays", len(parser.arrays))
+    stats.count("labels", len(parser.labelsDeclared))
+    return program
+
+
+# Run the passes selected in options. What dead code elimination removed, what the loop
+# optimizations did and which loops run in parallel goes to report, as lines starting
+# with the pass name, and to diagnostics as notes.
+def runPasses(program, options, report=None, stats=None, diagnostics=None):
+    passes = []  # (name, pass, whether it takes a report)
+    if options.optimize and options.inferTypes:
+        # Fold with the C semantics of the inferred types, not of floats, then infer
+        # again for the folded tree
+        passes.append(("types", inferTypes, False))
+        passes.append(
+            ("fold", lambda program: foldConstants(program, program.types), False)
+        )
+    elif options.optimize:
+        passes.append(("fold", foldConstants, False))
+    if options.dce:
+        passes.append(("dce", eliminateDeadCode, True))
+    if options.inferTypes:
+        passes.append(("types", inferTypes, False))
+    if options.loops:
+        # After type inference, whose annotations it keeps valid, so its temps get the
+        # final types
+        passes.append(
+            (
+                "loops",
+                lambda program, lines: optimizeLoops(program, lines, options.parallel),
+                True,
+            )
+        )
+    if options.parallel:
+        passes.append(("parallel", findParallelLoops, True))  # Sees the final loops
+    for name, optimizationPass, reports in passes:
+        lines = []
+        arguments = (program, lines) if reports else (program,)
+        timer = contextlib.nullcontext() if stats is None else stats.phase(name)
+        with nestingLimit("the " + name + " pass", name), timer:
+            program = optimizationPass(*arguments)
+        if report is not None:
+            report.extend(name + ": " + line for line in lines)
+        if diagnostics is not None:
+            diagnostics.extend(reportNote(name, line) for line in lines)
+    return program
+
+
+# Note of a line a pass reported, "line L: message"
+def reportNote(phase, text) -> Diagnostic:
+    match = REPORT_LINE.match(text)
+    if match is None:
+        return Diagnostic("note", phase, text)
+    return Diagnostic("note", phase, text[match.end() :], int(match.group(1)))
+
+
+# Code generator for the options: a profiling one with options.instrument
+def codeGenerator(emitter, options=None):
+    if options is None:
+        return CGenerator(emitter)
+    if options.instrument:
+        from instrument import InstrumentedCGenerator
+
+        generator = InstrumentedCGenerator(emitter)
+    else:
+        generator = CGenerator(emitter)
+    generator.boundsCheck = options.boundsCheck
+    return generator
+
+
+# Generate the C code of a program into an emitter
+def generate(program, emitter, stats=None, options=None) -> None:
+    if stats is None:
+        codeGenerator(emitter, options).program(program)
+        return
+    with stats.phase("emit"):
+        codeGenerator(emitter, options).program(program)
+    stats.count("emittedBytes", emitter.size())
+
+
+# Compile a .yolo file into a .c file. Returns (length of the source, whether the C came
+# from the cache). The report of the passes is cached with the C, a hit replays it.
+def compileFile(sourcePath, outPath, options, report=None, cache=None):
+    lines = []
+    key = None
+    with openSource(sourcePath, options) as sourceCode:
+        if isinstance(sourceCode, str):
+            size = len(sourceCode)
+        else:
+            size = os.path.getsize(sourcePath)  # Bytes, the stream is never all read
+        if cache is not None:
+            key = cache.key(sourceCode, options)  # None for a pipe
+        if key is not None and cache.fetch(key, ".c", outPath, lines):
+            if report is not None:
+                report.extend(lines)
+            return size, True
+        program = runPasses(parseProgram(sourceCode, options), options, lines)
+    emitter = Emitter(outPath)
+    try:
+        generate(program, emitter, options=options)
+        emitter.writeFile()
+    finally:
+        emitter.close()
+    if key is not None:
+        cache.store(key, ".c", outPath, lines)
+    if report is not None:
+        report.extend(lines)
+    return size, False
+
+
+# What compileSource returns: the C code of the program, and the notes of the passes as
+# errors.Diagnostic objects
+class CompileResult:
+    __slots__ = ("code", "diagnostics")
+
+    def __init__(self, code, diagnostics) -> None:
+        self.code = code
+        self.diagnostics = diagnostics
+
+
+# Compile source code into C in memory, for tools and services that compile many
+# programs in one process. Raises a CompileError (LexError, ParseError, ...) on an
+# invalid program, never exits and writes no file. Each call has its own lexer, parser,
+# passes and emitter, so calls can run on several threads at once.
+def compileSource(sourceCode, options=None) -> CompileResult:
+    if options is None:
+        options = Options()
+    diagnostics = []
+    program = parseProgram(sourceCode, options)
+    program = runPasses(program, options, diagnostics=diagnostics)
+    emitter = Emitter()
+    try:
+        generate(program, emitter, options=options)
+        code = emitter.header + emitter.code
+    finally:
+        emitter.close()
+    return CompileResult(code, diagnostics)
+
+
+_compilerIds = {}
+
+
+# Version line of a C compiler, so executables built by another version get other keys
+def compilerId(command) -> str:
+    if command not in _compilerIds:
+        result = subprocess.run(
+            [command, "--version"], capture_output=True, text=True, check=True
+        )
+        _compilerIds[command] = command + " " + result.stdout.split("\n", 1)[0]
+    return _compilerIds[command]
+
+
+# C compiler flags the generated code needs with these options
+def optionFlags(options):
+    return ["-fopenmp"] if options.parallel else []
+
+
+# Build the C file into an executable with a C compiler and flags (see build.py). Returns
+# whether it came from the cache, raises subprocess.CalledProcessError if the build fails.
+def buildExecutable(cPath, exePath, cache=None, command="cc", flags=()) -> bool:
+    if cache is not None:
+        key = cache.buildKey(cPath, compilerId(command) + " " + " ".join(flags))
+        if cache.fetch(key, ".exe", exePath):
+            return True
+    subprocess.run([command, *flags, "-o", exePath, cPath], check=True)
+    if cache is not None:
+        cache.store(key, ".exe", exePath)
+    return False
+
+
+# Build a program into an executable by streaming its C into the C compiler's stdin, no
+# .c file is written. With stats the C compiler's time is the "cc" phase. Raises
+# subprocess.CalledProcessError if the build fails.
+def pipeExecutable(program, exePath, options, command="cc", flags=(), stats=None):
+    emitter = Emitter()
+    try:
+        generate(program, emitter, stats, options)
+        timer = contextlib.nullcontext() if stats is None else stats.phase("cc")
+        with timer:
+            arguments = [command, *flags, "-o", exePath, "-x", "c", "-"]
+            process = subprocess.Popen(arguments, stdin=subprocess.PIPE, text=True)
+            try:
+                emitter.writeTo(process.stdin)
+                process.stdin.close()
+            except BrokenPipeError:
+                pass  # The compiler stopped reading, its exit status says why
+            if process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, arguments)
+    finally:
+        emitter.close()
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from client import defaultSocket
+from compiler import LEXERS, PARSERS, Options, parseProgram, runPasses, generate
+from emit import Emitter
+from errors import CompileError
+from vm import compileBytecode, VM
+
+# Compiler daemon: worker processes keep the compiler imported and serve compile and run
+# requests on a Unix socket, so repeated compiles skip Python startup and imports. Each
+# connection sends requests as JSON objects, one per line, and gets one line back per
+# request. Requests on one connection are served concurrently, so answers can come back
+# in another order; the "id" of a request is copied into its answer.
+#
+# Requests:
+#   {"command": "compile", "source": "...", "options": {...}}
+#       -> {"ok": true, "c": "...", "report": [...], "seconds": ...}
+#   {"command": "run", "source": "...", "options": {...}, "stdin": "...", "timeout": 5}
+#       -> {"ok": true, "output": "...", "report": [...], "seconds": ...}
+#   {"command": "ping"} -> {"ok": true, "status": "..."}
+#   {"command": "shutdown"} -> {"ok": true, "status": "..."}, then the daemon stops
+# options has the fields of compiler.Options, all optional. timeout (seconds, optional)
+# stops a compile or run that takes longer. A request that fails gets
+# {"ok": false, "error": "..."}, with the lexer, parser or VM message; a compile error
+# also has "diagnostic": {"severity", "phase", "message", "line", "column"}, and a run
+# that stops with a runtime error the output printed before it.
+
+MAX_REQUEST = 1 << 30  # bytes in one request line
+OPTION_NAMES = set(vars(Options()))
+
+
+class TimeLimit(Exception):
+    pass
+
+
+def timeUp(signalNumber, frame):
+    raise TimeLimit()
+
+
+# Options of a request, or a str saying what is wrong with them
+def requestOptions(fields):
+    if not isinstance(fields, dict):
+        return "options must be an object"
+    for name, value in fields.items():
+        if name not in OPTION_NAMES:
+            return "unknown option " + name
+        if name == "lexer":
+            if value not in LEXERS:
+                return "lexer must be one of " + ", ".join(LEXERS)
+        elif name == "parser":
+            if value not in PARSERS:
+                return "parser must be one of " + ", ".join(PARSERS)
+        elif not isinstance(value, bool):
+            return name + " must be true or false"
+    return Options(**fields)
+
+
+# Serve a compile or run request. Runs in a worker process, so every failure has to come
+# back as an answer: compile errors are raised, the VM stops with sys.exit.
+def serveRequest(request):
+    start = time.perf_counter()
+    options = requestOptions(request.get("options", {}))
+    if isinstance(options, str):
+        return {"ok": False, "error": options}
+    source = request.get("source")
+    stdin = request.get("stdin", "")
+    if not isinstance(source, str) or not isinstance(stdin, str):
+        return {"ok": False, "error": "source and stdin must be strings"}
+    timeout = request.get("timeout")
+    if timeout is not None and (
+        type(timeout) not in (int, float) or not 0 < timeout < 1e6
+    ):
+        return {"ok": False, "error": "timeout must be a positive number of seconds"}
+    report = []
+    answer = {"ok": True, "report": report}
+    output = io.StringIO()
+    if timeout is not None:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        program = runPasses(parseProgram(source, options), options, report)
+        if request["command"] == "run":
+            VM(compileBytecode(program), io.StringIO(stdin), output).run()
+            answer["output"] = output.getvalue()
+        else:
+            emitter = Emitter()
+            try:
+                generate(program, emitter, options=options)
+                answer["c"] = emitter.header + emitter.code
+            finally:
+                emitter.close()
+    except CompileError as e:
+        answer = {"ok": False, "error": str(e), "report": report}
+        answer["diagnostic"] = e.diagnostic.toDict()
+    except SystemExit as e:
+        answer = {"ok": False, "error": str(e.code), "report": report}
+        if request["command"] == "run":
+            answer["output"] = output.getvalue()
+    except RecursionError:
+        answer = {"ok": False, "error": "program nested too deeply", "report": report}
+    except TimeLimit:
+        error = "stopped after the time limit of {} seconds".format(timeout)
+        answer = {"ok": False, "error": error, "report": report}
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    answer["seconds"] = time.perf_counter() - start
+    return answer
+
+
+# Workers are forked from the event loop's process: they leave Ctrl-C and the signals
+# the loop handles to the daemon, which stops them. SIGALRM enforces time limits.
+def initWorker() -> None:
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGALRM, timeUp)
+
+
+# Nothing to do, so the pool starts its workers
+def warmUp(_) -> int:
+    return os.getpid()
+
+
+class CompileServer:
+    def __init__(self, path, workers=None) -> None:
+        self.path = path
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.pool = None
+        self.stopping = None  # asyncio.Event set by a shutdown request or a signal
+        self.served = 0
+        self.running = 0  # requests the workers are serving
+
+    async def serve(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        for signalNumber in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signalNumber, self.stopping.set)
+        removeStaleSocket(self.path)
+        self.pool = self.startPool()
+        try:
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(self.pool, warmUp, worker)
+                    for worker in range(self.workers)
+                )
+            )
+            server = await asyncio.start_unix_server(
+                self.handleClient, self.path, limit=MAX_REQUEST
+            )
+            print(
+                "yolo daemon listening on {} with {} workers".format(
+                    self.path, self.workers
+                ),
+                file=sys.stderr,
+            )
+            async with server:
+                await self.stopping.wait()
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.stopPool(self.pool)
+
+    def startPool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=initWorker)
+
+    # Stop the workers, even in the middle of requests: the executor would wait for a
+    # program that never ends, and it has no public way to stop its processes
+    def stopPool(self, pool) -> None:
+        if self.running:
+            for process in list((pool._processes or {}).values()):
+                process.terminate()
+        pool.shutdown(cancel_futures=True)
+
+    async def handleClient(self, reader, writer) -> None:
+        pending = set()
+        try:
+            while not self.stopping.is_set():
+                try:
+                    line = await reader.readline()
+                except ValueError:  # Longer than MAX_REQUEST, the rest can't be read
+                    answer = {"ok": False, "error": "request too large"}
+                    self.answer(writer, None, answer)
+                    break
+                if not line:
+                    break
+                task = asyncio.create_task(self.serveLine(line, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+            await writer.drain()
+        except ConnectionError:
+            pass  # The client went away, its answers have nowhere to go
+        except asyncio.CancelledError:
+            pass  # The daemon is stopping, asyncio logs handlers that end cancelled
+        finally:
+            writer.close()
+
+    async def serveLine(self, line, writer) -> None:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            answer = {"ok": False, "error": "invalid JSON: " + str(e)}
+            self.answer(writer, None, answer)
+            return
+        if not isinstance(request, dict):
+            self.answer(writer, None, {"ok": False, "error": "a request is an object"})
+            return
+        requestId = request.get("id")
+        command = request.get("command")
+        if command == "ping":
+            status = "pid {}, {} workers, {} requests served".format(
+                os.getpid(), self.workers, self.served
+            )
+            self.answer(writer, requestId, {"ok": True, "status": status})
+        elif command == "shutdown":
+            self.answer(writer, requestId, {"ok": True, "status": "shutting down"})
+            self.stopping.set()
+        elif command == "compile" or command == "run":
+            loop = asyncio.get_running_loop()
+            pool = self.pool
+            self.running += 1
+            try:
+                answer = await loop.run_in_executor(pool, serveRequest, request)
+            except BrokenProcessPool:
+                # A worker was killed (out of memory?), the next requests get a new pool
+                answer = {"ok": False, "error": "the compiler process died"}
+                if self.pool is pool:
+                    self.pool = self.startPool()
+                    self.stopPool(pool)
+            finally:
+                self.running -= 1
+            self.served += 1
+            self.answer(writer, requestId, answer)
+        else:
+            error = "unknown command " + str(command)
+            self.answer(writer, requestId, {"ok": False, "error": error})
+        await writer.drain()
+
+    # Write an answer in one piece, so concurrent answers never mix
+    def answer(self, writer, requestId, answer) -> None:
+        if requestId is not None:
+            answer["id"] = requestId
+        writer.write(json.dumps(answer).encode() + b"\n")
+
+
+# Remove the socket of a daemon that did not stop cleanly, exit if one is still running
+def removeStaleSocket(path) -> None:
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    sys.exit("A daemon is already listening on " + path)
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(
+        usage="python ./daemon.py [--socket PATH] [-j N]"
+    )
+    argParser.add_argument(
+        "--socket",
+        help="where to listen (default: $YOLO_SOCKET or a socket in the temp dir)",
+    )
+    argParser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="number of worker processes (default: one per CPU)",
+    )
+    args = argParser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        argParser.error("--jobs must be at least 1")
+    server = CompileServer(args.socket or defaultSocket(), args.jobs)
+    asyncio.run(server.serve())
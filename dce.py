@@ -0,0 +1,119 @@
+from ast_nodes import Let, If, While, For, Label, Goto
+from cfg import CFG, reachable, liveness
+
+
+# Removes statements that can never run, labels nothing jumps to, GOTOs to the very next
+# statement and LETs whose value is never read. Every removal is described in report.
+class DeadCodeEliminator:
+    def __init__(self, report=None) -> None:
+        self.report = report if report is not None else []
+        self.removed = 0
+
+    def run(self, program):
+        while True:
+            removed = self.removed
+            cfg = CFG(program)
+            self.cfg = cfg
+            self.live = reachable(cfg)
+            program.body = self.removeUnreachable(program.body)
+
+            targets = set()
+            self.gotoTargets(program.body, targets)
+            program.body = self.removeLabels(program.body, targets)
+
+            cfg = CFG(program)
+            self.cfg = cfg
+            self.liveOut = liveness(cfg)
+            program.body = self.removeDeadStores(program.body)
+            if self.removed == removed:
+                return program
+
+    def note(self, statement, message) -> None:
+        self.removed += 1
+        self.report.append("line " + str(statement.line) + ": " + message)
+
+    def isReachable(self, statement) -> bool:
+        for node in self.cfg.statementNodes.get(id(statement), ()):
+            if id(node) in self.live:
+                return True
+        kind = type(statement)
+        if kind is If or kind is While or kind is For:
+            for inner in statement.body:
+                if self.isReachable(inner):
+                    return True
+        return False
+
+    def removeUnreachable(self, body):
+        result = []
+        for statement in body:
+            kind = type(statement)
+            if not self.isReachable(statement):
+                self.note(statement, "removed unreachable " + kind.__name__.upper())
+                continue
+            if kind is If or kind is While or kind is For:
+                statement.body = self.removeUnreachable(statement.body)
+                isFalse, isTrue = self.cfg.constantCondition(statement.condition)
+                if kind is If and not statement.body:
+                    self.note(statement, "removed IF with an empty body")
+                    continue
+                if kind is If and isTrue:
+                    self.note(statement, "inlined IF whose condition is always true")
+                    result.extend(statement.body)
+                    continue
+                if kind is not If and isFalse and not statement.body:
+                    self.note(statement, "removed loop that never runs")
+                    continue
+            result.append(statement)
+
+        # A GOTO to the label right after it does nothing
+        body = []
+        for index, statement in enumerate(result):
+            if (
+                type(statement) is Goto
+                and index + 1 < len(result)
+                and type(result[index + 1]) is Label
+                and result[index + 1].name == statement.name
+            ):
+                self.note(statement, "removed GOTO " + statement.name + " to the next line")
+                continue
+            body.append(statement)
+        return body
+
+    def gotoTargets(self, body, targets) -> None:
+        for statement in body:
+            kind = type(statement)
+            if kind is Goto:
+                targets.add(statement.name)
+            elif kind is If or kind is While or kind is For:
+                self.gotoTargets(statement.body, targets)
+
+    def removeLabels(self, body, targets):
+        result = []
+        for statement in body:
+            kind = type(statement)
+            if kind is Label and statement.name not in targets:
+                self.note(statement, "removed unused LABEL " + statement.name)
+                continue
+            if kind is If or kind is While or kind is For:
+                statement.body = self.removeLabels(statement.body, targets)
+            result.append(statement)
+        return result
+
+    def removeDeadStores(self, body):
+        result = []
+        for statement in body:
+            kind = type(statement)
+            if kind is Let:
+                node = self.cfg.statementNodes[id(statement)][0]
+                if not node.defs & self.liveOut[id(node)]:
+                    self.note(statement, "removed dead store to " + statement.name)
+                    continue
+            elif kind is If or kind is While or kind is For:
+                statement.body = self.removeDeadStores(statement.body)
+            result.append(statement)
+        return result
+
+
+# Run dead code elimination, appending a line per removal to report if one is given
+def eliminateDeadCode(program, report=None):
+    return DeadCodeEliminator(report).run(program)
@@ -1,19 +1,88 @@
+import shutil
+import tempfile
+
+
 # Emitter tracks the generated code and outputs it
 class Emitter:
-    def __init__(self, fullPath) -> None:
+    def __init__(self, fullPath=None, maxChunks=4096, spillSize=1 << 20) -> None:
         self.fullPath = fullPath
-        self.header = ""
-        self.code = ""  # The precious c code goes here
+        self.includeChunks = []  # #include lines, each one once
+        self.preludeChunks = []  # Code between the includes and main()
+        self.headerChunks = []
+        self.codeChunks = []  # The precious c code goes here
+        # Once maxChunks pieces of code are buffered they are joined into the spill file,
+        # which stays in memory up to spillSize chars and moves to disk after that
+        self.maxChunks = maxChunks
+        self.spillSize = spillSize
+        self.spill = None
+        self.spilled = 0  # bytes (UTF-8) moved into the spill file
 
     def emit(self, code):
-        self.code += code
+        self.codeChunks.append(code)
+        if len(self.codeChunks) >= self.maxChunks:
+            self.flushCode()
 
     def emitLine(self, code):
-        self.code += code + "\n"
+        self.codeChunks.append(code + "\n")
+        if len(self.codeChunks) >= self.maxChunks:
+            self.flushCode()
+
+    def includeLine(self, code):
+        if code + "\n" not in self.includeChunks:
+            self.includeChunks.append(code + "\n")
 
+    # Helpers the program needs (declared before main, they can be added at any time)
+    def preludeLine(self, code):
+        self.preludeChunks.append(code + "\n")
+
+    # Declarations are found late (LET/INPUT), so the header is kept apart from the body
     def headerLine(self, code):
-        self.header += code + "\n"
+        self.headerChunks.append(code + "\n")
+
+    # Move the buffered chunks of code into the spill file
+    def flushCode(self):
+        if self.spill is None:
+            self.spill = tempfile.SpooledTemporaryFile(
+                max_size=self.spillSize, mode="w+", encoding="utf-8"
+            )
+        code = "".join(self.codeChunks)
+        self.spill.write(code)
+        self.spilled += len(code.encode())
+        self.codeChunks.clear()
+
+    # Number of bytes of C emitted so far, UTF-8 encoded as string literals may not be
+    # ASCII
+    def size(self) -> int:
+        size = self.spilled + len(self.header.encode())
+        return size + sum(len(chunk.encode()) for chunk in self.codeChunks)
+
+    # Everything before the body of main: includes, prelude and declarations
+    @property
+    def header(self) -> str:
+        return "".join(self.includeChunks + self.preludeChunks + self.headerChunks)
+
+    @property
+    def code(self) -> str:
+        if self.spill is None:
+            return "".join(self.codeChunks)
+        self.spill.seek(0)
+        spilled = self.spill.read()
+        return spilled + "".join(self.codeChunks)
+
+    # Stream the header and then the body to any file-like sink (file, stdout, pipe)
+    def writeTo(self, sink):
+        sink.write(self.header)
+        if self.spill is not None:
+            self.spill.seek(0)
+            shutil.copyfileobj(self.spill, sink, 1 << 16)
+        sink.write("".join(self.codeChunks))
 
     def writeFile(self):
-        with open(self.fullPath, "w") as outputFile:
-            outputFile.write(self.header + self.code)
+        with open(self.fullPath, "w", encoding="utf-8") as outputFile:
+            self.writeTo(outputFile)
+
+    # Release the spill file, if any
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
@@ -0,0 +1,77 @@
+# Something the compiler has to say about a program: an error, or a note from a pass
+# (what dead code elimination removed, which loops run in parallel, ...). phase is
+# "lex", "parse" or the name of the pass. line and column are 1-based, None when the
+# diagnostic has no position in the source.
+class Diagnostic:
+    __slots__ = ("severity", "phase", "message", "line", "column")
+
+    def __init__(self, severity, phase, message, line=None, column=None) -> None:
+        self.severity = severity  # "error" or "note"
+        self.phase = phase
+        self.message = message
+        self.line = line
+        self.column = column
+
+    # "phase: line L, column C: message", the line format of --dce, --loops, ... reports
+    def __str__(self) -> str:
+        where = ""
+        if self.line is not None:
+            where = "line " + str(self.line)
+            if self.column is not None:
+                where += ", column " + str(self.column)
+            where += ": "
+        return self.phase + ": " + where + self.message
+
+    def toDict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(repr(getattr(self, name)) for name in self.__slots__)
+        return "Diagnostic(" + fields + ")"
+
+
+# A program that can't be compiled. str() of the error is what the command line tools
+# print: the message with a prefix and the location, like "Error. Referencing variable
+# before assignment: x (line 3, column 7)". pos is the source offset the error points
+# at, line and column are None when the lexer can't tell them (a stream that can't
+# seek).
+class CompileError(Exception):
+    prefix = "Error. "
+    phase = "compile"
+
+    def __init__(self, message, pos=None, line=None, column=None) -> None:
+        self.message = message
+        self.pos = pos
+        self.line = line
+        self.column = column
+        super().__init__(self.prefix + message + self.describeLocation())
+
+    def describeLocation(self) -> str:
+        if self.line is not None:
+            return " (line " + str(self.line) + ", column " + str(self.column) + ")"
+        if self.pos is not None:
+            return " (offset " + str(self.pos) + ")"
+        return ""
+
+    @property
+    def diagnostic(self) -> Diagnostic:
+        return Diagnostic("error", self.phase, self.message, self.line, self.column)
+
+
+# Invalid token
+class LexError(CompileError):
+    prefix = "Lexing error: "
+    phase = "lex"
+
+
+# Invalid statement or expression, undeclared var, array or label
+class ParseError(CompileError):
+    phase = "parse"
+
+
+# Expression nested deeper than Python's recursion limit, in the recursive parser
+# (phase "parse") or in a pass
+class NestingError(CompileError):
+    def __init__(self, message, phase) -> None:
+        self.phase = phase
+        super().__init__(message)
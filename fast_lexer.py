@@ -0,0 +1,97 @@
+import re
+from token_1 import TokenType, Token, findLocation
+from errors import LexError
+
+# Whitespace and a comment are skipped in the same match as the token that follows them.
+# Exactly one of the groups is set, m.lastindex tells which one.
+TOKEN_PATTERN = re.compile(
+    r"[ \t\r]*(?:#[^\n]*)?"
+    r"(?:(\n)"  # 1 newline
+    r"|(\d+(?:\.\d*)?)"  # 2 number, a trailing "." is rejected below
+    r"|([^\W\d_][^\W_]*)"  # 3 keyword / identifier / boolean
+    r'|"([^"\r\n\t\\%]*)"'  # 4 string
+    r"|(==|!=|>=|<=|[-+*/()=<>;\0])"  # 5 operator
+    r"|(\Z)"  # 6 end of text
+    r"|(.))",  # 7 anything else is an error
+    re.DOTALL,
+)
+
+NEWLINE, NUMBER, WORD, STRING, OPERATOR, END, ERROR = range(1, 8)
+
+OPERATORS = {
+    "+": TokenType.PLUS,
+    "-": TokenType.MINUS,
+    "*": TokenType.ASTERISK,
+    "/": TokenType.SLASH,
+    "(": TokenType.OPEN_PAREN,
+    ")": TokenType.CLOSE_PAREN,
+    "=": TokenType.EQ,
+    "==": TokenType.EQEQ,
+    "!=": TokenType.NOTEQ,
+    "<": TokenType.LT,
+    "<=": TokenType.LTEQ,
+    ">": TokenType.GT,
+    ">=": TokenType.GTEQ,
+    ";": TokenType.SEMICOLON,
+    "\0": TokenType.EOF,
+}
+
+# Any TokenType name is a keyword, same as Token.isKeyword
+KEYWORDS = dict(TokenType.__members__)
+BOOLEANS = {"true", "false"}
+ILLEGAL_STRING_CHAR = re.compile(r"[\r\n\t\\%]")
+
+
+# Work out the error the character-by-character lexer reports for a bad match.
+# Returns the message and the offset it points at.
+def describeError(source, start, text, end):
+    if text == '"':
+        illegal = ILLEGAL_STRING_CHAR.search(source, start + 1)
+        return "Illegal char in string", illegal.start()
+    if text == "!":
+        nextChar = source[end : end + 1] or "\0"
+        return "Expected !=, got !" + nextChar, start
+    if len(text) > 1 and text[-1] == ".":
+        return "Number required after decimal point.", end - 1
+    return "Unknown token: " + text, start
+
+
+# Drop-in replacement for Lexer: same tokens and errors, one regex match per token
+class FastLexer:
+    def __init__(self, source):
+        self.source = source + "\n"
+        self.curPos = 0
+        self.match = TOKEN_PATTERN.match
+
+    # Invalid token found, raise a LexError pointing at it
+    def abort(self, message, pos) -> None:
+        raise LexError(message, pos, *self.location(pos))
+
+    # 1-based (line, column) of a source offset, for error messages
+    def location(self, pos) -> tuple[int, int]:
+        return findLocation(self.source, pos)
+
+    # Return the next token.
+    def getToken(self) -> Token:
+        m = self.match(self.source, self.curPos)
+        group = m.lastindex
+        text = m.group(group)
+        start = m.start(group)
+        self.curPos = m.end()
+
+        if group == NEWLINE:
+            return Token(text, TokenType.NEWLINE, start)
+        if group == WORD:
+            kind = KEYWORDS.get(text)
+            if kind is None:
+                kind = TokenType.BOOLEAN if text.lower() in BOOLEANS else TokenType.IDENT
+            return Token(text, kind, start)
+        if group == OPERATOR:
+            return Token(text, OPERATORS[text], start)
+        if group == NUMBER and text[-1] != ".":
+            return Token(text, TokenType.NUMBER, start)
+        if group == STRING:
+            return Token(text, TokenType.STRING, start - 1)
+        if group == END:
+            return Token("\0", TokenType.EOF, start)
+        self.abort(*describeError(self.source, start, text, self.curPos))
@@ -0,0 +1,874 @@
+import math
+from ast_nodes import (
+    Let,
+    Print,
+    If,
+    While,
+    For,
+    Label,
+    Goto,
+    Input,
+    BinOp,
+    Unary,
+    Number,
+    Ident,
+    Index,
+    Group,
+    COMPARISON_OPS,
+)
+from optimize import literal, INT_MIN, INT_MAX, LLONG_MIN, LLONG_MAX
+
+# Without inference every LET/INPUT var is a float. With it a var becomes a long long when
+# every value assigned to it is integral, and a double otherwise. FOR vars stay ints.
+# Arrays are typed the same way from the values stored in their elements.
+#
+# A long long must not overflow where the float did not, that is undefined behavior and
+# prints another number. So an integral var also needs a bounded range of values, found
+# by interval analysis: the values of its LETs, narrowed by the IF, WHILE and FOR
+# conditions around them (LET i = i + 1 in WHILE (i < 10) stays below 11), and sums
+# over FOR loops by their trip counts. Vars that keep growing (LET x = x * 3, sums in
+# loops with no bound) and the vars of a + - * on long longs that may overflow are
+# doubles.
+#
+# The meaning of "/" must not change: in the source a var is a float, so a division
+# involving a var divides as floats even if both sides are now integers. Those divisions
+# get a (double) cast. Divisions of int literals and FOR vars stay int divisions.
+RANK = {"int": 0, "long long": 1, "float": 2, "double": 3}
+INTEGRAL = ("int", "long long")
+INF = math.inf
+UNBOUNDED = (-INF, INF)
+EMPTY = (INF, -INF)
+WIDEN_AFTER = 3  # times a range grows before its growing ends go to infinity
+NARROW_PASSES = 2  # passes that take back what widening overshot
+# Comparisons a guard can be read from: a < b is b > a
+FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "=="}
+
+
+def commonType(left, right):
+    return left if RANK[left] >= RANK[right] else right
+
+
+# The expression inside any parens
+def ungroup(node):
+    while type(node) is Group:
+        node = node.expr
+    return node
+
+
+# Whether an expression is the var name
+def isVar(node, name) -> bool:
+    node = ungroup(node)
+    return type(node) is Ident and node.name == name
+
+
+# Product of two range bounds, where 0 times an infinite bound is 0
+def times(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return a * b
+
+
+# A LET of a var, with where it is: the FOR vars in scope, the guards and loops around
+# it (see TypeInference.statements) and its increment terms if it adds to the var
+class Assignment:
+    __slots__ = ("value", "scope", "guards", "loops", "terms")
+
+    def __init__(self, value, scope, guards, loops, terms) -> None:
+        self.value = value
+        self.scope = scope
+        self.guards = guards
+        self.loops = loops
+        self.terms = terms
+
+
+# Result of the inference, the code generator reads it from Program.types
+class Types:
+    def __init__(self) -> None:
+        self.vars = {}  # var -> C type of its declaration
+        self.printTypes = {}  # id(Print) -> C type of the printed expression
+        self.realDivisions = set()  # ids of "/" between integers that must divide as doubles
+
+
+class TypeInference:
+    def __init__(self) -> None:
+        # var -> [Assignment] of its LETs (and of FOR steps of another var)
+        self.assignments = {}
+        self.inputs = set()  # vars read by INPUT, scanf needs a double for them
+        self.integral = set()  # vars currently believed to only hold integers
+        self.ranges = {}  # integral var -> (lowest, highest) value it can hold
+        self.arrays = {}  # arrays of the program -> their size
+        self.guarded = True  # whether conditions bound the vars in their bodies
+        self.countable = True  # whether a FOR runs its iterations once per entry
+        self.types = Types()
+
+    def run(self, program):
+        self.arrays = program.arrays
+        # A GOTO into a body skips its condition, a GOTO back runs loops again
+        self.guarded = not self.hasNestedLabel(program.body, False)
+        self.countable = not self.hasGoto(program.body)
+        self.collect(program.body)
+
+        # Start from "everything is integral" and demote until nothing changes. When a var
+        # is demoted, only the vars whose LETs read it have to be checked again.
+        self.integral = set(self.assignments) - self.inputs
+        readers = {}
+        rangeReaders = {}  # Vars whose range depends on the var, through guards too
+        for name, values in self.assignments.items():
+            for assignment in values:
+                for used in self.varsRead(assignment.value, assignment.scope):
+                    readers.setdefault(used, set()).add(name)
+                for used in self.varsBounding(assignment):
+                    rangeReaders.setdefault(used, set()).add(name)
+        self.demote(list(self.integral), readers)
+        while True:
+            self.findRanges(rangeReaders)
+            # Unbounded vars first, without them fewer long long operations overflow
+            unsafe = {
+                name
+                for name in self.integral
+                if self.ranges[name][0] == -INF or self.ranges[name][1] == INF
+            }
+            if not unsafe:
+                unsafe = self.overflows(program.body)
+            if not unsafe:
+                unsafe = self.negativeZeros(program.body)
+            if not unsafe:
+                break
+            self.integral -= unsafe
+            pending = [reader for name in unsafe for reader in readers.get(name, ())]
+            self.demote(pending, readers)
+
+        for name in self.assignments:
+            self.types.vars[name] = self.varType(name)
+        for name in self.inputs:
+            self.types.vars[name] = "double"
+        self.annotate(program.body, ())
+        program.types = self.types
+        return program
+
+    # Demote the pending vars that are assigned a value that is not integral, then the
+    # vars whose LETs read a demoted var
+    def demote(self, pending, readers) -> None:
+        while pending:
+            name = pending.pop()
+            if name not in self.integral:
+                continue
+            for assignment in self.assignments[name]:
+                if self.typeOf(assignment.value, assignment.scope)[0] not in INTEGRAL:
+                    self.integral.discard(name)
+                    pending.extend(readers.get(name, ()))
+                    break
+
+    def varType(self, name):
+        return "long long" if name in self.integral else "double"
+
+    def hasNestedLabel(self, body, nested) -> bool:
+        for node in body:
+            kind = type(node)
+            if kind is Label and nested:
+                return True
+            if kind is If or kind is While or kind is For:
+                if self.hasNestedLabel(node.body, True):
+                    return True
+        return False
+
+    def hasGoto(self, body) -> bool:
+        for node in body:
+            kind = type(node)
+            if kind is Goto:
+                return True
+            if kind is If or kind is While or kind is For:
+                if self.hasGoto(node.body):
+                    return True
+        return False
+
+    # Vars a LET or INPUT in body (nested bodies too) assigns
+    def assignedIn(self, body):
+        assigned = set()
+        for node in body:
+            kind = type(node)
+            if kind is Let or kind is Input:
+                assigned.add(node.name)
+            elif kind is If or kind is While or kind is For:
+                assigned |= self.assignedIn(node.body)
+        return assigned
+
+    # Yield (statement, FOR vars in scope, guards, loops) for the statements of body and
+    # the ones nested in it. guards are the comparisons known to hold at the statement,
+    # as (var, operator, bound, FOR vars in scope of the bound, guards of the bound) for
+    # var operator bound: the conditions of the IFs, WHILEs and FORs around it, up to a
+    # LET or INPUT of the var. loops are the loops around it, a (For, scope, guards)
+    # when the FOR can be counted, None for the rest. Returns the vars assigned in
+    # body.
+    def statements(self, body, scope, guards, loops):
+        assigned = set()
+        for node in body:
+            yield node, scope, guards, loops
+            kind = type(node)
+            if kind is If:
+                inner = guards + self.guardsOf(node.condition, scope, guards)
+                changed = yield from self.statements(node.body, scope, inner, loops)
+            elif kind is While:
+                # The condition is tested again after the body
+                stable = self.unassigned(guards, node.body)
+                inner = guards + self.guardsOf(node.condition, scope, stable)
+                inner = self.statements(node.body, scope, inner, loops + (None,))
+                changed = yield from inner
+            elif kind is For:
+                name = node.name
+                inner = scope + (name,)
+                outer = tuple(guard for guard in guards if guard[0] != name)
+                stable = self.unassigned(outer, node.body)
+                loop = None
+                if name not in self.assignedIn(node.body):
+                    # The counter starts at the start and moves one way
+                    outer += ((name, "from", node, scope, guards),)
+                    if self.countable and node.stepName == name:
+                        loop = (node, scope, stable)
+                outer += self.guardsOf(node.condition, inner, stable)
+                body = self.statements(node.body, inner, outer, loops + (loop,))
+                changed = yield from body
+                if node.stepName != name:
+                    changed.add(node.stepName)
+            elif kind is Let or kind is Input:
+                changed = {node.name}
+            else:
+                continue
+            if changed:
+                guards = tuple(guard for guard in guards if guard[0] not in changed)
+                assigned |= changed
+        return assigned
+
+    # The guards that still hold after body
+    def unassigned(self, guards, body):
+        if not guards:
+            return guards
+        assigned = self.assignedIn(body)
+        return tuple(guard for guard in guards if guard[0] not in assigned)
+
+    # Guards of a condition: var < bound, bound < var, ... The bound is computed where
+    # the given guards hold.
+    def guardsOf(self, condition, scope, guards):
+        condition = ungroup(condition)
+        if not self.guarded or type(condition) is not BinOp:
+            return ()
+        op = condition.op
+        if op not in FLIPPED:
+            return ()
+        left = ungroup(condition.left)
+        right = ungroup(condition.right)
+        found = ()
+        if type(left) is Ident:
+            found += ((left.name, op, condition.right, scope, guards),)
+        if type(right) is Ident:
+            found += ((right.name, FLIPPED[op], condition.left, scope, guards),)
+        return found
+
+    # Record the LETs and INPUTs of every var that is not a FOR var at that point
+    def collect(self, body) -> None:
+        for node, scope, guards, loops in self.statements(body, (), (), ()):
+            kind = type(node)
+            if kind is Let:
+                if node.name not in scope:
+                    self.assign(node.name, node.value, scope, guards, loops)
+            elif kind is Input:
+                self.inputs.add(node.name)
+            elif kind is For and node.stepName != node.name:
+                # FOR (...; i < n; j = j + 1) assigns j once per iteration
+                if node.stepName not in scope:
+                    inner = scope + (node.name,)
+                    loop = (node, scope, ()) if self.countable else None
+                    self.assign(node.stepName, node.step, inner, (), loops + (loop,))
+
+    def assign(self, name, value, scope, guards, loops) -> None:
+        terms = self.incrementTerms(name, value, scope)
+        assignment = Assignment(value, scope, guards, loops, terms)
+        self.assignments.setdefault(name, []).append(assignment)
+
+    # [(sign, term)] of the terms a LET adds to its var, like [(1, i), (-1, 1)] for
+    # LET total = total + i - 1, None when it does not just add to the var
+    def incrementTerms(self, name, value, scope):
+        terms = []
+        pending = [(1, value)]
+        while pending:
+            sign, node = pending.pop()
+            node = ungroup(node)
+            kind = type(node)
+            if kind is BinOp and (node.op == "+" or node.op == "-"):
+                pending.append((sign, node.left))
+                pending.append((-sign if node.op == "-" else sign, node.right))
+            elif kind is Unary:
+                pending.append((-sign if node.op == "-" else sign, node.operand))
+            else:
+                terms.append((sign, node))
+        own = [term for term in terms if isVar(term[1], name)]
+        if len(own) != 1 or own[0][0] < 0 or name in scope:
+            return None
+        terms.remove(own[0])
+        for _, term in terms:
+            if name in self.varsRead(term, scope):
+                return None
+        return terms
+
+    # Vars whose ranges the range of an assignment depends on
+    def varsBounding(self, assignment):
+        used = list(self.varsRead(assignment.value, assignment.scope))
+        used += self.varsGuarding(assignment.guards)
+        for loop in assignment.loops:
+            if loop is not None:
+                node, scope, guards = loop
+                inner = scope + (node.name,)
+                used += self.varsRead(node.start, scope)
+                used += self.varsRead(node.condition, inner)
+                used += self.varsRead(node.step, inner)
+                used += self.varsGuarding(guards)
+        return used
+
+    # Vars read by the bounds of guards and of the guards of those bounds. Nested guards
+    # share the guards around them, each is visited once.
+    def varsGuarding(self, guards):
+        used = []
+        seen = set()
+        pending = list(guards)
+        while pending:
+            guard = pending.pop()
+            if id(guard) in seen:
+                continue
+            seen.add(id(guard))
+            _, _, bound, boundScope, boundGuards = guard
+            if type(bound) is For:
+                used += self.varsRead(bound.start, boundScope)
+                used += self.varsRead(bound.step, boundScope + (bound.name,))
+            else:
+                used += self.varsRead(bound, boundScope)
+            pending += boundGuards
+        return used
+
+    # Ranges of the integral vars: every LET of a var widens its range to hold the
+    # value, until nothing changes. Ranges that keep growing are widened to infinity,
+    # then the guards narrow them again.
+    def findRanges(self, rangeReaders) -> None:
+        integral = self.integral
+        self.ranges = {name: self.initialRange(name) for name in integral}
+        grown = {}
+        pending = list(integral)
+        while pending:
+            name = pending.pop()
+            lowest, highest = self.ranges[name]
+            low, high = self.valueRange(name, lowest, highest)
+            if low == lowest and high == highest:
+                continue
+            grown[name] = grown.get(name, 0) + 1
+            if grown[name] > WIDEN_AFTER:
+                if low < lowest:
+                    low = -INF
+                if high > highest:
+                    high = INF
+                low, high = self.accumulated(name, low, high)
+            self.ranges[name] = (low, high)
+            readers = rangeReaders.get(name, ())
+            pending.extend(reader for reader in readers if reader in integral)
+        for _ in range(NARROW_PASSES):
+            for name in integral:
+                self.ranges[name] = self.valueRange(name, *self.initialRange(name))
+
+    # Arrays start as zeros. A var is assigned before it is read, it starts empty: as
+    # the range (INF, -INF), which holds no value.
+    def initialRange(self, name):
+        return (0, 0) if name in self.arrays else EMPTY
+
+    # Range holding low, high and the values of the LETs of a var, within what its
+    # increments can add up to
+    def valueRange(self, name, low, high):
+        for assignment in self.assignments[name]:
+            _, lowest, highest = self.interval(
+                assignment.value, assignment.scope, assignment.guards
+            )
+            low = min(low, lowest)
+            high = max(high, highest)
+        return self.accumulated(name, low, high)
+
+    # Narrow low, high to the values a var can hold when every LET of it either sets it
+    # to a value that doesn't read it or adds to it (LET total = total + i - 1) in
+    # counted FOR loops: its settings plus what each increment adds per run times the
+    # runs of its loops
+    def accumulated(self, name, low, high):
+        bases = []
+        steps = []
+        for assignment in self.assignments[name]:
+            if assignment.terms is not None:
+                steps.append(assignment)
+            elif name in self.varsRead(assignment.value, assignment.scope):
+                return low, high
+            else:
+                bases.append(assignment)
+        if not steps:
+            return low, high
+        baseLow, baseHigh = self.initialRange(name)
+        for assignment in bases:
+            _, lowest, highest = self.interval(
+                assignment.value, assignment.scope, assignment.guards
+            )
+            baseLow = min(baseLow, lowest)
+            baseHigh = max(baseHigh, highest)
+        if baseLow > baseHigh:
+            return low, high  # No value set yet
+        tripCounts = {}  # id of a loop -> its trips, the increments share their loops
+        for assignment in steps:
+            runs = 1
+            for loop in assignment.loops:
+                key = id(loop)
+                if key not in tripCounts:
+                    tripCounts[key] = self.trips(loop)
+                runs = times(runs, tripCounts[key])
+            stepLow = stepHigh = 0
+            for sign, term in assignment.terms:
+                _, lowest, highest = self.interval(
+                    term, assignment.scope, assignment.guards
+                )
+                if lowest > highest:
+                    # A var it adds has no value yet, the increment can't run
+                    stepLow = stepHigh = 0
+                    break
+                if sign < 0:
+                    lowest, highest = -highest, -lowest
+                stepLow += lowest
+                stepHigh += highest
+            baseLow += times(runs, min(stepLow, 0))
+            baseHigh += times(runs, max(stepHigh, 0))
+        return max(low, baseLow), min(high, baseHigh)
+
+    # Most iterations a FOR of a loops entry runs each time it is entered, INF for a
+    # WHILE or a FOR that can't be counted
+    def trips(self, loop):
+        if loop is None:
+            return INF
+        node, scope, guards = loop
+        inner = scope + (node.name,)
+        step = self.stepRange(node, inner)
+        condition = ungroup(node.condition)
+        if step is None or type(condition) is not BinOp:
+            return INF
+        if isVar(condition.left, node.name):
+            op, bound = condition.op, condition.right
+        elif isVar(condition.right, node.name):
+            op, bound = FLIPPED.get(condition.op), condition.left
+        else:
+            return INF
+        if node.name in self.varsRead(bound, ()):
+            return INF
+        _, boundLow, boundHigh = self.interval(bound, inner, guards)
+        _, startLow, startHigh = self.interval(node.start, scope, guards)
+        if step[0] > 0 and op in ("<", "<="):
+            distance, size = boundHigh - startLow, step[0]
+        elif step[1] < 0 and op in (">", ">="):
+            distance, size = startHigh - boundLow, -step[1]
+        else:
+            return INF
+        if distance == INF:
+            return INF
+        if distance < 0:
+            return 0  # Also when the start or the bound has no value yet
+        return math.floor(distance / size) + 1
+
+    # (lowest, highest) change of the counter of a FOR per iteration, None unless its
+    # step is counter + change or counter - change
+    def stepRange(self, node, inner):
+        step = ungroup(node.step)
+        if type(step) is not BinOp or step.op not in ("+", "-"):
+            return None
+        if isVar(step.left, node.name):
+            change = step.right
+        elif step.op == "+" and isVar(step.right, node.name):
+            change = step.left
+        else:
+            return None
+        if node.name in self.varsRead(change, ()):
+            return None
+        _, low, high = self.interval(change, inner, ())
+        if step.op == "-":
+            low, high = -high, -low
+        if low <= 0 <= high:
+            return None
+        return low, high
+
+    # Integral vars read by a + - * on long longs that may overflow
+    def overflows(self, body):
+        unsafe = set()
+        for node, scope, guards, _ in self.statements(body, (), (), ()):
+            kind = type(node)
+            if kind is Let or kind is Input:
+                if node.index is not None:
+                    self.interval(node.index, scope, guards, unsafe)
+                if kind is Let:
+                    self.interval(node.value, scope, guards, unsafe)
+            elif kind is Print:
+                if not isinstance(node.value, str):
+                    self.interval(node.value, scope, guards, unsafe)
+            elif kind is If:
+                self.interval(node.condition, scope, guards, unsafe)
+            elif kind is While:
+                self.interval(node.condition, scope, (), unsafe)  # Also after the body
+            elif kind is For:
+                inner = scope + (node.name,)
+                self.interval(node.start, inner, (), unsafe)
+                self.interval(node.condition, inner, (), unsafe)
+                self.interval(node.step, inner, (), unsafe)
+        return unsafe
+
+    # Integral vars of the operations that make a -0.0 of the source 0, because the C
+    # computes them on integers, where the sign of that zero shows: PRINT writes -0.00,
+    # and -0.0 * -1 is 0.0. Those vars must be doubles.
+    def negativeZeros(self, body):
+        harmful = []
+        for node, scope, guards, _ in self.statements(body, (), (), ()):
+            kind = type(node)
+            if kind is Let or kind is Print and not isinstance(node.value, str):
+                lost = []
+                self.negativeZero(node.value, scope, guards, lost, harmful)
+                harmful += [(item, scope) for item in lost]
+            if (kind is Let or kind is Input) and node.index is not None:
+                self.negativeZero(node.index, scope, guards, [], harmful)
+            elif kind is If:
+                self.negativeZero(node.condition, scope, guards, [], harmful)
+            elif kind is While:
+                self.negativeZero(node.condition, scope, (), [], harmful)
+            elif kind is For:
+                inner = scope + (node.name,)
+                for part in (node.start, node.condition, node.step):
+                    self.negativeZero(part, inner, (), [], harmful)
+        unsafe = set()
+        for item, scope in harmful:
+            used = self.varsRead(item, scope)
+            unsafe.update(name for name in used if name in self.integral)
+        return unsafe
+
+    # (whether an expression can be -0.0 in the source, where vars are floats, its
+    # typeOf, its interval). The operations that make that -0.0 but give 0 in the C are
+    # added to lost, and the lost -0.0s that change the sign of an operation on them to
+    # harmful, as (node, scope). Types and intervals are built bottom up, in one walk.
+    def negativeZero(self, node, scope, guards, lost, harmful):
+        kind = type(node)
+        if kind is Number or kind is Ident or kind is Index:
+            if kind is Number:
+                value = literal(node.text)[0]
+                negative = value == 0 and math.copysign(1.0, value) < 0
+            else:
+                # A double var keeps the -0.0 of its LETs and INPUTs, the LETs of an
+                # integral var are checked to never store one
+                negative = node.name not in scope and node.name not in self.integral
+            types = self.typeOf(node, scope)
+            return negative, types, self.interval(node, scope, guards)
+        if kind is Group:
+            return self.negativeZero(node.expr, scope, guards, lost, harmful)
+        if kind is Unary:
+            if node.op == "+":
+                return self.negativeZero(node.operand, scope, guards, lost, harmful)
+            # -(-0.0) is 0.0 like -(0) on integers, so a lost operand does no harm
+            operand = self.negativeZero(node.operand, scope, guards, [], harmful)
+            _, types, (ctype, low, high) = operand
+            interval = self.negatedInterval(node, scope, operand[2], None)
+            negative = types[1] not in INTEGRAL and low <= 0 <= high
+            if negative and types[0] in INTEGRAL:
+                lost.append(node)
+            return negative, types, interval
+
+        leftLost = []
+        rightLost = []
+        left, leftTypes, leftInterval = self.negativeZero(
+            node.left, scope, guards, leftLost, harmful
+        )
+        right, rightTypes, rightInterval = self.negativeZero(
+            node.right, scope, guards, rightLost, harmful
+        )
+        op = node.op
+        types = self.binaryType(op, leftTypes, rightTypes)
+        interval = self.binaryInterval(
+            node, scope, leftInterval, rightInterval, types[0], None
+        )
+        if op in COMPARISON_OPS or types[1] in INTEGRAL:
+            return False, types, interval
+        _, a, b = leftInterval
+        _, c, d = rightInterval
+        leftZero = a <= 0 <= b
+        rightZero = c <= 0 <= d
+        if op == "+":
+            negative = left and right  # -0.0 + 0.0 is 0.0
+            if negative:
+                lost += leftLost + rightLost
+            return negative, types, interval
+        if op == "-":
+            negative = left and rightZero
+            if negative:
+                lost += leftLost
+            if left:
+                harmful += [(item, scope) for item in rightLost]  # -0.0 - -0.0 is 0.0
+            return negative, types, interval
+        # The sign of a zero product or quotient is the sign of the operands
+        harmful += [(item, scope) for item in leftLost + rightLost]
+        # 0.0 times or over a negative, -0.0 times or over a positive
+        negative = leftZero and (c < 0 or right) or left and (d > 0 or rightZero)
+        if op == "*" and not negative:
+            negative = rightZero and (a < 0 or left) or right and (b > 0 or leftZero)
+        if negative and types[0] in INTEGRAL:
+            lost.append(node)
+        return negative, types, interval
+
+    # (C type, lowest value, highest value) of an expression with the current ranges.
+    # Bounds past a long long are infinite. With unsafe, the integral vars read by a
+    # + - * on long longs that may overflow are added to it.
+    def interval(self, node, scope, guards, unsafe=None):
+        kind = type(node)
+        if kind is Number:
+            value, ctype = literal(node.text)
+            return ctype, value, value
+        if kind is Ident:
+            name = node.name
+            if name in scope:
+                ctype, low, high = "int", INT_MIN, INT_MAX
+            else:
+                ctype = self.varType(name)
+                low, high = self.ranges.get(name, UNBOUNDED)
+            for guarded, op, bound, boundScope, boundGuards in guards:
+                if guarded == name:
+                    low, high = self.narrow(
+                        low, high, op, bound, boundScope, boundGuards
+                    )
+            return ctype, low, high
+        if kind is Index:
+            return (self.varType(node.name),) + self.ranges.get(node.name, UNBOUNDED)
+        if kind is Group:
+            return self.interval(node.expr, scope, guards, unsafe)
+        if kind is Unary:
+            operand = self.interval(node.operand, scope, guards, unsafe)
+            if node.op == "+":
+                return operand
+            return self.negatedInterval(node, scope, operand, unsafe)
+
+        left = self.interval(node.left, scope, guards, unsafe)
+        right = self.interval(node.right, scope, guards, unsafe)
+        quotientType = self.typeOf(node, scope)[0] if node.op == "/" else None
+        return self.binaryInterval(node, scope, left, right, quotientType, unsafe)
+
+    # Interval of -operand
+    def negatedInterval(self, node, scope, operand, unsafe):
+        ctype, low, high = operand
+        if low > high:
+            return operand
+        return self.checked(node, scope, ctype, -high, -low, unsafe)
+
+    # Interval of a BinOp from the intervals of its operands, quotientType is the C type
+    # of a "/"
+    def binaryInterval(self, node, scope, left, right, quotientType, unsafe):
+        leftType, a, b = left
+        rightType, c, d = right
+        op = node.op
+        if op in COMPARISON_OPS:
+            return "int", 0, 1
+        ctype = commonType(leftType, rightType)
+        if a > b or c > d:
+            return (ctype,) + EMPTY  # An operand has no value yet
+        if op == "+":
+            low, high = a + c, b + d
+        elif op == "-":
+            low, high = a - d, b - c
+        elif op == "*":
+            products = (times(a, c), times(a, d), times(b, c), times(b, d))
+            low, high = min(products), max(products)
+        else:
+            ctype = quotientType
+            if ctype not in INTEGRAL:
+                return ctype, -INF, INF
+            high = max(-a, b)  # A quotient of integers is no bigger than the dividend
+            low = -high
+        return self.checked(node, scope, ctype, low, high, unsafe)
+
+    # Range of an arithmetic result: an int that overflowed can be any int, a long long
+    # that may overflow makes its vars unsafe
+    def checked(self, node, scope, ctype, low, high, unsafe):
+        if low < LLONG_MIN or low > LLONG_MAX:
+            low = -INF
+        if high > LLONG_MAX or high < LLONG_MIN:
+            high = INF
+        if ctype == "int" and (low < INT_MIN or high > INT_MAX):
+            return ctype, INT_MIN, INT_MAX
+        if ctype == "long long" and unsafe is not None and (low == -INF or high == INF):
+            used = self.varsRead(node, scope)
+            unsafe.update(name for name in used if name in self.integral)
+        return ctype, low, high
+
+    # Narrow the range of an integral var to the values for which var op bound holds. A
+    # "from" bound is a FOR whose counter the var is.
+    def narrow(self, low, high, op, bound, boundScope, boundGuards):
+        if low > high:
+            return low, high
+        if op == "from":
+            step = self.stepRange(bound, boundScope + (bound.name,))
+            if step is not None:
+                start = self.interval(bound.start, boundScope, boundGuards)
+                _, startLow, startHigh = start
+                if step[0] > 0:
+                    low = max(low, startLow)
+                else:
+                    high = min(high, startHigh)
+            return low, high
+        _, boundLow, boundHigh = self.interval(bound, boundScope, boundGuards)
+        if boundLow > boundHigh:
+            return EMPTY  # The bound has no value yet
+        if op in ("<", "<=", "==") and boundHigh != INF:
+            limit = math.ceil(boundHigh) - 1 if op == "<" else math.floor(boundHigh)
+            high = min(high, limit)
+        if op in (">", ">=", "==") and boundLow != -INF:
+            limit = math.floor(boundLow) + 1 if op == ">" else math.ceil(boundLow)
+            low = max(low, limit)
+        if low > high:
+            return low, low  # The body can't run with these values yet
+        return low, high
+
+    def varsRead(self, node, scope):
+        kind = type(node)
+        if kind is Ident:
+            return () if node.name in scope else (node.name,)
+        if kind is Index:
+            return (node.name,)  # The index does not change the type of the element
+        if kind is BinOp:
+            return self.varsRead(node.left, scope) + self.varsRead(node.right, scope)
+        if kind is Unary:
+            return self.varsRead(node.operand, scope)
+        if kind is Group:
+            return self.varsRead(node.expr, scope)
+        return ()
+
+    # Return (C type with the inferred var types, C type in the source where vars are floats)
+    def typeOf(self, node, scope):
+        kind = type(node)
+        if kind is Number:
+            ctype = literal(node.text)[1]
+            if ctype == "long long":
+                return ctype, "float"  # A long long var folded into its value
+            return ctype, ctype
+        if kind is Ident:
+            if node.name in scope:
+                return "int", "int"
+            return self.varType(node.name), "float"
+        if kind is Index:
+            return self.varType(node.name), "float"
+        if kind is Group:
+            return self.typeOf(node.expr, scope)
+        if kind is Unary:
+            return self.typeOf(node.operand, scope)
+        left = self.typeOf(node.left, scope)
+        return self.binaryType(node.op, left, self.typeOf(node.right, scope))
+
+    # Types of a BinOp from the types of its operands
+    def binaryType(self, op, left, right):
+        if op in COMPARISON_OPS:
+            return "int", "int"
+        source = commonType(left[1], right[1])
+        ctype = commonType(left[0], right[0])
+        if op == "/" and source not in INTEGRAL and ctype in INTEGRAL:
+            ctype = "double"
+        return ctype, source
+
+    # Record print types and the divisions that need a cast, now that var types are final
+    def annotate(self, body, scope) -> None:
+        for node in body:
+            kind = type(node)
+            if kind is Print:
+                if not isinstance(node.value, str):
+                    self.types.printTypes[id(node)] = self.typeOf(node.value, scope)[0]
+                    self.findDivisions(node.value, scope)
+            elif kind is Let:
+                self.findDivisions(node.value, scope)
+                if node.index is not None:
+                    self.findDivisions(node.index, scope)
+            elif kind is Input:
+                if node.index is not None:
+                    self.findDivisions(node.index, scope)
+            elif kind is If or kind is While:
+                self.findDivisions(node.condition, scope)
+                self.annotate(node.body, scope)
+            elif kind is For:
+                inner = scope + (node.name,)
+                self.findDivisions(node.start, inner)
+                self.findDivisions(node.condition, inner)
+                self.findDivisions(node.step, inner)
+                self.annotate(node.body, inner)
+
+    def findDivisions(self, node, scope) -> None:
+        kind = type(node)
+        if kind is BinOp:
+            if node.op == "/":
+                left, leftSource = self.typeOf(node.left, scope)
+                right, rightSource = self.typeOf(node.right, scope)
+                if (
+                    left in INTEGRAL
+                    and right in INTEGRAL
+                    and commonType(leftSource, rightSource) not in INTEGRAL
+                ):
+                    self.types.realDivisions.add(id(node))
+            self.findDivisions(node.left, scope)
+            self.findDivisions(node.right, scope)
+        elif kind is Unary:
+            self.findDivisions(node.operand, scope)
+        elif kind is Group:
+            self.findDivisions(node.expr, scope)
+        elif kind is Index:
+            self.findDivisions(node.index, scope)
+
+
+# C types of expressions the way the code generator writes them, for passes walking the
+# final tree: FOR vars in scope are ints, then temps, then inferred types or floats
+class ExpressionTypes:
+    def __init__(self) -> None:
+        self.types = None  # Types of the program, None when every var is a float
+        self.temps = {}  # the program's temps, var -> C type
+        self.scopes = []  # vars of the FOR loops we are in
+
+    def varType(self, name):
+        if name in self.scopes:
+            return "int"
+        if name in self.temps:
+            return self.temps[name]
+        if self.types is None:
+            return "float"
+        return self.types.vars.get(name, "double")
+
+    # C type of an expression, like the code generator writes it. Walks the tree with a
+    # stack, so deep expressions don't hit the recursion limit.
+    def typeOf(self, node):
+        types = []  # Types of the operands done so far
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            kind = type(node)
+            if kind is Number:
+                value, ctype = literal(node.text)
+                if ctype == "int" and value > INT_MAX:
+                    ctype = "long long"  # Too big for an int, C makes it a long
+                types.append(ctype)
+            elif kind is Ident or kind is Index:
+                types.append(self.varType(node.name))
+            elif kind is BinOp:
+                if node.op in COMPARISON_OPS:
+                    types.append("int")
+                elif self.types is not None and id(node) in self.types.realDivisions:
+                    types.append("double")
+                else:
+                    stack += (COMBINE, node.right, node.left)
+            elif kind is Group:
+                stack.append(node.expr)
+            elif kind is Unary:
+                stack.append(node.operand)
+            else:  # COMBINE: both operands of a BinOp are done
+                right = types.pop()
+                types[-1] = commonType(types[-1], right)
+        return types[0]
+
+
+# Stack marker of ExpressionTypes.typeOf
+COMBINE = object()
+
+# Pick int/double C types for the vars of a program, stored in program.types
+def inferTypes(program):
+    return TypeInference().run(program)
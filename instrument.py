@@ -0,0 +1,194 @@
+from ast_nodes import Let, Print, If, While, For, Label, Goto, Input, Dim
+from codegen import CGenerator
+
+# Code generator for profiling builds. Every statement increments its own counter, each
+# WHILE/FOR counts its iterations and adds up the wall time spent in it, and at exit (also
+# on Ctrl-C) the program writes a report mapping the counters back to .yolo lines, to
+# stderr or to the file named by $YOLO_PROFILE. Normal builds use CGenerator and pay
+# nothing.
+#
+# A GOTO that leaves loops stops their clocks before jumping, and one into loops starts
+# theirs, so loop times stay right whatever the control flow.
+KINDS = {
+    Let: "LET",
+    Print: "PRINT",
+    If: "IF",
+    While: "WHILE",
+    For: "FOR",
+    Label: "LABEL",
+    Goto: "GOTO",
+    Input: "INPUT",
+}
+
+
+class InstrumentedCGenerator(CGenerator):
+    coalescePrints = False  # every PRINT has its own counter
+    parallelLoops = False  # the counters are not shared between threads
+
+    def __init__(self, emitter) -> None:
+        super().__init__(emitter)
+        self.counters = []  # (line, kind) of each counter
+        self.loops = []  # (line, kind) of each loop timer
+        self.loopIds = {}  # id(loop node) -> its timer
+        self.loopStack = []  # timers of the loops being generated
+        self.labelLoops = {}  # label -> timers of the loops it is in
+
+    def program(self, program) -> None:
+        self.findLoops(program.body, ())
+        super().program(program)
+
+    # Number the loops and record which loops each label is in
+    def findLoops(self, body, loops) -> None:
+        for node in body:
+            kind = type(node)
+            if kind is Label:
+                self.labelLoops[node.name] = loops
+            elif kind is While or kind is For:
+                timer = len(self.loops)
+                self.loopIds[id(node)] = timer
+                self.loops.append((node.line or 0, KINDS[kind]))
+                self.findLoops(node.body, loops + (timer,))
+            elif kind is If:
+                self.findLoops(node.body, loops)
+
+    def begin(self) -> None:
+        super().begin()
+        self.emitter.emitLine("yolo_prof_start();")
+
+    def end(self) -> None:
+        super().end()
+        self.prelude()
+
+    def statement(self, node) -> None:
+        kind = type(node)
+        if kind is Dim:
+            return  # Only declares the array, nothing runs
+        counter = len(self.counters)
+        self.counters.append((node.line or 0, KINDS[kind]))
+        if kind is Label:
+            # Count after the label, so jumps to it are counted too
+            super().statement(node)
+            self.emitter.emitLine("yolo_prof_hits[" + str(counter) + "]++;")
+            return
+        self.emitter.emitLine("yolo_prof_hits[" + str(counter) + "]++;")
+        if kind is Goto:
+            self.jumpTimers(node.name)
+        if kind is While or kind is For:
+            timer = self.loopIds[id(node)]
+            self.startTimer(timer)
+            self.loopStack.append(timer)
+            super().statement(node)
+            self.loopStack.pop()
+            self.stopTimer(timer)
+        else:
+            super().statement(node)
+
+    def loopBody(self, node) -> None:
+        timer = str(self.loopIds[id(node)])
+        self.emitter.emitLine("yolo_prof_iterations[" + timer + "]++;")
+        super().loopBody(node)
+
+    def startTimer(self, timer) -> None:
+        timer = str(timer)
+        self.emitter.emitLine("yolo_prof_loop_start[" + timer + "] = yolo_prof_now();")
+
+    def stopTimer(self, timer) -> None:
+        timer = str(timer)
+        self.emitter.emitLine(
+            "yolo_prof_loop_time["
+            + timer
+            + "] += yolo_prof_now() - yolo_prof_loop_start["
+            + timer
+            + "];"
+        )
+
+    # Before a GOTO: stop the clocks of the loops it leaves, start those it enters
+    def jumpTimers(self, label) -> None:
+        target = self.labelLoops[label]
+        for timer in reversed(self.loopStack):
+            if timer not in target:
+                self.stopTimer(timer)
+        for timer in target:
+            if timer not in self.loopStack:
+                self.startTimer(timer)
+
+    # Counters, clock and report, written before main once their sizes are known
+    def prelude(self) -> None:
+        emitter = self.emitter
+        emitter.includeLine("#include <signal.h>")
+        emitter.includeLine("#include <stdlib.h>")
+        emitter.includeLine("#include <time.h>")
+        statements = max(1, len(self.counters))  # C has no empty arrays
+        loops = max(1, len(self.loops))
+        emitter.preludeLine("static long long yolo_prof_hits[%d];" % statements)
+        emitter.preludeLine(
+            "static const int yolo_prof_lines[%d] = {%s};"
+            % (statements, ",".join(str(line) for line, kind in self.counters) or "0")
+        )
+        emitter.preludeLine(
+            "static const char *yolo_prof_kinds[%d] = {%s};"
+            % (
+                statements,
+                ",".join('"' + kind + '"' for line, kind in self.counters) or '""',
+            )
+        )
+        emitter.preludeLine("static long long yolo_prof_iterations[%d];" % loops)
+        emitter.preludeLine("static double yolo_prof_loop_start[%d];" % loops)
+        emitter.preludeLine("static double yolo_prof_loop_time[%d];" % loops)
+        emitter.preludeLine(
+            "static const int yolo_prof_loop_lines[%d] = {%s};"
+            % (loops, ",".join(str(line) for line, kind in self.loops) or "0")
+        )
+        emitter.preludeLine(
+            "static const char *yolo_prof_loop_kinds[%d] = {%s};"
+            % (loops, ",".join('"' + kind + '"' for line, kind in self.loops) or '""')
+        )
+        emitter.preludeLine("static double yolo_prof_now(void){")
+        emitter.preludeLine("struct timespec now;")
+        emitter.preludeLine("clock_gettime(CLOCK_MONOTONIC, &now);")
+        emitter.preludeLine("return now.tv_sec + now.tv_nsec * 1e-9;")
+        emitter.preludeLine("}")
+        emitter.preludeLine("static void yolo_prof_report(void){")
+        emitter.preludeLine("FILE *out = stderr;")
+        emitter.preludeLine('const char *path = getenv("YOLO_PROFILE");')
+        emitter.preludeLine('if(path && !(out = fopen(path, "w"))) out = stderr;')
+        emitter.preludeLine("long long total = 0;")
+        emitter.preludeLine(
+            "for(int i = 0; i < %d; i++) total += yolo_prof_hits[i];" % statements
+        )
+        emitter.preludeLine('fprintf(out, "profile: %lld statements executed\\n", total);')
+        emitter.preludeLine(
+            'fprintf(out, "%6s %-6s %14s %7s\\n", "line", "stmt", "count", "%");'
+        )
+        emitter.preludeLine("for(int i = 0; i < %d; i++){" % len(self.counters))
+        emitter.preludeLine(
+            'if(yolo_prof_hits[i]) fprintf(out, "%6d %-6s %14lld %6.2f%%\\n", '
+            "yolo_prof_lines[i], yolo_prof_kinds[i], yolo_prof_hits[i], "
+            "100.0 * yolo_prof_hits[i] / total);"
+        )
+        emitter.preludeLine("}")
+        if self.loops:
+            emitter.preludeLine(
+                'fprintf(out, "%6s %-6s %14s %12s\\n", '
+                '"line", "loop", "iterations", "seconds");'
+            )
+            emitter.preludeLine("for(int i = 0; i < %d; i++){" % len(self.loops))
+            emitter.preludeLine(
+                'fprintf(out, "%6d %-6s %14lld %12.6f\\n", yolo_prof_loop_lines[i], '
+                "yolo_prof_loop_kinds[i], yolo_prof_iterations[i], "
+                "yolo_prof_loop_time[i]);"
+            )
+            emitter.preludeLine("}")
+        emitter.preludeLine("if(out != stderr) fclose(out);")
+        emitter.preludeLine("}")
+        # exit() runs the report and flushes stdout, not strictly signal-safe but fine
+        # for a profiling build
+        emitter.preludeLine("static void yolo_prof_interrupt(int sig){")
+        if self.output:
+            emitter.preludeLine("yolo_flush();")
+        emitter.preludeLine("exit(128 + sig);")
+        emitter.preludeLine("}")
+        emitter.preludeLine("static void yolo_prof_start(void){")
+        emitter.preludeLine("atexit(yolo_prof_report);")
+        emitter.preludeLine("signal(SIGINT, yolo_prof_interrupt);")
+        emitter.preludeLine("}")
@@ -1,5 +1,5 @@
-import sys
-from token_1 import TokenType, Token
+from token_1 import TokenType, Token, findLocation
+from errors import LexError
 
 
 class Lexer:
@@ -24,9 +24,13 @@ class Lexer:
             return "\0"  # End of text
         return self.source[self.curPos + 1]
 
-    # Invalid token found, print error message and exit.
+    # Invalid token found, raise a LexError pointing at it
     def abort(self, message) -> None:
-        sys.exit("Lexing error: " + message)
+        raise LexError(message, self.curPos, *self.location(self.curPos))
+
+    # 1-based (line, column) of a source offset, for error messages
+    def location(self, pos) -> tuple[int, int]:
+        return findLocation(self.source, pos)
 
     # Skip whitespace except newlines, which we will use to indicate the end of a statement.
     def skipWhitespace(self) -> None:
@@ -44,6 +48,7 @@ class Lexer:
         self.skipWhitespace()
         self.skipComment()
         token = None
+        tokenPos = self.curPos
 
         # Operator tokens
         if self.curChar == "+":
@@ -87,9 +92,8 @@ class Lexer:
                 token = Token(self.curChar, TokenType.LT)
         elif self.curChar == "!":
             if self.peek() == "=":
-                lastChar = self.curChar
                 self.nextChar()
-                token = Token(self.curChar, TokenType.NOTEQ)
+                token = Token("!=", TokenType.NOTEQ)
             else:
                 self.abort("Expected !=, got !" + self.peek())
         elif self.curChar == '"':
@@ -103,7 +107,6 @@ class Lexer:
             token = Token(tokText, TokenType.STRING)
         elif self.curChar == ";":
             token = Token(self.curChar, TokenType.SEMICOLON)
-            self.nextChar()
         elif self.curChar.isdigit():
             # Leading char is a digit, so this should be a number
             startPos = self.curPos
@@ -133,5 +136,6 @@ class Lexer:
         else:
             # Unknown token
             self.abort("Unknown token: " + self.curChar)
+        token.pos = tokenPos
         self.nextChar()
         return token
@@ -0,0 +1,571 @@
+from ast_nodes import (
+    Let,
+    Print,
+    If,
+    While,
+    For,
+    Label,
+    Input,
+    BinOp,
+    Unary,
+    Number,
+    Ident,
+    Index,
+    Group,
+    COMPARISON_OPS,
+)
+from optimize import literal, INT_MAX
+from infer import INTEGRAL, ExpressionTypes
+
+# Loop optimizations on the final tree, after type inference, so every var made here gets
+# the exact C type of the expression it stands for and the generated program computes the
+# same values in the same types:
+#
+# - Loop invariant expressions (only literals and vars no statement of the loop assigns)
+#   are computed once, into a yolo_tN var assigned right before the loop.
+# - In a loop with an induction var (the FOR var stepped by a constant, or a WHILE var
+#   changed by one LET v = v + c), i*k with k invariant becomes a var that starts at
+#   start*k and is increased by c*k per iteration. Only for integer products, which are
+#   exact, a float product would round differently. And only for products computed
+#   more than once per iteration (in several places or in an inner loop): the update
+#   costs as much as one multiplication.
+# - FOR loops counting from an invariant start to an invariant bound are recognized: the
+#   trip count is reported when it is constant, and loops that never run are removed.
+#
+# Loops with a LABEL inside are left alone, a GOTO could enter them without going through
+# the statements put before the loop. An array element is never hoisted, reading it before
+# a loop that does not run could go out of bounds, but its index can be.
+
+
+# Source text of an expression, for the report
+def describe(node) -> str:
+    kind = type(node)
+    if kind is Number:
+        return node.text
+    if kind is Ident:
+        return node.name
+    if kind is Index:
+        return node.name + "(" + describe(node.index) + ")"
+    if kind is Group:
+        return "(" + describe(node.expr) + ")"
+    if kind is Unary:
+        return node.op + describe(node.operand)
+    return describe(node.left) + " " + node.op + " " + describe(node.right)
+
+
+def strip(node):
+    while type(node) is Group:
+        node = node.expr
+    return node
+
+
+# Value of an int literal (after parens and a sign), None for anything else
+def intConstant(node):
+    node = strip(node)
+    negative = False
+    if type(node) is Unary:
+        negative = node.op == "-"
+        node = strip(node.operand)
+    if type(node) is not Number:
+        return None
+    value, ctype = literal(node.text)
+    if ctype != "int" or value > INT_MAX:
+        return None
+    return -value if negative else value
+
+
+class LoopOptimizer(ExpressionTypes):
+    def __init__(self, report=None, parallel=False) -> None:
+        super().__init__()
+        self.report = report if report is not None else []
+        self.parallel = parallel  # leave FOR loops without loop-carried temps
+
+    def run(self, program):
+        self.types = program.types
+        self.temps = program.temps
+        program.body = self.block(program.body)
+        return program
+
+    def note(self, loop, message) -> None:
+        self.report.append("line " + str(loop.line) + ": " + message)
+
+    def newTemp(self, ctype) -> str:
+        name = "yolo_t" + str(len(self.temps))
+        self.temps[name] = ctype
+        return name
+
+    # Statements
+    # --------------------------------------
+
+    # Optimize the loops of a body, outer loops first, returning the new body
+    def block(self, body):
+        result = []
+        for node in body:
+            kind = type(node)
+            if kind is If:
+                node.body = self.block(node.body)
+            elif kind is While or kind is For:
+                if not self.hasLabel(node.body):
+                    before = self.loop(node)
+                    if before is None:
+                        continue  # The loop never runs
+                    result.extend(before)
+                if kind is For:
+                    self.scopes.append(node.name)
+                node.body = self.block(node.body)
+                if kind is For:
+                    self.scopes.pop()
+            result.append(node)
+        return result
+
+    def hasLabel(self, body) -> bool:
+        for node in body:
+            kind = type(node)
+            if kind is Label:
+                return True
+            if (kind is If or kind is While or kind is For) and self.hasLabel(node.body):
+                return True
+        return False
+
+    # Vars a statement list assigns, FOR headers included
+    def assigned(self, body, names) -> set:
+        for node in body:
+            kind = type(node)
+            if kind is Let or kind is Input:
+                names.add(node.name)
+            elif kind is For:
+                names.add(node.name)
+                names.add(node.stepName)
+                self.assigned(node.body, names)
+            elif kind is If or kind is While:
+                self.assigned(node.body, names)
+        return names
+
+    # Transform one loop, returning the statements to put before it, or None to drop it
+    def loop(self, node):
+        variant = self.assigned(node.body, set())
+        self.variant = variant | self.assigned([node], set())
+        self.before = []
+        self.hoisted = {}  # exprKey of an invariant expression -> temp
+        kind = type(node)
+        if kind is For:
+            self.scopes.append(node.name)
+        try:
+            induction = self.induction(node, variant)
+            if kind is For and induction is not None and not self.counted(node):
+                return None
+            node.condition = self.hoist(node.condition, node)
+            if kind is For:
+                node.step = self.hoist(node.step, node)
+            self.hoistBody(node.body, node)
+            if induction is not None:
+                self.reduce(node, induction)
+        finally:
+            if kind is For:
+                self.scopes.pop()
+        return self.before
+
+    # Invariant code motion
+    # --------------------------------------
+
+    def hoistBody(self, body, loop) -> None:
+        for node in body:
+            kind = type(node)
+            if kind is Let:
+                node.value = self.hoist(node.value, loop)
+                if node.index is not None:
+                    node.index = self.hoist(node.index, loop)
+            elif kind is Input:
+                if node.index is not None:
+                    node.index = self.hoist(node.index, loop)
+            elif kind is Print:
+                if not isinstance(node.value, str):
+                    node.value = self.hoist(node.value, loop)
+            elif kind is If or kind is While:
+                node.condition = self.hoist(node.condition, loop)
+                self.hoistBody(node.body, loop)
+            elif kind is For:
+                self.scopes.append(node.name)
+                node.start = self.hoist(node.start, loop)
+                node.condition = self.hoist(node.condition, loop)
+                node.step = self.hoist(node.step, loop)
+                self.hoistBody(node.body, loop)
+                self.scopes.pop()
+
+    # Replace the largest invariant operations of an expression by temps
+    def hoist(self, node, loop):
+        kind = type(node)
+        if kind is BinOp:
+            if self.isInvariant(node) and self.usesVar(node) and self.cannotTrap(node):
+                return Ident(self.temp(node, loop))
+            node.left = self.hoist(node.left, loop)
+            node.right = self.hoist(node.right, loop)
+        elif kind is Unary:
+            node.operand = self.hoist(node.operand, loop)
+        elif kind is Index:
+            node.index = self.hoist(node.index, loop)
+        elif kind is Group:
+            node.expr = self.hoist(node.expr, loop)
+            if type(node.expr) is Ident:
+                return node.expr  # (temp) needs no parens
+        return node
+
+    # Temp computed before the loop holding the value of an invariant expression
+    def temp(self, node, loop) -> str:
+        key = self.exprKey(node)
+        if key not in self.hoisted:
+            name = self.newTemp(self.typeOf(node))
+            self.hoisted[key] = name
+            self.before.append(Let(name, node, loop.line))
+            self.note(loop, "hoisted " + describe(node) + " out of the loop as " + name)
+        return self.hoisted[key]
+
+    # Equal for expressions computing the same value in the same C type
+    def exprKey(self, node):
+        kind = type(node)
+        if kind is Number:
+            return node.text
+        if kind is Ident:
+            return ("var", node.name)
+        if kind is Index:
+            return ("item", node.name, self.exprKey(node.index))
+        if kind is Group:
+            return self.exprKey(node.expr)
+        if kind is Unary:
+            return (node.op, self.exprKey(node.operand))
+        return (
+            self.exprKey(node.left),
+            node.op,
+            self.exprKey(node.right),
+            self.types is not None and id(node) in self.types.realDivisions,
+        )
+
+    def isInvariant(self, node) -> bool:
+        kind = type(node)
+        if kind is Number:
+            return True
+        if kind is Ident:
+            return node.name not in self.variant
+        if kind is Index:
+            return node.name not in self.variant and self.isInvariant(node.index)
+        if kind is Group:
+            return self.isInvariant(node.expr)
+        if kind is Unary:
+            return self.isInvariant(node.operand)
+        return self.isInvariant(node.left) and self.isInvariant(node.right)
+
+    # Expressions of literals only are left to constant folding
+    def usesVar(self, node) -> bool:
+        kind = type(node)
+        if kind is Ident or kind is Index:
+            return True
+        if kind is Group:
+            return self.usesVar(node.expr)
+        if kind is Unary:
+            return self.usesVar(node.operand)
+        if kind is BinOp:
+            return self.usesVar(node.left) or self.usesVar(node.right)
+        return False
+
+    # A loop may not run at all, so nothing that can trap is computed before it: integer
+    # divisions only move when they divide by a constant other than 0 and -1, and array
+    # elements never do
+    def cannotTrap(self, node) -> bool:
+        kind = type(node)
+        if kind is Index:
+            return False
+        if kind is Group:
+            return self.cannotTrap(node.expr)
+        if kind is Unary:
+            return self.cannotTrap(node.operand)
+        if kind is not BinOp:
+            return True
+        if node.op == "/" and self.typeOf(node) in INTEGRAL:
+            if intConstant(node.right) in (None, 0, -1):
+                return False
+        return self.cannotTrap(node.left) and self.cannotTrap(node.right)
+
+    # Induction vars
+    # --------------------------------------
+
+    # (var, step, the LET stepping a WHILE var or None) of a loop, None if it has none
+    def induction(self, loop, variant):
+        if type(loop) is For:
+            if loop.stepName != loop.name or loop.name in variant:
+                return None
+            step = self.stepOf(loop.name, loop.step)
+            return None if step is None else (loop.name, step, None)
+        found = None
+        for node in loop.body:
+            if type(node) is not Let:
+                continue
+            step = self.stepOf(node.name, node.value)
+            if step is None or self.varType(node.name) not in INTEGRAL:
+                continue
+            if self.countAssignments(loop.body, node.name) != 1:
+                continue
+            if found is None:
+                found = (node.name, step, node)
+        return found
+
+    # c when expression is name + c, c + name or name - c with c an int constant
+    def stepOf(self, name, expression):
+        expression = strip(expression)
+        if type(expression) is not BinOp or expression.op not in "+-":
+            return None
+        left = strip(expression.left)
+        right = strip(expression.right)
+        if type(left) is Ident and left.name == name:
+            step = intConstant(right)
+            if step is not None and expression.op == "-":
+                step = -step
+            return step
+        if expression.op == "+" and type(right) is Ident and right.name == name:
+            return intConstant(left)
+        return None
+
+    def countAssignments(self, body, name) -> int:
+        count = 0
+        for node in body:
+            kind = type(node)
+            if (kind is Let or kind is Input) and node.name == name:
+                count += 1
+            elif kind is For:
+                if name in (node.name, node.stepName):
+                    count += 2
+                count += self.countAssignments(node.body, name)
+            elif kind is If or kind is While:
+                count += self.countAssignments(node.body, name)
+        return count
+
+    # Counted loops
+    # --------------------------------------
+
+    # Report a FOR counting to an invariant bound, False if it never runs
+    def counted(self, loop) -> bool:
+        condition = strip(loop.condition)
+        if type(condition) is not BinOp or condition.op not in COMPARISON_OPS:
+            return True
+        left = strip(condition.left)
+        right = strip(condition.right)
+        op = condition.op
+        if type(right) is Ident and right.name == loop.name:
+            left, right = right, left
+            op = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}.get(op, op)
+        if type(left) is not Ident or left.name != loop.name or op == "==":
+            return True
+        if not self.isInvariant(right) or not self.isInvariant(loop.start):
+            return True
+        start = intConstant(loop.start)
+        bound = intConstant(right)
+        step = self.stepOf(loop.name, loop.step)
+        if start is None or bound is None:
+            self.note(loop, "counted FOR loop over " + loop.name)
+            return True
+        trips = self.tripCount(start, op, bound, step)
+        if trips == 0:
+            self.note(loop, "removed FOR loop that never runs")
+            return False
+        if trips is None:
+            self.note(loop, "counted FOR loop over " + loop.name)
+        else:
+            self.note(
+                loop, "counted FOR loop over " + loop.name + ", runs " + str(trips) + " times"
+            )
+        return True
+
+    # Iterations of a loop from start stepping by step while "var op bound", None if it
+    # does not end without overflowing
+    def tripCount(self, start, op, bound, step):
+        compare = {
+            "<": lambda value: value < bound,
+            "<=": lambda value: value <= bound,
+            ">": lambda value: value > bound,
+            ">=": lambda value: value >= bound,
+            "!=": lambda value: value != bound,
+        }[op]
+        if not compare(start):
+            return 0
+        if step == 0:
+            return None
+        if op == "!=":
+            if (bound - start) % step or (bound - start) // step < 0:
+                return None
+            return (bound - start) // step
+        if (step > 0) != (op in ("<", "<=")):
+            return None
+        last = bound if op in ("<=", ">=") else bound - (1 if step > 0 else -1)
+        trips = (last - start) // step + 1
+        final = start + trips * step  # Value of the var when the condition fails
+        if final > INT_MAX or final < -INT_MAX - 1:
+            return None
+        return trips
+
+    # Strength reduction
+    # --------------------------------------
+
+    # Replace products of the induction var by an invariant with temps updated per step
+    def reduce(self, loop, induction) -> None:
+        name, step, stepLet = induction
+        self.inductionVar = name
+        if type(loop) is For:
+            if self.parallel:
+                return
+            # The temp starts at start*k, which needs the start to be the FOR var's value
+            if self.typeOf(loop.start) != "int" or not self.isInvariant(loop.start):
+                return
+        self.uses = {}  # exprKey of the factor -> times computed per iteration, at least
+        self.products = None
+        self.reduceExpr(loop.condition, 1)
+        self.reduceBody(loop.body, 1)
+        self.products = {}  # exprKey of the factor -> (temp, factor)
+        loop.condition = self.reduceExpr(loop.condition, 1)
+        self.reduceBody(loop.body, 1)
+        updates = []
+        for temp, factor in self.products.values():
+            if type(loop) is For:
+                initial = self.product(loop.start, factor)
+            else:
+                initial = BinOp(Ident(name), "*", factor)
+            self.before.append(Let(temp, initial, loop.line))
+            value = intConstant(factor)
+            if value is not None:
+                increment = Number(str(abs(value * step)))  # A long long if it is big
+                op = "+" if value * step >= 0 else "-"
+            else:
+                increment = factor
+                if abs(step) != 1:
+                    increment = Ident(
+                        self.temp(BinOp(Number(str(abs(step))), "*", factor), loop)
+                    )
+                op = "+" if step >= 0 else "-"
+            update = BinOp(Ident(temp), op, increment)
+            updates.append(Let(temp, update, loop.line))
+            self.note(
+                loop,
+                "replaced "
+                + name
+                + " * "
+                + describe(factor)
+                + " by "
+                + temp
+                + ", updated to "
+                + describe(update)
+                + " per iteration",
+            )
+        if type(loop) is For:
+            loop.body.extend(updates)
+        else:
+            index = loop.body.index(stepLet)
+            loop.body[index + 1 : index + 1] = updates
+
+    # start*k for the first value of a temp, computed here when both are int literals
+    def product(self, start, factor):
+        startValue = intConstant(start)
+        factorValue = intConstant(factor)
+        if startValue == 1:
+            return factor
+        if startValue is not None and factorValue is not None:
+            value = startValue * factorValue
+            if -INT_MAX <= value <= INT_MAX:
+                return Number(str(value)) if value >= 0 else Unary("-", Number(str(-value)))
+        if startValue == 0:
+            return Number("0")
+        return BinOp(self.copy(start), "*", factor)
+
+    def copy(self, node):
+        kind = type(node)
+        if kind is BinOp:
+            return BinOp(self.copy(node.left), node.op, self.copy(node.right))
+        if kind is Unary:
+            return Unary(node.op, self.copy(node.operand))
+        if kind is Index:
+            return Index(node.name, self.copy(node.index))
+        if kind is Group:
+            return Group(self.copy(node.expr))
+        return node
+
+    # Count the products of the induction var (self.products is None), or replace the
+    # ones worth it. weight is 1 in the statements of the loop and 2 in inner loops,
+    # which may compute a product many times per iteration.
+    def reduceBody(self, body, weight) -> None:
+        for node in body:
+            kind = type(node)
+            if kind is Let:
+                node.value = self.reduceExpr(node.value, weight)
+                if node.index is not None:
+                    node.index = self.reduceExpr(node.index, weight)
+            elif kind is Input:
+                if node.index is not None:
+                    node.index = self.reduceExpr(node.index, weight)
+            elif kind is Print:
+                if not isinstance(node.value, str):
+                    node.value = self.reduceExpr(node.value, weight)
+            elif kind is If:
+                node.condition = self.reduceExpr(node.condition, weight)
+                self.reduceBody(node.body, weight)
+            elif kind is While:
+                node.condition = self.reduceExpr(node.condition, 2)
+                self.reduceBody(node.body, 2)
+            elif kind is For:
+                # A FOR var with the same name hides the induction var
+                if self.inductionVar in (node.name, node.stepName):
+                    continue
+                self.scopes.append(node.name)
+                node.start = self.reduceExpr(node.start, weight)
+                node.condition = self.reduceExpr(node.condition, 2)
+                node.step = self.reduceExpr(node.step, 2)
+                self.reduceBody(node.body, 2)
+                self.scopes.pop()
+
+    def reduceExpr(self, node, weight):
+        kind = type(node)
+        if kind is BinOp:
+            if node.op == "*":
+                factor = self.inductionFactor(node)
+                if factor is not None:
+                    key = self.exprKey(factor)
+                    if self.products is None:
+                        self.uses[key] = self.uses.get(key, 0) + weight
+                        return node
+                    if self.uses[key] < 2:
+                        return node
+                    if key not in self.products:
+                        ctype = self.typeOf(node)
+                        self.products[key] = (self.newTemp(ctype), factor)
+                    return Ident(self.products[key][0])
+            node.left = self.reduceExpr(node.left, weight)
+            node.right = self.reduceExpr(node.right, weight)
+        elif kind is Unary:
+            node.operand = self.reduceExpr(node.operand, weight)
+        elif kind is Index:
+            node.index = self.reduceExpr(node.index, weight)
+        elif kind is Group:
+            node.expr = self.reduceExpr(node.expr, weight)
+        return node
+
+    # k of a product i*k or k*i: an invariant var at least as wide as i, or an int literal.
+    # The product is integral, and c*k has the product's type.
+    def inductionFactor(self, node):
+        left = strip(node.left)
+        right = strip(node.right)
+        if type(right) is Ident and right.name == self.inductionVar:
+            left, right = right, left
+        if type(left) is not Ident or left.name != self.inductionVar:
+            return None
+        if type(right) is not Ident and type(right) is not Number:
+            return None
+        if type(right) is Ident and right.name in self.variant:
+            return None
+        if type(right) is Number:
+            return right if intConstant(right) is not None else None
+        if self.typeOf(right) not in INTEGRAL or self.typeOf(node) != self.typeOf(right):
+            return None
+        return right
+
+
+# Hoist invariants out of loops and strength-reduce products of induction vars, what was
+# done to which loop goes to report. With parallel, FOR loops are not strength-reduced:
+# the temp would carry a value from each iteration to the next, see parallel.py.
+def optimizeLoops(program, report=None, parallel=False):
+    return LoopOptimizer(report, parallel).run(program)
@@ -1,25 +1,300 @@
-from lexer import Lexer
-from parse import Parser
 from token_1 import TokenType
 from emit import Emitter
+from compiler import (
+    LEXERS,
+    PARSERS,
+    Options,
+    parseProgram,
+    runPasses,
+    generate,
+    compileFile,
+    openSource,
+    nestingLimit,
+    exitOnError,
+    buildExecutable,
+    optionFlags,
+)
+from cache import CompileCache
+from errors import CompileError
+import argparse
+import os
+import shutil
+import subprocess
 import sys
 
 if __name__ == "__main__":
-    cliCommand = "python ./main.py target.yolo"
-    if len(sys.argv) != 2:
-        sys.exit("CLI usage: " + cliCommand)
-    with open(sys.argv[1], "r") as sourceFile:
-        sourceCode = sourceFile.read()
-
-    lexer = Lexer(sourceCode)
-    emitter = Emitter("out.c")
-    parser = Parser(lexer, emitter)
-
-    parser.program()  # Start the parser
-    emitter.writeFile()  # Write file to output
-    print(emitter.header + emitter.code)
+    argParser = argparse.ArgumentParser(
+        usage="python ./main.py target.yolo\n       python ./main.py [-j N] [--out-dir DIR] [--manifest FILE] inputs ..."
+    )
+    argParser.add_argument(
+        "sources",
+        nargs="*",
+        help="yolo source file, or several files/directories to compile in batch mode",
+    )
+    argParser.add_argument(
+        "--manifest",
+        help="batch mode: also compile the files listed in this file, one per line",
+    )
+    argParser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="batch mode: number of worker processes (default: one per CPU)",
+    )
+    argParser.add_argument(
+        "--out-dir",
+        help="batch mode: write the .c files here instead of next to their sources",
+    )
+    argParser.add_argument(
+        "--lexer",
+        choices=LEXERS,
+        default="basic",
+        help="basic: char by char, fast: regex based, array: tokenize up front into typed arrays, stream: read the file in chunks as it is parsed",
+    )
+    argParser.add_argument(
+        "--parser",
+        choices=PARSERS,
+        default="recursive",
+        help="recursive: a call per operand and paren, precedence: expressions in a loop, nested as deep as memory allows",
+    )
+    argParser.add_argument(
+        "-O",
+        "--optimize",
+        action="store_true",
+        help="fold constant expressions and propagate constant vars",
+    )
+    argParser.add_argument(
+        "--dce",
+        action="store_true",
+        help="remove unreachable code, unused labels and dead stores, listing them on stderr",
+    )
+    argParser.add_argument(
+        "--infer-types",
+        action="store_true",
+        help="declare vars as long long or double instead of float",
+    )
+    argParser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="run FOR loops with independent iterations on all cores with OpenMP, listing them on stderr",
+    )
+    argParser.add_argument(
+        "--loops",
+        action="store_true",
+        help="hoist loop invariants and strength-reduce induction var products, listing them on stderr",
+    )
+    argParser.add_argument(
+        "--bounds-check",
+        action="store_true",
+        help="stop the program with an error when an array index is out of range",
+    )
+    argParser.add_argument(
+        "--instrument",
+        action="store_true",
+        help="profiling build: the program reports statement counts and loop times per line",
+    )
+    argParser.add_argument(
+        "--run",
+        action="store_true",
+        help="run the program in the bytecode VM instead of writing C",
+    )
+    argParser.add_argument(
+        "--build",
+        metavar="EXE",
+        help="also build out.c into an executable with cc (build.py has more choices)",
+    )
+    argParser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always compile, without reading or filling the compile cache",
+    )
+    argParser.add_argument(
+        "--cache-dir",
+        help="where cached C and executables are kept (default: $YOLO_CACHE_DIR or ~/.cache/yolo)",
+    )
+    argParser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="print the size and hit/miss totals of the cache",
+    )
+    argParser.add_argument(
+        "--stats",
+        action="store_true",
+        help="print time per phase, token/node/symbol counts and peak memory to stderr",
+    )
+    argParser.add_argument(
+        "--stats-format",
+        choices=("text", "json"),
+        help="print --stats as text (default) or JSON (implies --stats)",
+    )
+    argParser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="write a cProfile dump of the compile, read it with python -m pstats FILE",
+    )
+    argParser.add_argument(
+        "--tree",
+        action="store_true",
+        help="write the parse tree as DOT text",
+    )
+    argParser.add_argument(
+        "--tree-file",
+        metavar="PATH",
+        help="where --tree writes the DOT text (default: parse_tree.dot, implies --tree)",
+    )
+    argParser.add_argument(
+        "--render",
+        action="store_true",
+        help="also render the parse tree to PNG with Graphviz (implies --tree)",
+    )
+    args = argParser.parse_args()
+    if args.stats_format is not None:
+        args.stats = True
+    if args.tree_file is not None or args.render:
+        args.tree = True
+    if args.tree_file is None:
+        args.tree_file = "parse_tree.dot"
+    options = Options.fromArgs(args)
+    # The parse tree is drawn and the phases are measured while compiling, which a cache
+    # hit skips
+    cache = None
+    measuring = args.stats or args.profile is not None
+    if not args.no_cache and not args.tree and not measuring:
+        cache = CompileCache(args.cache_dir)
+    if args.cache_stats and not args.sources:
+        print(CompileCache(args.cache_dir).describe())
+        sys.exit(0)
+
+    batchMode = (
+        len(args.sources) > 1
+        or args.manifest is not None
+        or any(os.path.isdir(source) for source in args.sources)
+    )
+    if batchMode:
+        if args.tree or args.build is not None or args.run or measuring:
+            argParser.error(
+                "--tree, --render, --build, --run, --stats and --profile need a single source file"
+            )
+        if args.jobs is not None and args.jobs < 1:
+            argParser.error("--jobs must be at least 1")
+        from batch import collectSources, runBatch
+
+        sources = collectSources(args.sources, args.manifest)
+        failed = runBatch(sources, options, args.out_dir, args.jobs, cache)
+        if args.cache_stats and cache is not None:
+            print(cache.describe())
+        sys.exit(1 if failed else 0)
+    if len(args.sources) != 1:
+        argParser.error("a source file is required")
+    if args.run and (args.tree or args.build is not None):
+        argParser.error("--run does not write C, it can't be combined with --tree or --build")
+
+    stats = None
+    if args.stats:
+        from stats import CompileStats
+
+        stats = CompileStats()
+    profiler = None
+    if args.profile is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    report = []
+    if args.run:
+        from vm import compileBytecode, VM
+
+        with exitOnError():
+            with openSource(args.sources[0], options) as sourceCode:
+                program = parseProgram(sourceCode, options, stats=stats)
+            program = runPasses(program, options, report, stats)
+        for line in report:
+            print(line, file=sys.stderr)
+        if stats is None:
+            with exitOnError(), nestingLimit("the VM", "vm"):
+                bytecode = compileBytecode(program)
+            VM(bytecode).run()
+        else:
+            with stats.phase("bytecode"), exitOnError(), nestingLimit("the VM", "vm"):
+                bytecode = compileBytecode(program)
+            with stats.phase("run"):
+                VM(bytecode).run()  # stdout is the program's output, no C and no banner
+    elif cache is not None:
+        with exitOnError():
+            compileFile(args.sources[0], "out.c", options, report, cache)
+        for line in report:
+            print(line, file=sys.stderr)
+        with open("out.c", "r") as outFile:
+            shutil.copyfileobj(outFile, sys.stdout)  # Echo the program
+    else:
+        emitter = Emitter("out.c")
+        treeFile = None
+        tree = None
+        if args.tree:
+            from parse_tree import ParseTree
+
+            treeFile = open(args.tree_file, "w")
+            tree = ParseTree(treeFile)
+
+        with exitOnError():
+            try:
+                with openSource(args.sources[0], options) as sourceCode:
+                    program = parseProgram(sourceCode, options, tree, stats)
+            except CompileError:
+                if tree is not None:
+                    tree.finish()  # A valid graph of what was parsed before the error
+                raise
+            finally:
+                if treeFile is not None:
+                    treeFile.close()
+            program = runPasses(program, options, report, stats)
+        for line in report:
+            print(line, file=sys.stderr)
+        generate(program, emitter, stats, options)
+        if stats is None:
+            emitter.writeFile()  # Write file to output
+        else:
+            with stats.phase("write"):
+                emitter.writeFile()
+        emitter.writeTo(sys.stdout)  # Echo the program without building one big string
+        emitter.close()
+        if args.render:
+            from parse_tree import render
+
+            # The C is written either way, only the picture is missing
+            try:
+                render(args.tree_file, os.path.splitext(args.tree_file)[0] + ".png")
+            except FileNotFoundError:
+                sys.exit("Graphviz 'dot' not found, DOT written to " + args.tree_file)
+            except subprocess.CalledProcessError:
+                sys.exit("Graphviz 'dot' failed, DOT written to " + args.tree_file)
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        print("profile written to " + args.profile, file=sys.stderr)
+    if stats is not None:
+        if args.stats_format == "json":
+            print(stats.toJSON(), file=sys.stderr)
+        else:
+            print(stats.format(), file=sys.stderr)
+    if args.run:
+        sys.exit(0)
+    print()
     print("Parsing complete")
 
+    if args.build is not None:
+        try:
+            buildExecutable("out.c", args.build, cache, flags=optionFlags(options))
+        except subprocess.CalledProcessError:
+            sys.exit("Compilation failed.")
+    if cache is not None:
+        cache.saveStats()
+        cache.evict()
+        if args.cache_stats:
+            print(cache.describe())
+
     # Test parser
     # token = lexer.getToken()
     # while token.kind != TokenType.EOF:
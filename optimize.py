@@ -0,0 +1,341 @@
+import math
+import struct
+from ast_nodes import (
+    Let,
+    Print,
+    If,
+    While,
+    For,
+    Input,
+    BinOp,
+    Unary,
+    Number,
+    Ident,
+    Index,
+    Group,
+    COMPARISON_OPS,
+)
+
+# Constants are folded with the semantics of the generated C: int literals are 32 bit
+# ints, literals with a "." are doubles, and vars are floats unless a type is known.
+INT_MIN = -(2**31)
+INT_MAX = 2**31 - 1
+LLONG_MIN = -(2**63)
+LLONG_MAX = 2**63 - 1
+LIMITS = {"int": (INT_MIN, INT_MAX), "long long": (LLONG_MIN, LLONG_MAX)}
+RANK = {"int": 0, "long long": 1, "float": 2, "double": 3}
+
+
+# Round a Python float to the nearest C float, None if it overflows
+def toFloat32(value):
+    try:
+        return struct.unpack("f", struct.pack("f", value))[0]
+    except OverflowError:
+        return None
+
+
+# Value and C type of a literal, as written by the parser or by makeNumber
+def literal(text):
+    if text.endswith("f"):
+        return float(text[:-1]), "float"
+    if text.endswith("LL"):
+        return int(text[:-2]), "long long"
+    if "." in text or "e" in text or "E" in text:
+        return float(text), "double"
+    return int(text), "int"
+
+
+# C literal holding value with the given C type
+def makeNumber(value, ctype) -> Number:
+    if ctype == "int":
+        return Number(str(value))
+    if ctype == "long long":
+        return Number(str(value) + "LL")
+    text = repr(value)  # Shortest text that reads back as the same double
+    if ctype == "float":
+        text += "f"
+    return Number(text)
+
+
+# Usual arithmetic conversions of C, for the types we have
+def commonType(left, right):
+    return left if RANK[left] >= RANK[right] else right
+
+
+# Convert a value to a C type the way an assignment or an operand conversion does
+def convert(value, ctype):
+    if ctype in LIMITS:
+        return int(value)
+    if ctype == "float":
+        return toFloat32(float(value))
+    return float(value)
+
+
+# Apply a binary operator to two constants. None when C would overflow, trap or
+# produce inf/nan, those are left for the program to compute.
+def evaluate(op, left, leftType, right, rightType):
+    ctype = commonType(leftType, rightType)
+    a = convert(left, ctype)
+    b = convert(right, ctype)
+    if a is None or b is None:
+        return None
+    if op in COMPARISON_OPS:
+        if op == "==":
+            return int(a == b)
+        if op == "!=":
+            return int(a != b)
+        if op == "<":
+            return int(a < b)
+        if op == "<=":
+            return int(a <= b)
+        if op == ">":
+            return int(a > b)
+        return int(a >= b)
+
+    if op == "/" and b == 0:
+        return None
+    if ctype in LIMITS:
+        if op == "+":
+            result = a + b
+        elif op == "-":
+            result = a - b
+        elif op == "*":
+            result = a * b
+        else:
+            # C truncates towards zero
+            result = abs(a) // abs(b)
+            if (a < 0) != (b < 0):
+                result = -result
+        # Nor is INT_MIN folded, C has no int literal for it: -2147483648 is a long
+        low, high = LIMITS[ctype]
+        if result <= low or result > high:
+            return None
+        return result
+
+    if op == "+":
+        result = a + b
+    elif op == "-":
+        result = a - b
+    elif op == "*":
+        result = a * b
+    else:
+        result = a / b
+    if ctype == "float":
+        # One float operation computed in double and rounded is exactly the float result
+        result = toFloat32(result)
+    if result is None or not math.isfinite(result):
+        return None
+    return result
+
+
+# (value, C type) of an expression made only of literals, None if it is not constant
+def constantValue(node):
+    kind = type(node)
+    if kind is Number:
+        return literal(node.text)
+    if kind is Group:
+        return constantValue(node.expr)
+    if kind is Unary:
+        operand = constantValue(node.operand)
+        if operand is None or node.op == "+":
+            return operand
+        return -operand[0], operand[1]
+    if kind is BinOp:
+        left = constantValue(node.left)
+        right = constantValue(node.right)
+        if left is None or right is None:
+            return None
+        value = evaluate(node.op, left[0], left[1], right[0], right[1])
+        if value is None:
+            return None
+        if node.op in COMPARISON_OPS:
+            return value, "int"
+        return value, commonType(left[1], right[1])
+    return None
+
+
+# Folds constant subexpressions, propagates vars that are assigned one constant, and
+# applies identities that keep both the value and the C type of an expression.
+class ConstantFolder:
+    def __init__(self, types=None) -> None:
+        self.types = {}  # var -> C type, float if missing
+        self.realDivisions = set()  # ids of "/" the code generator writes with a cast
+        if types is not None:
+            self.types = types.vars
+            self.realDivisions = types.realDivisions
+        self.scopes = []  # vars of the FOR loops we are in, they are ints
+        self.candidates = set()  # vars assigned once, by a LET outside any IF or loop
+        self.assignments = {}  # var -> number of LET/INPUT statements assigning it
+        self.constants = {}  # var -> the value its single LET stores
+
+    def run(self, program):
+        self.inputs = set()  # vars read by INPUT
+        self.forVars = set()  # vars assigned by a FOR header
+        self.countAssignments(program.body)
+        topLevel = {
+            node.name for node in program.body if type(node) is Let and node.index is None
+        }
+        self.candidates = {
+            name
+            for name, count in self.assignments.items()
+            if count == 1
+            and name in topLevel
+            and name not in self.inputs
+            and name not in self.forVars
+        }
+        # A constant is only substituted after its LET has been folded, uses that come
+        # before it in the source (loops, GOTO) are picked up by another round
+        while True:
+            known = len(self.constants)
+            program.body = self.block(program.body)
+            if len(self.constants) == known:
+                return program
+
+    # Array elements are not counted, an array is never a constant
+    def countAssignments(self, body) -> None:
+        for node in body:
+            kind = type(node)
+            if (kind is Let or kind is Input) and node.index is not None:
+                continue
+            if kind is Let:
+                self.assignments[node.name] = self.assignments.get(node.name, 0) + 1
+            elif kind is Input:
+                self.assignments[node.name] = self.assignments.get(node.name, 0) + 1
+                self.inputs.add(node.name)
+            elif kind is For:
+                self.forVars.add(node.name)
+                self.forVars.add(node.stepName)
+                self.countAssignments(node.body)
+            elif kind is If or kind is While:
+                self.countAssignments(node.body)
+
+    def varType(self, name):
+        if name in self.scopes:
+            return "int"
+        return self.types.get(name, "float")
+
+    # Statements
+    # --------------------------------------
+
+    def block(self, body):
+        result = []
+        for node in body:
+            node = self.statement(node)
+            if node is not None:
+                result.append(node)
+        return result
+
+    # Return the folded statement, or None to drop it
+    def statement(self, node):
+        kind = type(node)
+        if (kind is Let or kind is Input) and node.index is not None:
+            node.index = self.expr(node.index)[0]
+            if kind is Let:
+                node.value = self.expr(node.value)[0]
+        elif kind is Let:
+            node.value, ctype, value = self.expr(node.value)
+            name = node.name
+            if name in self.scopes:
+                if type(node.value) is Ident and node.value.name == name:
+                    return None
+                return node
+            if value is not None and name in self.candidates:
+                value = convert(value, self.varType(name))
+                if value is not None:
+                    self.constants[name] = value
+            # x = x does nothing, but one assignment has to stay to declare x
+            if (
+                type(node.value) is Ident
+                and node.value.name == name
+                and self.assignments[name] > 1
+            ):
+                self.assignments[name] -= 1
+                return None
+        elif kind is Print:
+            if not isinstance(node.value, str):
+                node.value = self.expr(node.value)[0]
+        elif kind is If or kind is While:
+            node.condition = self.expr(node.condition)[0]
+            node.body = self.block(node.body)
+        elif kind is For:
+            # The loop var is in scope from its own initializer on, like in C
+            self.scopes.append(node.name)
+            node.start = self.expr(node.start)[0]
+            node.condition = self.expr(node.condition)[0]
+            node.step = self.expr(node.step)[0]
+            node.body = self.block(node.body)
+            self.scopes.pop()
+        return node
+
+    # Expressions
+    # --------------------------------------
+
+    # Return (folded node, C type, constant value or None)
+    def expr(self, node):
+        kind = type(node)
+        if kind is Number:
+            value, ctype = literal(node.text)
+            return node, ctype, value
+        if kind is Ident:
+            ctype = self.varType(node.name)
+            value = self.constants.get(node.name)
+            if value is not None and node.name not in self.scopes:
+                return makeNumber(value, ctype), ctype, value
+            return node, ctype, None
+        if kind is Index:
+            node.index = self.expr(node.index)[0]
+            return node, self.varType(node.name), None
+        if kind is Group:
+            # The code generator adds back the parens that are still needed
+            return self.expr(node.expr)
+        if kind is Unary:
+            operand, ctype, value = self.expr(node.operand)
+            if node.op == "+":
+                return operand, ctype, value
+            if value is not None:
+                value = -value
+                if ctype not in LIMITS or value <= LIMITS[ctype][1]:
+                    return makeNumber(value, ctype), ctype, value
+            return Unary("-", operand), ctype, None
+
+        left, leftType, leftValue = self.expr(node.left)
+        right, rightType, rightValue = self.expr(node.right)
+        op = node.op
+        ctype = "int" if op in COMPARISON_OPS else commonType(leftType, rightType)
+        operandTypes = (leftType, rightType)
+        if op == "/" and id(node) in self.realDivisions:
+            # (double)left/right in the C, the operands are integers but the source
+            # divided floats
+            ctype = "double"
+            operandTypes = (ctype, ctype)
+        if leftValue is not None and rightValue is not None:
+            value = evaluate(op, leftValue, operandTypes[0], rightValue, operandTypes[1])
+            if value is not None:
+                return makeNumber(value, ctype), ctype, value
+
+        # x*1, 1*x, x/1, x-0 are exact. x+0 is not for floats (-0.0 + 0 is 0.0), nor is
+        # x - -0.0.
+        # The operand only replaces the expression if it already has the result's type.
+        if op == "*" or op == "/":
+            if rightValue == 1 and leftType == ctype:
+                return left, ctype, None
+            if op == "*" and leftValue == 1 and rightType == ctype:
+                return right, ctype, None
+        elif op == "-":
+            if rightValue == 0 and math.copysign(1, rightValue) > 0 and leftType == ctype:
+                return left, ctype, None
+        elif op == "+" and ctype in LIMITS:
+            if rightValue == 0:
+                return left, ctype, None
+            if leftValue == 0:
+                return right, ctype, None
+
+        node.left = left
+        node.right = right
+        return node, ctype, None
+
+
+# Run constant folding over a program, with the var types and divisions of an infer.Types
+# (all vars are floats without it)
+def foldConstants(program, types=None):
+    return ConstantFolder(types).run(program)
@@ -0,0 +1,362 @@
+from ast_nodes import (
+    Let,
+    Print,
+    If,
+    While,
+    For,
+    Label,
+    Goto,
+    Input,
+    BinOp,
+    Unary,
+    Ident,
+    Index,
+    Group,
+)
+from infer import INTEGRAL, ExpressionTypes
+from loops import strip, intConstant
+
+# Finds the FOR loops whose iterations can run on several cores, the code generator puts
+# an OpenMP "#pragma omp parallel for" before them (see --parallel). A loop qualifies when:
+#
+# - its body has no PRINT, INPUT, GOTO or LABEL, so nothing depends on the order of the
+#   iterations except the vars they assign
+# - its header has the canonical form OpenMP needs: the var compared with <, <=, > or >=
+#   to an integer bound the body does not change, and stepped towards it by a constant
+# - every var the body assigns is either a reduction, only changed by LETs like
+#   v = v + a - b or v = v * a and read nowhere else, or private, assigned by a LET at
+#   the top of the body before anything reads it. Private vars are "lastprivate" so they
+#   keep the value of the last iteration after the loop, like the sequential loop does,
+#   and "firstprivate" so a loop that runs zero times leaves them as they were.
+# - every array the body stores into is only used at name(i + c), i the loop var and c
+#   the same constant everywhere, so each iteration has its own element
+#
+# Every other loop stays sequential, and the report says why. Loops inside a parallel
+# loop run sequentially in its threads.
+
+REDUCTIONS = {"+": "+", "-": "+", "*": "*"}  # LET v = v op e -> operator of the clause
+
+
+# Vars read by an expression
+def varsRead(node, names):
+    kind = type(node)
+    if kind is Ident:
+        names.append(node.name)
+    elif kind is Index:
+        names.append(node.name)
+        varsRead(node.index, names)
+    elif kind is BinOp:
+        varsRead(node.left, names)
+        varsRead(node.right, names)
+    elif kind is Unary:
+        varsRead(node.operand, names)
+    elif kind is Group:
+        varsRead(node.expr, names)
+    return names
+
+
+class ParallelLoops(ExpressionTypes):
+    def __init__(self, report=None) -> None:
+        super().__init__()
+        self.report = report if report is not None else []
+        self.parallel = {}  # id(For) -> clauses of its pragma
+
+    def run(self, program):
+        self.types = program.types
+        self.temps = program.temps
+        self.arrays = program.arrays
+        self.block(program.body)
+        program.parallel = self.parallel
+        return program
+
+    def note(self, loop, message) -> None:
+        self.report.append("line " + str(loop.line) + ": FOR " + loop.name + " " + message)
+
+    def block(self, body) -> None:
+        for node in body:
+            kind = type(node)
+            if kind is If or kind is While:
+                self.block(node.body)
+            elif kind is For:
+                self.scopes.append(node.name)
+                clauses, reason = self.analyze(node)
+                if clauses is None:
+                    self.note(node, "stays sequential: " + reason)
+                    self.block(node.body)
+                else:
+                    self.parallel[id(node)] = clauses
+                    self.note(node, ("runs in parallel " + clauses).rstrip())
+                    if self.rounding:
+                        # Integers add up exactly in any order, floats round differently
+                        self.note(
+                            node,
+                            "adds up "
+                            + ", ".join(self.rounding)
+                            + " in another order, which can round differently",
+                        )
+                self.scopes.pop()
+
+    # (clauses, None) for a loop that can run in parallel, otherwise (None, reason)
+    def analyze(self, loop):
+        reason = self.forbidden(loop.body)
+        if reason is not None:
+            return None, reason
+        reason = self.header(loop)
+        if reason is not None:
+            return None, reason
+
+        reductions = {}  # var -> operator
+        private = []
+        for name in self.assignedVars(loop.body, (), []):
+            if name in reductions or name in private:
+                continue
+            if name in self.arrays:
+                if self.elementOffset(loop.body, name, loop.name) is None:
+                    return None, "iterations share elements of " + name
+                continue
+            operator = self.reduction(loop.body, name)
+            if operator is not None:
+                reductions[name] = operator
+            elif self.isPrivate(loop.body, name):
+                private.append(name)
+            else:
+                return None, name + " carries a value from one iteration to the next"
+        clauses = []
+        for operator in ("+", "*"):
+            names = sorted(name for name in reductions if reductions[name] == operator)
+            if names:
+                clauses.append("reduction(" + operator + ":" + ",".join(names) + ")")
+        if private:
+            names = ",".join(sorted(private))
+            clauses.append("firstprivate(" + names + ") lastprivate(" + names + ")")
+        self.rounding = sorted(
+            name for name in reductions if self.varType(name) not in INTEGRAL
+        )
+        return " ".join(clauses), None
+
+    # Statements that tie iterations to their order
+    def forbidden(self, body):
+        for node in body:
+            kind = type(node)
+            if kind is Print or kind is Input or kind is Goto or kind is Label:
+                return kind.__name__.upper() + " on line " + str(node.line)
+            if kind is For and node.stepName != node.name:
+                return "the FOR on line " + str(node.line) + " steps another var"
+            if kind is If or kind is While or kind is For:
+                reason = self.forbidden(node.body)
+                if reason is not None:
+                    return reason
+        return None
+
+    # Reason the header is not in OpenMP's canonical form, None if it is
+    def header(self, loop):
+        name = loop.name
+        if loop.stepName != name:
+            return "its step assigns " + loop.stepName
+        step = loop.step
+        if type(step) is not BinOp or step.op not in "+-":
+            return "its step is not " + name + " = " + name + " + a constant"
+        if type(step.left) is Ident and step.left.name == name:
+            increment = intConstant(step.right)
+            if increment is not None and step.op == "-":
+                increment = -increment
+        elif step.op == "+" and type(step.right) is Ident and step.right.name == name:
+            increment = intConstant(step.left)
+        else:
+            increment = None
+        if not increment:
+            return "its step is not " + name + " = " + name + " + a constant"
+
+        condition = loop.condition
+        if type(condition) is not BinOp or condition.op not in ("<", "<=", ">", ">="):
+            return "its condition does not compare " + name + " with <, <=, > or >="
+        op = condition.op
+        bound = condition.right
+        if type(condition.right) is Ident and condition.right.name == name:
+            bound = condition.left
+            op = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}[op]
+        elif type(condition.left) is not Ident or condition.left.name != name:
+            return "its condition does not compare " + name + " with <, <=, > or >="
+        if (increment > 0) != (op in ("<", "<=")):
+            return "its step goes away from the bound"
+        if self.typeOf(bound) not in INTEGRAL:
+            return "its bound is a " + self.typeOf(bound) + ", OpenMP needs an integer"
+        assigned = self.assignedVars(loop.body, (), [])
+        if name in assigned:
+            return name + " is assigned in the body"
+        for used in varsRead(bound, []):
+            if used == name or used in assigned:
+                return "its bound changes in the loop"
+        return None
+
+    # Vars of the enclosing scope assigned by the statements, in order. FOR vars of inner
+    # loops (hidden) are declared by their loop, so each thread has its own.
+    def assignedVars(self, body, hidden, names):
+        for node in body:
+            kind = type(node)
+            if kind is Let and node.name not in hidden and node.name not in names:
+                names.append(node.name)
+            elif kind is If or kind is While:
+                self.assignedVars(node.body, hidden, names)
+            elif kind is For:
+                self.assignedVars(node.body, hidden + (node.name,), names)
+        return names
+
+    # LETs of name in the statements, outside inner loops declaring their own name
+    def lets(self, body, name, found):
+        for node in body:
+            kind = type(node)
+            if kind is Let and node.name == name:
+                found.append(node)
+            elif kind is If or kind is While:
+                self.lets(node.body, name, found)
+            elif kind is For and node.name != name:
+                self.lets(node.body, name, found)
+        return found
+
+    # Number of times the statements read name
+    def reads(self, body, name) -> int:
+        count = 0
+        for node in body:
+            kind = type(node)
+            if kind is Let:
+                count += varsRead(node.value, []).count(name)
+                if node.index is not None:
+                    count += varsRead(node.index, []).count(name)
+            elif kind is If or kind is While:
+                count += varsRead(node.condition, []).count(name)
+                count += self.reads(node.body, name)
+            elif kind is For and node.name != name:
+                for expression in (node.start, node.condition, node.step):
+                    count += varsRead(expression, []).count(name)
+                count += self.reads(node.body, name)
+        return count
+
+    # Operator of the reduction clause when name is only changed by LETs like
+    # name = name + a - b or name = name * a and read nowhere else, otherwise None
+    def reduction(self, body, name):
+        operators = set()
+        lets = self.lets(body, name, [])
+        for let in lets:
+            operator = self.reductionOperator(strip(let.value), name)
+            if operator is None:
+                return None
+            operators.add(operator)
+        if len(operators) != 1 or self.reads(body, name) != len(lets):
+            return None
+        return operators.pop()
+
+    # "+" or "*" when the value is name followed by a chain of + and - or of *
+    def reductionOperator(self, value, name):
+        if type(value) is BinOp and value.op in ("+", "*"):
+            right = strip(value.right)
+            if type(right) is Ident and right.name == name:
+                return None if name in varsRead(value.left, []) else value.op
+        operators = set()
+        node = value
+        while type(node) is BinOp and node.op in REDUCTIONS:
+            if name in varsRead(node.right, []):
+                return None
+            operators.add(REDUCTIONS[node.op])
+            node = strip(node.left)
+            if type(node) is Ident and node.name == name:
+                return operators.pop() if len(operators) == 1 else None
+        return None
+
+    # Whether a LET at the top of the body assigns name before any statement uses it
+    def isPrivate(self, body, name) -> bool:
+        for node in body:
+            if type(node) is Let and node.name == name:
+                return name not in varsRead(node.value, [])
+            if self.reads([node], name) or self.lets([node], name, []):
+                return False
+        return False
+
+    # c when every use of the array in the statements is array(var + c) with the same c,
+    # otherwise None
+    def elementOffset(self, body, array, var):
+        offsets = set()
+        if not self.elementsUsed(body, array, var, offsets) or len(offsets) != 1:
+            return None
+        return offsets.pop()
+
+    # Add to offsets the c of each array(var + c) in the statements, False if the array is
+    # used at another index. Inside an inner FOR over var, var is another var: any use of
+    # the array there is at another index.
+    def elementsUsed(self, body, array, var, offsets) -> bool:
+        for node in body:
+            kind = type(node)
+            if kind is Let:
+                if node.index is not None and not self.element(
+                    node.name, node.index, array, var, offsets
+                ):
+                    return False
+                expressions = (node.value,)
+            elif kind is If or kind is While:
+                expressions = (node.condition,)
+            elif kind is For:
+                inner = None if node.name == var else var
+                for expression in (node.start, node.condition, node.step):
+                    if not self.elementsRead(expression, array, inner, offsets):
+                        return False
+                if not self.elementsUsed(node.body, array, inner, offsets):
+                    return False
+                continue
+            else:
+                continue
+            for expression in expressions:
+                if not self.elementsRead(expression, array, var, offsets):
+                    return False
+            if kind is not Let and not self.elementsUsed(node.body, array, var, offsets):
+                return False
+        return True
+
+    def elementsRead(self, node, array, var, offsets) -> bool:
+        kind = type(node)
+        if kind is Index:
+            return self.element(node.name, node.index, array, var, offsets)
+        if kind is BinOp:
+            return self.elementsRead(
+                node.left, array, var, offsets
+            ) and self.elementsRead(node.right, array, var, offsets)
+        if kind is Unary:
+            return self.elementsRead(node.operand, array, var, offsets)
+        if kind is Group:
+            return self.elementsRead(node.expr, array, var, offsets)
+        return True
+
+    # name(index), which uses the array at var + c when it is the array
+    def element(self, name, index, array, var, offsets) -> bool:
+        if name == array:
+            offset = self.offsetOf(index, var)
+            if offset is None:
+                return False
+            offsets.add(offset)
+        return self.elementsRead(index, array, var, offsets)
+
+    # c when the index is var, var + c, c + var or var - c, otherwise None
+    def offsetOf(self, index, var):
+        index = strip(index)
+        if var is None:
+            return None
+        if type(index) is Ident:
+            return 0 if index.name == var else None
+        if type(index) is not BinOp or index.op not in "+-":
+            return None
+        left = strip(index.left)
+        right = strip(index.right)
+        if type(left) is Ident and left.name == var:
+            offset = intConstant(right)
+            if offset is not None and index.op == "-":
+                offset = -offset
+            return offset
+        if index.op == "+" and type(right) is Ident and right.name == var:
+            return intConstant(left)
+        return None
+
+
+# Record in program.parallel the FOR loops that can run in parallel, with the clauses of
+# their OpenMP pragma. Which loops run in parallel, and why the others do not, goes to
+# report.
+def findParallelLoops(program, report=None):
+    return ParallelLoops(report).run(program)
@@ -1,51 +1,52 @@
-import sys
 from lexer import Lexer
 from token_1 import TokenType, Token
-import pydot
+from errors import ParseError
+from ast_nodes import (
+    Program,
+    Let,
+    Print,
+    If,
+    While,
+    For,
+    Label,
+    Goto,
+    Input,
+    Dim,
+    BinOp,
+    Unary,
+    Number,
+    Ident,
+    Index,
+    Group,
+)
+from codegen import CGenerator
 
 
 class Parser:
-    def __init__(self, lexer, emitter) -> None:
-        # Graph
-        self.graph = pydot.Dot(graph_type="digraph")
-        self.node_count = 0
+    # Builds an AST of the program. If an emitter is given, C code is generated into it too.
+    def __init__(self, lexer, emitter=None, tree=None) -> None:
+        # Optional parse tree writer (see parse_tree.py), None skips all graph work
+        self.tree = tree
 
         self.lexer = lexer
         self.emitter = emitter
 
         self.symbols = set()  # vars declared so far
+        self.arrays = {}  # arrays declared so far -> their size
         self.labelsDeclared = set()  # labels declared so far
-        self.labelsGotoed = set()  # labels goto'ed so far
+        self.labelsGotoed = {}  # labels goto'ed so far, with the offset of the first GOTO
 
+        self.line = 1  # source line of curToken
         self.curToken = None
         self.peekToken = None
         self.nextToken()
         self.nextToken()
 
+    # Add a node to the parse tree, if one is being written, and return its id
     def add_node(self, label, parent=None, leaf=False):
-        if leaf:
-            node = pydot.Node(
-                self.node_count,
-                label=label,
-                style="filled",
-                fillcolor="grey",
-                fontcolor="white",
-            )
-        else:
-            node = pydot.Node(
-                self.node_count,
-                label=label,
-                shape="square",
-                style="filled",
-                fillcolor="black",
-                fontcolor="white",
-            )
-        self.graph.add_node(node)
-        if parent is not None:
-            self.graph.add_edge(pydot.Edge(parent, node))
-        self.parent = node
-        self.node_count += 1
-        return node
+        if self.tree is None:
+            return None
+        return self.tree.add_node(label, parent, leaf)
 
     # Return true if current token matches a type
     def checkToken(self, kind: TokenType) -> bool:
@@ -63,43 +64,51 @@ class Parser:
 
     # Advance the current token
     def nextToken(self) -> None:
+        if self.curToken is not None and self.curToken.kind == TokenType.NEWLINE:
+            self.line += 1
         self.curToken = self.peekToken
         self.peekToken = self.lexer.getToken()
 
-    def abort(self, message) -> None:
-        sys.exit("Error. " + message)
+    # Raise a ParseError pointing at pos, or at the current token by default
+    def abort(self, message, pos=None) -> None:
+        if pos is None:
+            pos = self.curToken.pos
+        if pos is None:
+            raise ParseError(message)
+        raise ParseError(message, pos, *self.lexer.location(pos))
 
     # Production rules
     # --------------------------------------
 
     # program ::= {statement}
-    def program(self):
-        self.emitter.headerLine("#include <stdio.h>")
-        self.emitter.headerLine("int main(){")
-
+    def program(self) -> Program:
         program_node = self.add_node("Program")
 
         # Skip new lines at the start of our program
         while self.checkToken(TokenType.NEWLINE):
             self.nextToken()
         # Parse all statments in program
+        body = []
         while not self.checkToken(TokenType.EOF):
-            self.statement(program_node)
-
-        # Wrap up c file
-        self.emitter.emitLine("return 0;")
-        self.emitter.emitLine("}")
+            body.append(self.statement(program_node))
 
         # Check that each GOTO calls a declared LABEL
-        for label in self.labelsGotoed:
+        for label, pos in self.labelsGotoed.items():
             if label not in self.labelsDeclared:
-                self.abort("Attempting to GOTO to undeclared label: " + label)
+                self.abort("Attempting to GOTO to undeclared label: " + label, pos)
 
-        self.graph.write_png("parse_tree.png")
+        if self.tree is not None:
+            self.tree.finish()
 
-    def statement(self, parent_node: pydot.Node):
+        program = Program(body, self.arrays)
+        if self.emitter is not None:
+            CGenerator(self.emitter).program(program)
+        return program
+
+    def statement(self, parent_node):
         # Check which kind of statement we have
         statement_node = self.add_node("Statement", parent_node)
+        line = self.line
 
         # "PRINT" (expression | string) nl
         if self.checkToken(TokenType.PRINT):
@@ -109,14 +118,10 @@ class Parser:
             if self.checkToken(TokenType.STRING):
                 stringNode = self.add_node("String", statement_node)
                 self.add_node(self.curToken.text, stringNode, True)
-                # Print simple string
-                self.emitter.emitLine('printf("' + self.curToken.text + '\\n");')
+                node = Print(self.curToken.text, line)
                 self.nextToken()
             else:
-                # We get an expression so lets print the resulting float
-                self.emitter.emit('printf("%.2f\\n", (float)(')
-                self.expression(statement_node)  # This will emit the expression result
-                self.emitter.emitLine("));")
+                node = Print(self.expression(statement_node), line)
 
         # "IF" (comparison) "THEN" nl {statement} "ENDIF" nl
         elif self.checkToken(TokenType.IF):
@@ -124,31 +129,26 @@ class Parser:
             self.nextToken()
 
             self.match(TokenType.OPEN_PAREN)
-
-            self.emitter.emit("if(")
-            self.comparison(statement_node)
-
+            condition = self.comparison(statement_node)
             self.match(TokenType.CLOSE_PAREN)
 
             self.match(TokenType.THEN)
             self.add_node("THEN", statement_node, True)
             self.nl()
-            self.emitter.emitLine("){")
 
+            body = []
             while not self.checkToken(TokenType.ENDIF):
-                self.statement(statement_node)
-            self.emitter.emitLine("}")
+                body.append(self.statement(statement_node))
             self.match(TokenType.ENDIF)
             self.add_node("ENDIF", statement_node, True)
+            node = If(condition, body, line)
         # | "WHILE" (comparison "REPEAT" nl {statement nl} "ENDWHILE" nl
         elif self.checkToken(TokenType.WHILE):
             self.add_node("WHILE", statement_node, True)
             self.nextToken()
             self.match(TokenType.OPEN_PAREN)
 
-            self.emitter.emit("while(")
-            self.comparison(statement_node)
-            self.emitter.emitLine("){")
+            condition = self.comparison(statement_node)
 
             self.match(TokenType.CLOSE_PAREN)
             self.add_node("REPEAT", statement_node, True)
@@ -156,33 +156,31 @@ class Parser:
             self.nl()
 
             # >= 0 statements in the body of the loop
+            body = []
             while not self.checkToken(TokenType.ENDWHILE):
-                self.statement(statement_node)
-            self.emitter.emitLine("}")
+                body.append(self.statement(statement_node))
             self.match(TokenType.ENDWHILE)
+            node = While(condition, body, line)
         # "FOR" "(" for_assignment ";" comparison ";" for_declaration ")" "DO" nl {statement} "ENDFOR" nl
         elif self.checkToken(TokenType.FOR):
             self.add_node("FOR", statement_node, True)
             self.nextToken()
             self.match(TokenType.OPEN_PAREN)
 
-            self.emitter.emit("for(")
-            self.for_declaration(statement_node)
+            name, start = self.for_declaration(statement_node)
             self.match(TokenType.SEMICOLON)
-            self.emitter.emit(";")
-            self.comparison(statement_node)
+            condition = self.comparison(statement_node)
             self.match(TokenType.SEMICOLON)
-            self.emitter.emit(";")
-            self.for_assignment(statement_node)
+            stepName, step = self.for_assignment(statement_node)
             self.match(TokenType.CLOSE_PAREN)
             self.match(TokenType.REPEAT)
-            self.emitter.emitLine("){")
             self.nl()
             # >= 0 statements in the body of the loop
+            body = []
             while not self.checkToken(TokenType.ENDFOR):
-                self.statement(statement_node)
-            self.emitter.emitLine("}")
+                body.append(self.statement(statement_node))
             self.match(TokenType.ENDFOR)
+            node = For(name, start, condition, stepName, step, body, line)
 
         # | "LABEL" ident nl
         elif self.checkToken(TokenType.LABEL):
@@ -195,53 +193,60 @@ class Parser:
 
             self.add_node(self.curToken.text, statement_node, True)
 
-            self.emitter.emitLine(self.curToken.text + ":")
+            node = Label(self.curToken.text, line)
             self.match(TokenType.IDENT)
         # | "GOTO" ident nl
         elif self.checkToken(TokenType.GOTO):
             self.add_node("GOTO", statement_node, True)
             self.nextToken()
-            self.labelsGotoed.add(self.curToken.text)
-            self.emitter.emitLine("goto " + self.curToken.text + ";")
+            self.labelsGotoed.setdefault(self.curToken.text, self.curToken.pos)
+            node = Goto(self.curToken.text, line)
             self.add_node(self.curToken.text, statement_node, True)
             self.match(TokenType.IDENT)
-        # | "LET" ident "=" expression nl
+        # | "LET" ident ["(" expression ")"] "=" expression nl
         elif self.checkToken(TokenType.LET):
             self.add_node("LET", statement_node, True)
             self.nextToken()
 
-            # Add INDENT to symbols if it doesnt already exist
-            if self.curToken.text not in self.symbols:
-                self.symbols.add(self.curToken.text)
-                self.emitter.headerLine("float " + self.curToken.text + ";")
-
-            ident_node = self.add_node("Ident", statement_node)
-            self.add_node(self.curToken.text, ident_node, True)
+            name, index = self.target(statement_node)
             self.add_node("=", statement_node, True)
-
-            self.emitter.emit(self.curToken.text + " = ")
-            self.match(TokenType.IDENT)
             self.match(TokenType.EQ)
-            self.expression(statement_node)
-            self.emitter.emitLine(";")
-        # | "INPUT" ident nl
+            node = Let(name, self.expression(statement_node), line, index)
+        # | "INPUT" ident ["(" expression ")"] nl
         elif self.checkToken(TokenType.INPUT):
             self.nextToken()
             self.add_node("INPUT", statement_node, True)
 
-            # If var doesnt exist, lets add it
-            if self.curToken.text not in self.symbols:
-                self.symbols.add(self.curToken.text)
-                self.emitter.headerLine("float " + self.curToken.text + ";")
-            # Emit scanf, but check the input. If invalid, set var to 0 and clear input.
-            self.emitter.emitLine('if(0==scanf("%f", &' + self.curToken.text + ")) {")
-            self.emitter.emitLine(self.curToken.text + " = 0;")
-            self.emitter.emit('scanf("%')  # Clean input buffer
-            self.emitter.emitLine('*s");')
-            self.emitter.emitLine("}")
+            name, index = self.target(statement_node)
+            node = Input(name, line, index)
+        # | "DIM" ident "(" number ")" nl
+        elif self.checkToken(TokenType.DIM):
+            self.add_node("DIM", statement_node, True)
+            self.nextToken()
+
+            name = self.curToken.text
+            if name in self.arrays:
+                self.abort("Array already declared: " + name)
+            if name in self.symbols:
+                self.abort("Can't DIM " + name + ", it is already a variable")
             ident_node = self.add_node("Ident", statement_node)
-            self.add_node(self.curToken.text, ident_node, True)
+            self.add_node(name, ident_node, True)
             self.match(TokenType.IDENT)
+            self.match(TokenType.OPEN_PAREN)
+            # The size is a plain integer, so the array is a fixed size C array
+            text = self.curToken.text
+            if (
+                not self.checkToken(TokenType.NUMBER)
+                or not text.isdigit()
+                or not 0 < int(text) <= 2**31 - 1
+            ):
+                self.abort("Array size must be an integer from 1 to 2147483647: " + text)
+            size_node = self.add_node("Number", statement_node)
+            self.add_node(text, size_node, True)
+            self.nextToken()
+            self.match(TokenType.CLOSE_PAREN)
+            self.arrays[name] = int(text)
+            node = Dim(name, int(text), line)
         else:
             self.abort(
                 "Invalid statement: "
@@ -253,6 +258,35 @@ class Parser:
 
         # New line after a statement
         self.nl()
+        return node
+
+    # Var or array element assigned by LET and INPUT: (name, index expression or None)
+    def target(self, parent_node):
+        name = self.curToken.text
+        ident_node = self.add_node("Ident", parent_node)
+        self.add_node(name, ident_node, True)
+        self.match(TokenType.IDENT)
+        if name in self.arrays:
+            return name, self.index(name, ident_node)
+        if self.checkToken(TokenType.OPEN_PAREN):
+            self.abort(name + " is not an array")
+        # Add the var to symbols if it doesnt already exist
+        self.symbols.add(name)
+        return name, None
+
+    # "(" expression ")" after the name of an array
+    def index(self, name, parent_node):
+        if not self.checkToken(TokenType.OPEN_PAREN):
+            self.abort("Array " + name + " needs an index: " + name + "(...)")
+        self.nextToken()
+        node = self.expression(parent_node)
+        self.match(TokenType.CLOSE_PAREN)
+        return node
+
+    # FOR vars are ints, an array can't be one
+    def checkNotArray(self, name) -> None:
+        if name in self.arrays:
+            self.abort("Array " + name + " can't be a FOR var")
 
     def isComparisonOperator(self):
         return (
@@ -265,96 +299,125 @@ class Parser:
         )
 
     # for_declaration ::= "LET" ident "=" expression
-    def for_declaration(self, parent_node: pydot.Node):
+    def for_declaration(self, parent_node):
         for_declaration_node = self.add_node("for_declaration", parent_node)
 
         self.match(TokenType.LET)
         self.add_node(self.curToken.text, for_declaration_node, True)
-        self.emitter.emit("int " + self.curToken.text)
-        self.symbols.add(self.curToken.text)
+        name = self.curToken.text
+        self.checkNotArray(name)
+        self.symbols.add(name)
         self.match(TokenType.IDENT)
         self.add_node(self.curToken.text, for_declaration_node, True)
-        self.emitter.emit("=")
         self.match(TokenType.EQ)
-        self.expression(for_declaration_node)
+        return name, self.expression(for_declaration_node)
 
     # for_assignment ::= ident "=" expression
-    def for_assignment(self, parent_node: pydot.Node):
+    def for_assignment(self, parent_node):
         for_assignment_node = self.add_node("for_assignment", parent_node)
-        self.emitter.emit(self.curToken.text)
-        self.symbols.add(self.curToken.text)
-        self.add_node(self.curToken.text, for_assignment_node, True)
+        name = self.curToken.text
+        self.checkNotArray(name)
+        self.symbols.add(name)
+        self.add_node(name, for_assignment_node, True)
         self.match(TokenType.IDENT)
         self.add_node(self.curToken.text, for_assignment_node, True)
-        self.emitter.emit("=")
         self.match(TokenType.EQ)
-        self.expression(for_assignment_node)
+        return name, self.expression(for_assignment_node)
+
+    def isRelationalOperator(self):
+        return (
+            self.checkToken(TokenType.GT)
+            or self.checkToken(TokenType.GTEQ)
+            or self.checkToken(TokenType.LT)
+            or self.checkToken(TokenType.LTEQ)
+        )
 
-    # comparison ::= expression (("==" | "!=" | ">" | ">=" | "<" | "<=") expression)+
-    def comparison(self, parent_node: pydot.Node):
+    # comparison ::= relation {("==" | "!=") relation}, with at least 1 comparison
+    # operator. As in C, the relational operators bind tighter: a == b < c is
+    # a == (b < c)
+    def comparison(self, parent_node):
         expression_node = self.add_node("Expression", parent_node)
-        self.expression(expression_node)
+        node = self.expression(expression_node)
         # at least 1 comparison operator should be here
         if self.isComparisonOperator():
             comparison_node = self.add_node("Comparison", expression_node)
             self.add_node(self.curToken.text, comparison_node, True)
-            self.emitter.emit(self.curToken.text)
-            self.nextToken()
-            self.expression(expression_node)
         else:
             self.abort(
                 "Expected comparison operator after expression at: "
                 + self.curToken.text
             )
+        node = self.relation(expression_node, node)
 
-        # Possibly more comparison + expressions
-        while self.isComparisonOperator():
-            self.emitter.emit(self.curToken.text)
+        # Possibly more equality + relations
+        while self.checkToken(TokenType.EQEQ) or self.checkToken(TokenType.NOTEQ):
+            op = self.curToken.text
             self.nextToken()
-            self.expression(expression_node)
+            node = BinOp(node, op, self.relation(expression_node))
+        return node
+
+    # relation ::= expression {(">" | ">=" | "<" | "<=") expression}, node is the
+    # first expression when it is already parsed
+    def relation(self, parent_node, node=None):
+        if node is None:
+            node = self.expression(parent_node)
+        while self.isRelationalOperator():
+            op = self.curToken.text
+            self.nextToken()
+            node = BinOp(node, op, self.expression(parent_node))
+        return node
 
     # expression ::= term {( "-" | "+" ) term}
-    def expression(self, parent_node: pydot.Node):
+    def expression(self, parent_node):
         expression_node = self.add_node("Expression", parent_node)
-        self.term(expression_node)
+        node = self.term(expression_node)
 
         # Can have 0+ ("-"|"+") term
         while self.checkToken(TokenType.PLUS) or self.checkToken(TokenType.MINUS):
-            self.emitter.emit(self.curToken.text)
-            self.add_node(self.curToken.text, expression_node, True)
+            op = self.curToken.text
+            self.add_node(op, expression_node, True)
             self.nextToken()
-            self.term(expression_node)
+            node = BinOp(node, op, self.term(expression_node))
+        return node
 
     # term ::= unary {( "/" | "*" ) unary}
-    def term(self, parent_node: pydot.Node):
+    def term(self, parent_node):
         term_node = self.add_node("Term", parent_node)
-        self.unary(term_node)
+        node = self.unary(term_node)
 
         while self.checkToken(TokenType.SLASH) or self.checkToken(TokenType.ASTERISK):
-            self.add_node(self.curToken.text, term_node, True)
-            self.emitter.emit(self.curToken.text)
+            op = self.curToken.text
+            self.add_node(op, term_node, True)
             self.nextToken()
-            self.unary(term_node)
+            node = BinOp(node, op, self.unary(term_node))
+        return node
 
     # unary ::= ["+" | "-"] primary
-    def unary(self, parent_node: pydot.Node):
+    def unary(self, parent_node):
         unary_node = self.add_node("Unary", parent_node)
 
         # Optional sign
         if self.checkToken(TokenType.MINUS) or self.checkToken(TokenType.PLUS):
-            self.emitter.emit(self.curToken.text)
+            op = self.curToken.text
             self.nextToken()
-        self.primary(unary_node)
+            return Unary(op, self.primary(unary_node))
+        return self.primary(unary_node)
 
-    # primary ::= number | ident
-    def primary(self, parent_node: pydot.Node):
+    # primary ::= number | ident | ident "(" expression ")" | "(" expression ")"
+    def primary(self, parent_node):
         primary_node = self.add_node("Primary", parent_node)
 
         if self.checkToken(TokenType.NUMBER):
-            self.emitter.emit(self.curToken.text)
+            node = Number(self.curToken.text)
             number_node = self.add_node("Number", primary_node)
             self.add_node(self.curToken.text, number_node, True)
             self.nextToken()
+        elif self.checkToken(TokenType.IDENT) and self.curToken.text in self.arrays:
+            name = self.curToken.text
+            index_node = self.add_node("Index", primary_node)
+            self.add_node(name, index_node, True)
+            self.nextToken()
+            node = Index(name, self.index(name, index_node))
         elif self.checkToken(TokenType.IDENT):
             # Make sure IDENT exists
             if self.curToken.text not in self.symbols:
@@ -363,18 +426,19 @@ class Parser:
                 )
             ident_node = self.add_node("Ident", primary_node)
             self.add_node(self.curToken.text, ident_node, True)
-            self.emitter.emit(self.curToken.text)
+            node = Ident(self.curToken.text)
             self.nextToken()
+            if self.checkToken(TokenType.OPEN_PAREN):
+                self.abort(node.name + " is not an array")
         elif self.checkToken(TokenType.OPEN_PAREN):
-            self.emitter.emit(self.curToken.text)
             self.nextToken()
             self.add_node("(", primary_node, True)
-            self.expression(primary_node)
-            self.emitter.emit(self.curToken.text)
+            node = Group(self.expression(primary_node))
             self.match(TokenType.CLOSE_PAREN)
             self.add_node(")", primary_node, True)
         else:
             self.abort("Unexpected token at " + self.curToken.text)
+        return node
 
     # nl ::= '\n'+
     def nl(self):
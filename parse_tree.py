@@ -0,0 +1,37 @@
+import subprocess
+
+
+# Writes the parse tree as DOT text while the parser runs, so no graph is ever held in memory
+class ParseTree:
+    def __init__(self, outFile) -> None:
+        self.outFile = outFile  # Any file-like object with a write() method
+        self.node_count = 0
+        self.outFile.write("digraph {\n")
+
+    # Write a node (and the edge from its parent) and return its id
+    def add_node(self, label, parent=None, leaf=False) -> int:
+        node = self.node_count
+        label = label.replace("\\", "\\\\").replace('"', '\\"')
+        if leaf:
+            self.outFile.write(
+                '%d [label="%s", style=filled, fillcolor=grey, fontcolor=white];\n'
+                % (node, label)
+            )
+        else:
+            self.outFile.write(
+                '%d [label="%s", shape=square, style=filled, fillcolor=black, fontcolor=white];\n'
+                % (node, label)
+            )
+        if parent is not None:
+            self.outFile.write("%d -> %d;\n" % (parent, node))
+        self.node_count += 1
+        return node
+
+    # Close the graph, the caller owns (and closes) the underlying file
+    def finish(self) -> None:
+        self.outFile.write("}\n")
+
+
+# Render a DOT file with Graphviz, e.g. parse_tree.dot -> parse_tree.png
+def render(dotPath, outPath, format="png") -> None:
+    subprocess.run(["dot", "-T" + format, dotPath, "-o", outPath], check=True)
@@ -0,0 +1,90 @@
+from token_1 import TokenType
+from ast_nodes import BinOp, Unary, Number, Ident, Index, Group
+from parse import Parser
+
+PLUS = TokenType.PLUS
+MINUS = TokenType.MINUS
+ASTERISK = TokenType.ASTERISK
+SLASH = TokenType.SLASH
+NUMBER = TokenType.NUMBER
+IDENT = TokenType.IDENT
+OPEN_PAREN = TokenType.OPEN_PAREN
+CLOSE_PAREN = TokenType.CLOSE_PAREN
+
+
+# Parser whose expressions are parsed by precedence climbing in a loop, with an explicit
+# stack of the parens and array indexes still open, instead of a call of expression,
+# term, unary and primary per operand and per paren. Expressions can be as long and
+# nested as memory allows, and the AST and the errors are the same as Parser's. With a
+# parse tree the recursive rules are used, they add its nodes.
+class PrecedenceParser(Parser):
+    def expression(self, parent_node):
+        if self.tree is not None:
+            return super().expression(parent_node)
+        nextToken = self.nextToken
+        arrays = self.arrays
+        # Each open paren or index saves the state of the expression around it:
+        # (expr, addOp, term, mulOp, sign, array name or None for a paren)
+        stack = []
+        expr = addOp = term = mulOp = sign = None
+        while True:
+            # unary ::= ["+" | "-"] primary
+            token = self.curToken
+            kind = token.kind
+            if kind is MINUS or kind is PLUS:
+                sign = token.text
+                nextToken()
+                token = self.curToken
+                kind = token.kind
+            if kind is NUMBER:
+                node = Number(token.text)
+                nextToken()
+            elif kind is IDENT and token.text in arrays:
+                nextToken()
+                if not self.checkToken(OPEN_PAREN):
+                    name = token.text
+                    self.abort("Array " + name + " needs an index: " + name + "(...)")
+                nextToken()
+                stack.append((expr, addOp, term, mulOp, sign, token.text))
+                expr = addOp = term = mulOp = sign = None
+                continue
+            elif kind is IDENT:
+                if token.text not in self.symbols:
+                    self.abort("Referencing variable before assignment: " + token.text)
+                node = Ident(token.text)
+                nextToken()
+                if self.checkToken(OPEN_PAREN):
+                    self.abort(node.name + " is not an array")
+            elif kind is OPEN_PAREN:
+                nextToken()
+                stack.append((expr, addOp, term, mulOp, sign, None))
+                expr = addOp = term = mulOp = sign = None
+                continue
+            else:
+                self.abort("Unexpected token at " + token.text)
+
+            while True:
+                if sign is not None:
+                    node = Unary(sign, node)
+                    sign = None
+                # term ::= unary {( "/" | "*" ) unary}
+                term = node if term is None else BinOp(term, mulOp, node)
+                kind = self.curToken.kind
+                if kind is ASTERISK or kind is SLASH:
+                    mulOp = self.curToken.text
+                    nextToken()
+                    break
+                # expression ::= term {( "-" | "+" ) term}
+                expr = term if expr is None else BinOp(expr, addOp, term)
+                term = None
+                if kind is PLUS or kind is MINUS:
+                    addOp = self.curToken.text
+                    nextToken()
+                    break
+                if not stack:
+                    return expr
+                # The expression in a paren or index is complete
+                self.match(CLOSE_PAREN)
+                inner = expr
+                expr, addOp, term, mulOp, sign, name = stack.pop()
+                node = Group(inner) if name is None else Index(name, inner)
@@ -0,0 +1,140 @@
+import json
+import time
+from ast_nodes import Node
+
+try:
+    import resource
+except ImportError:  # Not on Windows
+    resource = None
+
+# Statistics of one compile: wall time per phase and a few counts. Tools can follow a
+# compile as it happens through hooks, callables taking (event, name, value):
+#   ("start", phase, None)     a phase begins
+#   ("end", phase, seconds)    a phase is over
+#   ("count", name, value)     a count is known
+# Lexing and parse tree writing happen while parsing, their time is measured per call
+# and taken out of the parse phase.
+
+
+class CompileStats:
+    def __init__(self, hooks=()) -> None:
+        self.hooks = list(hooks)
+        self.phases = {}  # phase -> seconds, in the order the phases ran
+        self.counts = {}
+
+    def addHook(self, hook) -> None:
+        self.hooks.append(hook)
+
+    def notify(self, event, name, value=None) -> None:
+        for hook in self.hooks:
+            hook(event, name, value)
+
+    # Time a phase: with stats.phase("emit"): ...
+    def phase(self, name):
+        return PhaseTimer(self, name)
+
+    def addTime(self, name, seconds) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, value) -> None:
+        self.counts[name] = value
+        self.notify("count", name, value)
+
+    def toDict(self) -> dict:
+        total = sum(self.phases.values())
+        result = {"phases": dict(self.phases), "total": total}
+        result.update(self.counts)
+        tokens = self.counts.get("tokens")
+        if tokens and self.phases.get("lex"):
+            result["tokensPerSecond"] = tokens / self.phases["lex"]
+        if resource is not None:
+            # ru_maxrss is in KB on Linux
+            result["peakMemoryKB"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return result
+
+    def toJSON(self) -> str:
+        return json.dumps(self.toDict(), indent=1)
+
+    def format(self) -> str:
+        data = self.toDict()
+        total = data["total"]
+        lines = ["phase          seconds      %"]
+        for name, seconds in data["phases"].items():
+            share = 100 * seconds / total if total else 0
+            lines.append("%-12s %9.4f %6.1f" % (name, seconds, share))
+        lines.append("%-12s %9.4f" % ("total", total))
+        for name, value in data.items():
+            if name in ("phases", "total"):
+                continue
+            if isinstance(value, float):
+                value = "%.0f" % value
+            lines.append("%-16s %s" % (name, value))
+        return "\n".join(lines)
+
+
+class PhaseTimer:
+    def __init__(self, stats, name) -> None:
+        self.stats = stats
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.stats.notify("start", self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        seconds = time.perf_counter() - self.start
+        self.stats.addTime(self.name, seconds)
+        self.stats.notify("end", self.name, seconds)
+        return False
+
+
+# Lexer wrapper counting tokens and the time spent in getToken
+class TimedLexer:
+    def __init__(self, lexer) -> None:
+        self.lexer = lexer
+        self.seconds = 0.0
+        self.tokens = 0
+
+    def getToken(self):
+        start = time.perf_counter()
+        token = self.lexer.getToken()
+        self.seconds += time.perf_counter() - start
+        if token.kind.name != "EOF":
+            self.tokens += 1
+        return token
+
+    # abort(), location() and the rest go to the lexer
+    def __getattr__(self, name):
+        return getattr(self.lexer, name)
+
+
+# ParseTree wrapper measuring the time spent writing nodes
+class TimedTree:
+    def __init__(self, tree) -> None:
+        self.tree = tree
+        self.seconds = 0.0
+
+    def add_node(self, label, parent=None, leaf=False):
+        start = time.perf_counter()
+        node = self.tree.add_node(label, parent, leaf)
+        self.seconds += time.perf_counter() - start
+        return node
+
+    def __getattr__(self, name):
+        return getattr(self.tree, name)
+
+
+# Number of AST nodes under node (a node or a list of them)
+def countNodes(node) -> int:
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, Node):
+            count += 1
+            stack.extend(getattr(node, slot) for slot in type(node).__slots__)
+    return count
@@ -0,0 +1,161 @@
+import codecs
+import io
+from token_1 import TokenType, Token
+from errors import LexError
+from fast_lexer import (
+    TOKEN_PATTERN,
+    NEWLINE,
+    NUMBER,
+    WORD,
+    STRING,
+    OPERATOR,
+    END,
+    OPERATORS,
+    KEYWORDS,
+    BOOLEANS,
+    describeError,
+)
+
+CHUNK_SIZE = 1 << 16  # chars (or bytes) read from the stream at a time
+
+
+# 1-based (line, column) of a source offset in text starting at offset base, where base
+# is on line `line`, which starts at offset lineStart
+def findWindowLocation(text, base, line, lineStart, pos):
+    local = pos - base
+    newlines = text.count("\n", 0, local)
+    if newlines:
+        column = local - text.rfind("\n", 0, local)
+    else:
+        column = pos - lineStart + 1
+    return line + newlines, column
+
+
+# FastLexer over a stream instead of a string: a text file, a binary file, stdin or an
+# mmap.mmap, read a chunk at a time as the parser asks for tokens. Tokens are matched in
+# a window that starts at the previous token and always holds the rest of the current
+# line, since no token but a newline crosses one. Memory is bounded by the chunk size
+# and the longest line, not by the size of the source. Bytes are decoded as UTF-8 with
+# the newline translation of a file opened in text mode. A str source is read from a
+# StringIO, so this is a drop-in replacement for the other lexers.
+class StreamLexer:
+    def __init__(self, source, chunkSize=CHUNK_SIZE):
+        if isinstance(source, str):
+            source = io.StringIO(source)
+        self.stream = source
+        self.chunkSize = chunkSize
+        self.decoder = None  # Created by the first read that returns bytes
+        try:
+            self.origin = source.tell()  # Where to read again from, see location()
+        except (AttributeError, OSError):
+            self.origin = None  # A pipe or a terminal
+        self.window = ""
+        self.base = 0  # Source offset of window[0]
+        self.line = 1  # Line of window[0]
+        self.lineStart = 0  # Source offset where that line starts
+        self.lastNewline = -1  # Offset of the last "\n" in the window
+        self.previous = 0  # Source offset of the last token returned
+        self.atEnd = False
+        self.curPos = 0  # Offset in the window
+        self.match = TOKEN_PATTERN.match
+
+    # Next chunk of text from the stream, "" at the end
+    def readChunk(self) -> str:
+        data = self.stream.read(self.chunkSize)
+        if isinstance(data, str):
+            return data
+        if self.decoder is None:
+            self.decoder = io.IncrementalNewlineDecoder(
+                codecs.getincrementaldecoder("utf-8")(), translate=True
+            )
+        text = self.decoder.decode(data, final=not data)
+        while data and not text:  # A chunk that ended in the middle of a char or \r\n
+            data = self.stream.read(self.chunkSize)
+            text = self.decoder.decode(data, final=not data)
+        return text
+
+    # Read until the window holds a "\n" at or after the current position. The text
+    # before the previous token is dropped first, the parser's errors point at it.
+    def fill(self) -> None:
+        cut = self.previous - self.base
+        if cut > 0:
+            dropped = self.window[:cut]
+            newlines = dropped.count("\n")
+            if newlines:
+                self.line += newlines
+                self.lineStart = self.base + dropped.rfind("\n") + 1
+            self.window = self.window[cut:]
+            self.base += cut
+            self.curPos -= cut
+            self.lastNewline -= cut
+        while self.lastNewline < self.curPos and not self.atEnd:
+            text = self.readChunk()
+            if not text:
+                self.atEnd = True
+                text = "\n"  # Like the source + "\n" of the other lexers
+            newline = text.rfind("\n")
+            if newline >= 0:
+                self.lastNewline = len(self.window) + newline
+            self.window += text
+
+    # Invalid token found, raise a LexError pointing at it
+    def abort(self, message, pos) -> None:
+        raise LexError(message, pos, *self.location(pos))
+
+    # 1-based (line, column) of a source offset, for error messages. An offset before
+    # the window (the first GOTO to a label that is never declared) is found by reading
+    # the stream again from the start, a stream that can't seek gives (None, None) and
+    # the error only the offset.
+    def location(self, pos):
+        if pos >= self.base:
+            return findWindowLocation(
+                self.window, self.base, self.line, self.lineStart, pos
+            )
+        if self.origin is None:
+            return None, None
+        resume = self.stream.tell()
+        self.stream.seek(self.origin)
+        scanner = StreamLexer(self.stream, self.chunkSize)
+        line, lineStart, offset = 1, 0, 0
+        while True:
+            text = scanner.readChunk()
+            if pos < offset + len(text) or not text:
+                break
+            newlines = text.count("\n")
+            if newlines:
+                line += newlines
+                lineStart = offset + text.rfind("\n") + 1
+            offset += len(text)
+        self.stream.seek(resume)
+        return findWindowLocation(text, offset, line, lineStart, pos)
+
+    # Return the next token.
+    def getToken(self) -> Token:
+        if self.lastNewline < self.curPos and not self.atEnd:
+            self.fill()
+        m = self.match(self.window, self.curPos)
+        group = m.lastindex
+        text = m.group(group)
+        start = m.start(group)
+        self.curPos = m.end()
+        pos = self.base + start
+        self.previous = pos
+
+        if group == NEWLINE:
+            return Token(text, TokenType.NEWLINE, pos)
+        if group == WORD:
+            kind = KEYWORDS.get(text)
+            if kind is None:
+                kind = TokenType.BOOLEAN if text.lower() in BOOLEANS else TokenType.IDENT
+            return Token(text, kind, pos)
+        if group == OPERATOR:
+            return Token(text, OPERATORS[text], pos)
+        if group == NUMBER and text[-1] != ".":
+            return Token(text, TokenType.NUMBER, pos)
+        if group == STRING:
+            self.previous = pos - 1
+            return Token(text, TokenType.STRING, pos - 1)
+        if group == END:
+            return Token("\0", TokenType.EOF, pos)
+        message, errorPos = describeError(self.window, start, text, self.curPos)
+        self.abort(message, self.base + errorPos)
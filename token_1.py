@@ -1,19 +1,18 @@
 from enum import Enum
 
 
-# Contains original text and type of token
+# Contains original text, type and source offset of token
 class Token:
-    def __init__(self, tokenText: str, tokenKind: Enum):
+    __slots__ = ("text", "kind", "pos")
+
+    def __init__(self, tokenText: str, tokenKind: Enum, pos: int = None):
         self.text = tokenText
         self.kind = tokenKind
+        self.pos = pos  # Offset of the first char of the token in the source
 
     @staticmethod
     def isKeyword(text: str) -> bool:
-        try:
-            TokenType[text]
-            return True
-        except Exception as e:
-            return False
+        return text in TokenType.__members__
 
     @staticmethod
     def isBoolean(text: str) -> bool:
@@ -22,6 +21,13 @@ class Token:
         return False
 
 
+# Turn a source offset into a 1-based (line, column)
+def findLocation(source: str, pos: int):
+    line = source.count("\n", 0, pos) + 1
+    column = pos - source.rfind("\n", 0, pos)
+    return line, column
+
+
 # Enum for token type
 class TokenType(Enum):
     EOF = -1
@@ -45,6 +51,7 @@ class TokenType(Enum):
     ENDWHILE = 111
     FOR = 112
     ENDFOR = 114
+    DIM = 115
     # Operators
     EQ = 201
     PLUS = 202
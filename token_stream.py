@@ -0,0 +1,121 @@
+from array import array
+from fast_lexer import (
+    TOKEN_PATTERN,
+    NEWLINE,
+    NUMBER,
+    WORD,
+    STRING,
+    OPERATOR,
+    END,
+    KEYWORDS,
+    BOOLEANS,
+    OPERATORS,
+    describeError,
+)
+from token_1 import TokenType, Token, findLocation
+from errors import LexError
+
+# Token kinds are stored as small codes, KINDS maps them back to TokenType
+KINDS = list(TokenType)
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+WORD_CODES = {text: KIND_CODES[kind] for text, kind in KEYWORDS.items()}
+OPERATOR_CODES = {text: KIND_CODES[kind] for text, kind in OPERATORS.items()}
+ERROR_CODE = 255  # Marks where lexing failed, the error is raised when the parser gets there
+
+
+# Tokenizes the whole source up front into parallel typed arrays (kind, start, length).
+# Token text is sliced from the source only when a token is asked for, so a token costs
+# 13 bytes instead of a Token object and its string.
+class TokenStream:
+    def __init__(self, source):
+        self.source = source + "\n"
+        self.kinds = array("B")
+        self.starts = array("Q")  # Offset of the token text (inside the quotes for strings)
+        self.lengths = array("I")
+        self.error = None  # (message, offset) of the lexing error, if any
+        self.index = 0  # Next token handed out by getToken
+        self.tokenize()
+
+    def tokenize(self) -> None:
+        source = self.source
+        match = TOKEN_PATTERN.match
+        addKind = self.kinds.append
+        addStart = self.starts.append
+        addLength = self.lengths.append
+        newlineCode = KIND_CODES[TokenType.NEWLINE]
+        numberCode = KIND_CODES[TokenType.NUMBER]
+        stringCode = KIND_CODES[TokenType.STRING]
+        identCode = KIND_CODES[TokenType.IDENT]
+        booleanCode = KIND_CODES[TokenType.BOOLEAN]
+        eofCode = KIND_CODES[TokenType.EOF]
+
+        pos = 0
+        while True:
+            m = match(source, pos)
+            group = m.lastindex
+            start, end = m.span(group)
+            pos = m.end()
+
+            if group == NEWLINE:
+                code = newlineCode
+            elif group == WORD:
+                text = source[start:end]
+                code = WORD_CODES.get(text)
+                if code is None:
+                    code = booleanCode if text.lower() in BOOLEANS else identCode
+            elif group == OPERATOR:
+                code = OPERATOR_CODES[source[start:end]]
+            elif group == NUMBER and source[end - 1] != ".":
+                code = numberCode
+            elif group == STRING:
+                code = stringCode
+            elif group == END:
+                code = eofCode
+            else:
+                self.error = describeError(source, start, source[start:end], pos)
+                code = ERROR_CODE
+
+            addKind(code)
+            addStart(start)
+            addLength(end - start)
+            if group == END or code == ERROR_CODE:
+                break
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def kind(self, index) -> TokenType:
+        return KINDS[self.kinds[index]]
+
+    def text(self, index) -> str:
+        length = self.lengths[index]
+        if length == 0 and self.kinds[index] == KIND_CODES[TokenType.EOF]:
+            return "\0"
+        start = self.starts[index]
+        return self.source[start : start + length]
+
+    # Build the Token view for one entry
+    def token(self, index) -> Token:
+        code = self.kinds[index]
+        if code == ERROR_CODE:
+            self.abort(*self.error)
+        kind = KINDS[code]
+        pos = self.starts[index]
+        if kind == TokenType.STRING:
+            pos -= 1  # Point at the opening quote
+        return Token(self.text(index), kind, pos)
+
+    # Return the next token, same interface as Lexer.getToken. Keeps returning the final EOF.
+    def getToken(self) -> Token:
+        index = self.index
+        if index < len(self.kinds) - 1:
+            self.index = index + 1
+        return self.token(index)
+
+    # Invalid token found, raise a LexError pointing at it
+    def abort(self, message, pos) -> None:
+        raise LexError(message, pos, *self.location(pos))
+
+    # 1-based (line, column) of a source offset, for error messages
+    def location(self, pos) -> tuple[int, int]:
+        return findLocation(self.source, pos)
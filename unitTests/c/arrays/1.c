@@ -0,0 +1,270 @@
+#include <stdio.h>
+#include <string.h>
+#include <errno.h>
+#include <stdlib.h>
+#include <unistd.h>
+#define YOLO_OUT_SIZE (1 << 16)
+static char yolo_out[YOLO_OUT_SIZE];
+static int yolo_out_len;
+static void yolo_flush(void){
+if(yolo_out_len == 0) return;
+fwrite(yolo_out, 1, yolo_out_len, stdout);
+fflush(stdout);
+yolo_out_len = 0;
+}
+static void yolo_write(const char *text, int length){
+if(yolo_out_len + length > YOLO_OUT_SIZE){
+yolo_flush();
+if(length > YOLO_OUT_SIZE){
+fwrite(text, 1, length, stdout);
+fflush(stdout);
+return;
+}
+}
+memcpy(yolo_out + yolo_out_len, text, length);
+yolo_out_len += length;
+}
+#define YOLO_PUTS(text) yolo_write(text, sizeof(text) - 1)
+static void yolo_print_digits(unsigned long long whole, int hundredths, int negative){
+char digits[32];
+char *end = digits + sizeof(digits);
+char *start = end;
+*--start = '\n';
+*--start = '0' + hundredths % 10;
+*--start = '0' + hundredths / 10;
+*--start = '.';
+do {
+*--start = '0' + whole % 10;
+whole /= 10;
+} while(whole);
+if(negative) *--start = '-';
+yolo_write(start, end - start);
+}
+static void yolo_print_fixed(double value){
+if(!(value < 1e16 && value > -1e16)){
+if(yolo_out_len + 400 > YOLO_OUT_SIZE) yolo_flush();
+yolo_out_len += snprintf(yolo_out + yolo_out_len, 400, "%.2f\n", value);
+return;
+}
+unsigned long long bits;
+memcpy(&bits, &value, sizeof(bits));
+int exponent = (int)(bits >> 52 & 0x7ff);
+unsigned long long mantissa = bits & 0xfffffffffffffULL;
+if(exponent) mantissa |= 1ULL << 52;
+else exponent = 1;
+int shift = 1075 - exponent;
+unsigned long long hundredths;
+if(shift <= 0){
+hundredths = (mantissa << -shift) * 100;
+} else if(shift > 60){
+hundredths = 0;
+} else {
+unsigned long long scaled = mantissa * 100;
+unsigned long long rest = scaled & ((1ULL << shift) - 1);
+unsigned long long half = 1ULL << (shift - 1);
+hundredths = scaled >> shift;
+if(rest > half || (rest == half && (hundredths & 1))) hundredths++;
+}
+yolo_print_digits(hundredths / 100, (int)(hundredths % 100), (int)(bits >> 63));
+}
+static char *yolo_in;
+static int yolo_in_size, yolo_in_pos, yolo_in_len, yolo_in_eof;
+static int yolo_in_mark; /* start of the number being scanned, kept by yolo_fill */
+static unsigned long long yolo_num_mantissa;
+static int yolo_num_exponent, yolo_num_exact;
+/* Read more input after what is buffered, -1 at the end of the input */
+static int yolo_fill(void){
+int keep = yolo_in_len - yolo_in_mark;
+int count;
+if(yolo_in_eof) return -1;
+if(yolo_in_mark){
+memmove(yolo_in, yolo_in + yolo_in_mark, keep);
+yolo_in_pos -= yolo_in_mark;
+yolo_in_len = keep;
+yolo_in_mark = 0;
+}
+if(yolo_in_size - yolo_in_len < (1 << 12)){
+yolo_in_size = yolo_in_size ? yolo_in_size * 2 : 1 << 16;
+yolo_in = realloc(yolo_in, yolo_in_size);
+if(!yolo_in) exit(1);
+}
+/* One byte stays free to end the number with a NUL for strtod */
+do count = read(0, yolo_in + yolo_in_len, yolo_in_size - yolo_in_len - 1);
+while(count < 0 && errno == EINTR);
+if(count <= 0){
+yolo_in_eof = 1;
+return -1;
+}
+yolo_in_len += count;
+return (unsigned char)yolo_in[yolo_in_pos];
+}
+#define YOLO_PEEK() \
+(yolo_in_pos < yolo_in_len ? (unsigned char)yolo_in[yolo_in_pos] : yolo_fill())
+#define YOLO_SPACE(c) ((c) == ' ' || ((c) >= '\t' && (c) <= '\r'))
+#define YOLO_DIGIT(c) ((unsigned)((c) - '0') < 10)
+#define YOLO_LOWER(c) ((c) >= 'A' && (c) <= 'Z' ? (c) + 32 : (c))
+#define YOLO_HEX(c) (YOLO_DIGIT(c) || (unsigned)(YOLO_LOWER(c) - 'a') < 6)
+static int yolo_skip_space(void){
+int c;
+yolo_in_mark = yolo_in_len;
+c = YOLO_PEEK();
+while(YOLO_SPACE(c)){
+yolo_in_pos++;
+yolo_in_mark = yolo_in_len;
+c = YOLO_PEEK();
+}
+yolo_in_mark = yolo_in_pos;
+return c;
+}
+static int yolo_take_digits(int fraction){
+int c = YOLO_PEEK();
+int count = 0;
+while(YOLO_DIGIT(c)){
+if(yolo_num_mantissa || c != '0'){
+if(yolo_num_mantissa >= 100000000000000000ULL) yolo_num_exact = 0;
+yolo_num_mantissa = yolo_num_mantissa * 10 + (c - '0');
+}
+yolo_num_exponent -= fraction;
+yolo_in_pos++;
+count++;
+c = YOLO_PEEK();
+}
+return count;
+}
+static int yolo_take_hex(void){
+int c = YOLO_PEEK();
+int count = 0;
+while(YOLO_HEX(c)){
+yolo_in_pos++;
+count++;
+c = YOLO_PEEK();
+}
+return count;
+}
+static int yolo_take_word(const char *word){
+int count = 0;
+int c = YOLO_PEEK();
+while(word[count] && YOLO_LOWER(c) == word[count]){
+yolo_in_pos++;
+count++;
+c = YOLO_PEEK();
+}
+return count;
+}
+static void yolo_take_exponent(int marker){
+int c = YOLO_PEEK();
+int negative = 0, value = 0;
+if(YOLO_LOWER(c) != marker) return;
+yolo_in_pos++;
+c = YOLO_PEEK();
+if(c == '+' || c == '-'){
+negative = c == '-';
+yolo_in_pos++;
+c = YOLO_PEEK();
+}
+while(YOLO_DIGIT(c)){
+if(value < 100000) value = value * 10 + (c - '0');
+yolo_in_pos++;
+c = YOLO_PEEK();
+}
+yolo_num_exponent += negative ? -value : value;
+}
+/* 1 when the next number was scanned (from yolo_in_mark to yolo_in_pos), 0 if the input
+   does not start with a number and -1 at the end of the input */
+static int yolo_scan_number(void){
+int c = yolo_skip_space();
+int digits, fraction = 0;
+if(c < 0) return -1;
+yolo_num_mantissa = 0;
+yolo_num_exponent = 0;
+yolo_num_exact = 1;
+if(c == '+' || c == '-'){
+yolo_in_pos++;
+c = YOLO_PEEK();
+}
+if(YOLO_LOWER(c) == 'i' || YOLO_LOWER(c) == 'n'){
+int count = yolo_take_word(YOLO_LOWER(c) == 'i' ? "infinity" : "nan");
+yolo_num_exact = 0;
+if(count == 3 || count == 8) return 1;
+/* A word that stops matching halfway is read up to its first wrong char, included */
+if(YOLO_PEEK() >= 0) yolo_in_pos++;
+return 0;
+}
+digits = yolo_take_digits(0);
+c = YOLO_PEEK();
+if(digits == 1 && yolo_in[yolo_in_pos - 1] == '0' && YOLO_LOWER(c) == 'x'){
+yolo_num_exact = 0;
+yolo_in_pos++;
+digits = yolo_take_hex();
+if(YOLO_PEEK() == '.'){
+yolo_in_pos++;
+fraction = yolo_take_hex();
+if(!digits && !fraction) return 1; /* glibc reads "0x." as 0 */
+}
+if(!digits && !fraction) return 0;
+yolo_take_exponent('p');
+return 1;
+}
+if(c == '.'){
+yolo_in_pos++;
+fraction = yolo_take_digits(1);
+}
+if(!digits && !fraction) return 0;
+yolo_take_exponent('e');
+return 1;
+}
+/* scanf("%*s") */
+static void yolo_skip_word(void){
+int c = yolo_skip_space();
+while(c >= 0 && !YOLO_SPACE(c)){
+yolo_in_pos++;
+yolo_in_mark = yolo_in_pos;
+c = YOLO_PEEK();
+}
+}
+/* strtod/strtof of the scanned number, ended with a NUL for the call */
+static double yolo_strtod(int isFloat){
+char saved = yolo_in[yolo_in_pos];
+double value;
+yolo_in[yolo_in_pos] = 0;
+if(isFloat) value = strtof(yolo_in + yolo_in_mark, NULL);
+else value = strtod(yolo_in + yolo_in_mark, NULL);
+yolo_in[yolo_in_pos] = saved;
+return value;
+}
+static const float yolo_pow10f[] = {1e0f, 1e1f, 1e2f, 1e3f, 1e4f, 1e5f, 1e6f, 1e7f, 1e8f,
+1e9f, 1e10f};
+static void yolo_input_float(float *var){
+int found;
+yolo_flush();
+found = yolo_scan_number();
+if(found < 0) return;
+if(!found){
+*var = 0;
+yolo_skip_word();
+} else if(yolo_num_exact && yolo_num_mantissa <= 1 << 24
+&& yolo_num_exponent >= -10 && yolo_num_exponent <= 10){
+float value = (float)yolo_num_mantissa;
+if(yolo_num_exponent < 0) value /= yolo_pow10f[-yolo_num_exponent];
+else value *= yolo_pow10f[yolo_num_exponent];
+*var = yolo_in[yolo_in_mark] == '-' ? -value : value;
+} else {
+*var = (float)yolo_strtod(1);
+}
+}
+int main(){
+static float squares[10];
+static float sums[11];
+float half;
+for(int i=0;i<10;i=i+1){
+squares[i] = i*i;
+sums[i+1] = sums[i]+squares[i];
+}
+half = 4.5;
+yolo_print_fixed((float)(squares[(long long)(half)]));
+yolo_print_fixed((float)(sums[10]-squares[9-1]));
+yolo_input_float(&squares[(long long)(half*2)]);
+yolo_print_fixed((float)(squares[9]));
+yolo_flush();
+return 0;
+}
@@ -1,19 +1,43 @@
 #include <stdio.h>
+#include <string.h>
+#define YOLO_OUT_SIZE (1 << 16)
+static char yolo_out[YOLO_OUT_SIZE];
+static int yolo_out_len;
+static void yolo_flush(void){
+if(yolo_out_len == 0) return;
+fwrite(yolo_out, 1, yolo_out_len, stdout);
+fflush(stdout);
+yolo_out_len = 0;
+}
+static void yolo_write(const char *text, int length){
+if(yolo_out_len + length > YOLO_OUT_SIZE){
+yolo_flush();
+if(length > YOLO_OUT_SIZE){
+fwrite(text, 1, length, stdout);
+fflush(stdout);
+return;
+}
+}
+memcpy(yolo_out + yolo_out_len, text, length);
+yolo_out_len += length;
+}
+#define YOLO_PUTS(text) yolo_write(text, sizeof(text) - 1)
 int main(){
 if(5>4){
-printf("ALL IS WELL\n");
+YOLO_PUTS("ALL IS WELL\n");
 }
 if(5>=4){
-printf("ALL IS WELL\n");
+YOLO_PUTS("ALL IS WELL\n");
 }
 if(5==4){
-printf("HOUSTON WE HAVE A PROBLEM\n");
+YOLO_PUTS("HOUSTON WE HAVE A PROBLEM\n");
 }
 if(5<4){
-printf("HOUSTON WE HAVE A PROBLEM\n");
+YOLO_PUTS("HOUSTON WE HAVE A PROBLEM\n");
 }
 if(5<=4){
-printf("HOUSTON WE HAVE A PROBLEM\n");
+YOLO_PUTS("HOUSTON WE HAVE A PROBLEM\n");
 }
+yolo_flush();
 return 0;
 }
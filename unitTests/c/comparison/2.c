@@ -0,0 +1,90 @@
+#include <stdio.h>
+#include <string.h>
+#define YOLO_OUT_SIZE (1 << 16)
+static char yolo_out[YOLO_OUT_SIZE];
+static int yolo_out_len;
+static void yolo_flush(void){
+if(yolo_out_len == 0) return;
+fwrite(yolo_out, 1, yolo_out_len, stdout);
+fflush(stdout);
+yolo_out_len = 0;
+}
+static void yolo_write(const char *text, int length){
+if(yolo_out_len + length > YOLO_OUT_SIZE){
+yolo_flush();
+if(length > YOLO_OUT_SIZE){
+fwrite(text, 1, length, stdout);
+fflush(stdout);
+return;
+}
+}
+memcpy(yolo_out + yolo_out_len, text, length);
+yolo_out_len += length;
+}
+#define YOLO_PUTS(text) yolo_write(text, sizeof(text) - 1)
+static void yolo_print_digits(unsigned long long whole, int hundredths, int negative){
+char digits[32];
+char *end = digits + sizeof(digits);
+char *start = end;
+*--start = '\n';
+*--start = '0' + hundredths % 10;
+*--start = '0' + hundredths / 10;
+*--start = '.';
+do {
+*--start = '0' + whole % 10;
+whole /= 10;
+} while(whole);
+if(negative) *--start = '-';
+yolo_write(start, end - start);
+}
+static void yolo_print_fixed(double value){
+if(!(value < 1e16 && value > -1e16)){
+if(yolo_out_len + 400 > YOLO_OUT_SIZE) yolo_flush();
+yolo_out_len += snprintf(yolo_out + yolo_out_len, 400, "%.2f\n", value);
+return;
+}
+unsigned long long bits;
+memcpy(&bits, &value, sizeof(bits));
+int exponent = (int)(bits >> 52 & 0x7ff);
+unsigned long long mantissa = bits & 0xfffffffffffffULL;
+if(exponent) mantissa |= 1ULL << 52;
+else exponent = 1;
+int shift = 1075 - exponent;
+unsigned long long hundredths;
+if(shift <= 0){
+hundredths = (mantissa << -shift) * 100;
+} else if(shift > 60){
+hundredths = 0;
+} else {
+unsigned long long scaled = mantissa * 100;
+unsigned long long rest = scaled & ((1ULL << shift) - 1);
+unsigned long long half = 1ULL << (shift - 1);
+hundredths = scaled >> shift;
+if(rest > half || (rest == half && (hundredths & 1))) hundredths++;
+}
+yolo_print_digits(hundredths / 100, (int)(hundredths % 100), (int)(bits >> 63));
+}
+int main(){
+float a;
+float b;
+a = 0;
+b = 2;
+if(a==a<a){
+YOLO_PUTS("yes\n");
+}
+if(b<a==a>b){
+YOLO_PUTS("both false\n");
+}
+if(1!=b>=2==0){
+YOLO_PUTS("equality left to right\n");
+}
+if(a<b<2){
+YOLO_PUTS("left to right\n");
+}
+while(b>a!=0){
+b = b-1;
+}
+yolo_print_fixed((float)(b));
+yolo_flush();
+return 0;
+}
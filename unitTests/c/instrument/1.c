@@ -0,0 +1,140 @@
+#include <stdio.h>
+#include <string.h>
+#include <signal.h>
+#include <stdlib.h>
+#include <time.h>
+#define YOLO_OUT_SIZE (1 << 16)
+static char yolo_out[YOLO_OUT_SIZE];
+static int yolo_out_len;
+static void yolo_flush(void){
+if(yolo_out_len == 0) return;
+fwrite(yolo_out, 1, yolo_out_len, stdout);
+fflush(stdout);
+yolo_out_len = 0;
+}
+static void yolo_write(const char *text, int length){
+if(yolo_out_len + length > YOLO_OUT_SIZE){
+yolo_flush();
+if(length > YOLO_OUT_SIZE){
+fwrite(text, 1, length, stdout);
+fflush(stdout);
+return;
+}
+}
+memcpy(yolo_out + yolo_out_len, text, length);
+yolo_out_len += length;
+}
+#define YOLO_PUTS(text) yolo_write(text, sizeof(text) - 1)
+static void yolo_print_digits(unsigned long long whole, int hundredths, int negative){
+char digits[32];
+char *end = digits + sizeof(digits);
+char *start = end;
+*--start = '\n';
+*--start = '0' + hundredths % 10;
+*--start = '0' + hundredths / 10;
+*--start = '.';
+do {
+*--start = '0' + whole % 10;
+whole /= 10;
+} while(whole);
+if(negative) *--start = '-';
+yolo_write(start, end - start);
+}
+static void yolo_print_fixed(double value){
+if(!(value < 1e16 && value > -1e16)){
+if(yolo_out_len + 400 > YOLO_OUT_SIZE) yolo_flush();
+yolo_out_len += snprintf(yolo_out + yolo_out_len, 400, "%.2f\n", value);
+return;
+}
+unsigned long long bits;
+memcpy(&bits, &value, sizeof(bits));
+int exponent = (int)(bits >> 52 & 0x7ff);
+unsigned long long mantissa = bits & 0xfffffffffffffULL;
+if(exponent) mantissa |= 1ULL << 52;
+else exponent = 1;
+int shift = 1075 - exponent;
+unsigned long long hundredths;
+if(shift <= 0){
+hundredths = (mantissa << -shift) * 100;
+} else if(shift > 60){
+hundredths = 0;
+} else {
+unsigned long long scaled = mantissa * 100;
+unsigned long long rest = scaled & ((1ULL << shift) - 1);
+unsigned long long half = 1ULL << (shift - 1);
+hundredths = scaled >> shift;
+if(rest > half || (rest == half && (hundredths & 1))) hundredths++;
+}
+yolo_print_digits(hundredths / 100, (int)(hundredths % 100), (int)(bits >> 63));
+}
+static long long yolo_prof_hits[8];
+static const int yolo_prof_lines[8] = {1,2,3,4,5,7,10,11};
+static const char *yolo_prof_kinds[8] = {"LET","WHILE","FOR","IF","GOTO","LET","LABEL","PRINT"};
+static long long yolo_prof_iterations[2];
+static double yolo_prof_loop_start[2];
+static double yolo_prof_loop_time[2];
+static const int yolo_prof_loop_lines[2] = {2,3};
+static const char *yolo_prof_loop_kinds[2] = {"WHILE","FOR"};
+static double yolo_prof_now(void){
+struct timespec now;
+clock_gettime(CLOCK_MONOTONIC, &now);
+return now.tv_sec + now.tv_nsec * 1e-9;
+}
+static void yolo_prof_report(void){
+FILE *out = stderr;
+const char *path = getenv("YOLO_PROFILE");
+if(path && !(out = fopen(path, "w"))) out = stderr;
+long long total = 0;
+for(int i = 0; i < 8; i++) total += yolo_prof_hits[i];
+fprintf(out, "profile: %lld statements executed\n", total);
+fprintf(out, "%6s %-6s %14s %7s\n", "line", "stmt", "count", "%");
+for(int i = 0; i < 8; i++){
+if(yolo_prof_hits[i]) fprintf(out, "%6d %-6s %14lld %6.2f%%\n", yolo_prof_lines[i], yolo_prof_kinds[i], yolo_prof_hits[i], 100.0 * yolo_prof_hits[i] / total);
+}
+fprintf(out, "%6s %-6s %14s %12s\n", "line", "loop", "iterations", "seconds");
+for(int i = 0; i < 2; i++){
+fprintf(out, "%6d %-6s %14lld %12.6f\n", yolo_prof_loop_lines[i], yolo_prof_loop_kinds[i], yolo_prof_iterations[i], yolo_prof_loop_time[i]);
+}
+if(out != stderr) fclose(out);
+}
+static void yolo_prof_interrupt(int sig){
+yolo_flush();
+exit(128 + sig);
+}
+static void yolo_prof_start(void){
+atexit(yolo_prof_report);
+signal(SIGINT, yolo_prof_interrupt);
+}
+int main(){
+float n;
+yolo_prof_start();
+yolo_prof_hits[0]++;
+n = 0;
+yolo_prof_hits[1]++;
+yolo_prof_loop_start[0] = yolo_prof_now();
+while(n<10){
+yolo_prof_iterations[0]++;
+yolo_prof_hits[2]++;
+yolo_prof_loop_start[1] = yolo_prof_now();
+for(int i=0;i<3;i=i+1){
+yolo_prof_iterations[1]++;
+yolo_prof_hits[3]++;
+if(n==5){
+yolo_prof_hits[4]++;
+yolo_prof_loop_time[1] += yolo_prof_now() - yolo_prof_loop_start[1];
+yolo_prof_loop_time[0] += yolo_prof_now() - yolo_prof_loop_start[0];
+goto done;
+}
+yolo_prof_hits[5]++;
+n = n+1;
+}
+yolo_prof_loop_time[1] += yolo_prof_now() - yolo_prof_loop_start[1];
+}
+yolo_prof_loop_time[0] += yolo_prof_now() - yolo_prof_loop_start[0];
+done:
+yolo_prof_hits[6]++;
+yolo_prof_hits[7]++;
+yolo_print_fixed((float)(n));
+yolo_flush();
+return 0;
+}
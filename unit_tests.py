@@ -1,13 +1,79 @@
 from types import MethodType
+import io
 import unittest
 import os
+import shutil
+import sys
+import json
+import subprocess
+import tempfile
+import time
 from os import listdir
 from lexer import Lexer
+from fast_lexer import FastLexer
+from token_stream import TokenStream
+from stream_lexer import StreamLexer
 from parse import Parser
+from precedence_parse import PrecedenceParser
 from emit import Emitter
+from codegen import CGenerator
+from instrument import InstrumentedCGenerator
+from optimize import foldConstants
+from infer import inferTypes
+from dce import eliminateDeadCode
+from loops import optimizeLoops
+from parallel import findParallelLoops
+from vm import runProgram
+from compiler import Options, compileSource, compileFile, pipeExecutable
+from compiler import parseProgram, runPasses, generate
+from errors import CompileError
+from cache import CompileCache
+from stats import CompileStats
+import batch
+import build
+from client import DaemonClient
 
 
-def create_test_method(yolo_file_path, c_file_path):
+# StreamLexer reading 3 chars at a time, so tokens and lines straddle its reads
+class SmallChunkStreamLexer(StreamLexer):
+    def __init__(self, source):
+        super().__init__(source, chunkSize=3)
+
+
+# Every golden test runs once per lexer and parser
+LEXERS = [Lexer, FastLexer, TokenStream, StreamLexer, SmallChunkStreamLexer]
+PARSERS = [Parser, PrecedenceParser]
+
+# Parsers of the goldens in a directory, every parser for the rest. The deep goldens nest
+# expressions past Python's recursion limit.
+DIR_PARSERS = {
+    "deep": [PrecedenceParser],
+}
+
+# -O with --infer-types folds with the inferred types, then infers again
+def foldTypedConstants(program):
+    return foldConstants(program, program.types)
+
+
+# Passes run on the AST of the goldens in a directory, the rest compile without any
+DIR_PASSES = {
+    "optimize": [foldConstants],
+    "optimize_types": [inferTypes, foldTypedConstants, inferTypes],
+    "types": [inferTypes],
+    "dce": [eliminateDeadCode],
+    "loops": [inferTypes, optimizeLoops],
+    "parallel": [inferTypes, findParallelLoops],
+}
+
+# Code generator of the goldens in a directory, CGenerator for the rest
+DIR_GENERATORS = {
+    "instrument": InstrumentedCGenerator,
+}
+
+
+def create_test_method(
+    yolo_file_path, c_file_path, lexerClass, passes, generator, parserClass=Parser
+):
     def test(self):
         print("Testing " + yolo_file_path)
         with open(yolo_file_path, "r") as file:
@@ -15,21 +81,367 @@ def create_test_method(yolo_file_path, c_file_path):
         with open(c_file_path, "r") as file:
             expectedOutput = file.read()
 
-        lexer = Lexer(sourceCode)
+        lexer = lexerClass(sourceCode)
         emitter = Emitter("test.c")
-        parser = Parser(lexer, emitter)
+        parser = parserClass(lexer)
 
-        parser.program()  # Start the parser
+        program = parser.program()  # Start the parser
+        for optimizationPass in passes:
+            program = optimizationPass(program)
+        generator(emitter).program(program)
         actualOutput = emitter.header + emitter.code
         self.assertEqual(expectedOutput, actualOutput)
 
     return test
 
 
+# Run a program in the VM, as parsed and with constants folded (--run -O), and compare
+# what it prints with the output of the compiled C
+def create_run_test(yolo_file_path, input_file_path, output_file_path):
+    def test(self):
+        print("Running " + yolo_file_path)
+        with open(yolo_file_path, "r") as file:
+            sourceCode = file.read()
+        stdin = ""
+        if os.path.exists(input_file_path):
+            with open(input_file_path, "r") as file:
+                stdin = file.read()
+        with open(output_file_path, "r") as file:
+            expectedOutput = file.read()
+
+        for passes in ([], [foldConstants]):
+            program = Parser(Lexer(sourceCode)).program()
+            for optimizationPass in passes:
+                program = optimizationPass(program)
+            output = io.StringIO()
+            runProgram(program, io.StringIO(stdin), output)
+            self.assertEqual(expectedOutput, output.getvalue())
+
+    return test
+
+
+# Compile an invalid program with compileSource, with every lexer and parser, and
+# compare the CompileError it raises with the message in N.err
+def create_error_test(yolo_file_path, error_file_path):
+    def test(self):
+        print("Compiling " + yolo_file_path)
+        with open(yolo_file_path, "r") as file:
+            sourceCode = file.read()
+        with open(error_file_path, "r") as file:
+            expectedError = file.read()
+
+        for lexer in ("basic", "fast", "array", "stream"):
+            for parser in ("recursive", "precedence"):
+                with self.assertRaises(CompileError) as raised:
+                    compileSource(sourceCode, Options(lexer, parser=parser))
+                self.assertEqual(expectedError, str(raised.exception) + "\n")
+
+    return test
+
+
 class TestCompilerOutputs(unittest.TestCase):
     pass
 
 
+# Source for the tests of the tools around the compiler, with dead code for a report
+TOOL_SOURCE = 'LET x = 1\nGOTO end\nPRINT "never printed"\nLABEL end\nPRINT x\n'
+
+
+# An Emitter that spills its code to a file on disk writes and counts the same C as one
+# that keeps it in memory, non-ASCII strings included
+class TestEmitter(unittest.TestCase):
+    def test_spill(self):
+        source = "LET x = 1\n" + "PRINT x + 1\n" * 200 + 'PRINT "d\u00e9j\u00e0 vu"\n'
+        program = parseProgram(source, Options())
+        emitters = [Emitter(), Emitter(maxChunks=4, spillSize=64)]
+        for emitter in emitters:
+            generate(program, emitter)
+        inMemory, spilled = emitters
+        self.assertIsNone(inMemory.spill)
+        self.assertTrue(spilled.spill._rolled)  # moved from memory to a file
+
+        expected = inMemory.header + inMemory.code
+        for emitter in emitters:
+            sink = io.StringIO()
+            emitter.writeTo(sink)
+            self.assertEqual(expected, sink.getvalue())
+            self.assertEqual(len(expected.encode()), emitter.size())
+            emitter.close()
+
+
+# The compile cache: a miss compiles and fills it, a hit gives back the same C and the
+# report of the passes, and changing an option misses
+class TestCompileCache(unittest.TestCase):
+    def test_hit_miss_and_options(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sourcePath = os.path.join(directory, "dead.yolo")
+            with open(sourcePath, "w") as sourceFile:
+                sourceFile.write(TOOL_SOURCE)
+            outPath = os.path.join(directory, "dead.c")
+            cache = CompileCache(os.path.join(directory, "cache"))
+            options = Options(dce=True)
+
+            report = []
+            size, cached = compileFile(sourcePath, outPath, options, report, cache)
+            self.assertEqual((len(TOOL_SOURCE), False), (size, cached))
+            self.assertTrue(report)
+            with open(outPath, "r") as outFile:
+                compiled = outFile.read()
+            os.unlink(outPath)
+
+            replayed = []
+            size, cached = compileFile(sourcePath, outPath, options, replayed, cache)
+            self.assertTrue(cached)
+            self.assertEqual(report, replayed)
+            with open(outPath, "r") as outFile:
+                self.assertEqual(compiled, outFile.read())
+
+            size, cached = compileFile(sourcePath, outPath, Options(), [], cache)
+            self.assertFalse(cached)
+            self.assertEqual({".c": 1, ".exe": 0}, cache.hits)
+            self.assertEqual({".c": 2, ".exe": 0}, cache.misses)
+
+    # Processes sharing a cache add up their stats without losing any or crashing
+    def test_concurrent_stats(self):
+        with tempfile.TemporaryDirectory() as directory:
+            script = (
+                "import sys\n"
+                "from cache import CompileCache\n"
+                "cache = CompileCache(sys.argv[1])\n"
+                "for i in range(100):\n"
+                "    cache.saveStats({'.c': 1, '.exe': 0}, {'.c': 0, '.exe': 1})\n"
+            )
+            processes = [
+                subprocess.Popen([sys.executable, "-c", script, directory])
+                for i in range(4)
+            ]
+            for process in processes:
+                self.assertEqual(0, process.wait())
+            stats = CompileCache(directory).loadStats()
+            self.assertEqual({".c": 400, ".exe": 0}, stats["hits"])
+            self.assertEqual({".c": 0, ".exe": 400}, stats["misses"])
+
+
+# --stats-format json: the stats of a compile are JSON with every phase and count, and
+# the emitted size is in bytes
+class TestCompileStats(unittest.TestCase):
+    def test_json(self):
+        options = Options(dce=True)
+        stats = CompileStats()
+        source = TOOL_SOURCE + 'PRINT "d\u00e9j\u00e0 vu"\n'
+        program = parseProgram(source, options, stats=stats)
+        program = runPasses(program, options, [], stats)
+        emitter = Emitter()
+        generate(program, emitter, stats, options)
+        code = emitter.header + emitter.code
+        emitter.close()
+
+        data = json.loads(stats.toJSON())
+        self.assertEqual(["lex", "parse", "dce", "emit"], list(data["phases"]))
+        self.assertEqual(len(code.encode()), data["emittedBytes"])
+        self.assertGreater(len(code.encode()), len(code))
+        self.assertGreater(data["tokens"], 0)
+
+
+# Batch mode: a file that fails is reported, the others still compile, and the exit code
+# is 1
+class TestBatch(unittest.TestCase):
+    def writeSources(self, directory):
+        sources = {"good.yolo": TOOL_SOURCE, "bad.yolo": "PRINT (\n"}
+        for name, text in sources.items():
+            with open(os.path.join(directory, name), "w") as sourceFile:
+                sourceFile.write(text)
+
+    def test_exit_code_and_summary(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.writeSources(directory)
+            outDir = os.path.join(directory, "out")
+            result = subprocess.run(
+                [sys.executable, "main.py", "--no-cache", directory, "--out-dir", outDir],
+                capture_output=True,
+                text=True,
+            )
+            self.assertEqual(1, result.returncode)
+            self.assertIn("FAILED " + os.path.join(directory, "bad.yolo"), result.stdout)
+            self.assertIn("1 compiled, 1 failed", result.stdout)
+            self.assertTrue(os.path.exists(os.path.join(outDir, "good.c")))
+
+    # An exception that is not a CompileError fails only its own file
+    def test_unexpected_error(self):
+        def crash(source, *args):
+            if source.endswith("bad.yolo"):
+                raise RuntimeError("pass crashed")
+            return compileFile(source, *args)
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.writeSources(directory)
+            sources = batch.collectSources([directory])
+            out = io.StringIO()
+            original = batch.compileFile
+            batch.compileFile = crash
+            try:
+                failed = batch.runBatch(sources, Options(), workers=1, out=out)
+            finally:
+                batch.compileFile = original
+            self.assertEqual(1, failed)
+            self.assertIn("bad.yolo: RuntimeError: pass crashed", out.getvalue())
+            self.assertIn("1 compiled, 1 failed", out.getvalue())
+
+    # Two inputs that would write the same .c file both fail, the others still compile
+    def test_same_output(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.writeSources(directory)
+            sources = [os.path.join(directory, "good.yolo")]
+            for name in ("a", "b"):
+                os.mkdir(os.path.join(directory, name))
+                source = os.path.join(directory, name, "x.yolo")
+                with open(source, "w") as sourceFile:
+                    sourceFile.write(TOOL_SOURCE)
+                sources.append(source)
+            outDir = os.path.join(directory, "out")
+            out = io.StringIO()
+            failed = batch.runBatch(
+                batch.collectSources(sources), Options(), outDir, workers=1, out=out
+            )
+            self.assertEqual(2, failed)
+            clash = "another input also compiles to " + os.path.join(outDir, "x.c")
+            self.assertEqual(2, out.getvalue().count(clash))
+            self.assertFalse(os.path.exists(os.path.join(outDir, "x.c")))
+            self.assertTrue(os.path.exists(os.path.join(outDir, "good.c")))
+
+
+# Program for the build tests: a loop whose hot branch depends on its input
+LOOP_SOURCE = """LET n = 0
+INPUT n
+LET total = 0
+FOR (LET i = 0; i < 1000; i = i + 1) REPEAT
+IF (i < n) THEN
+LET total = total + i
+ENDIF
+ENDFOR
+PRINT total
+"""
+
+
+# build.py: C compiler flags of the options and presets, compiler family detection, a
+# PGO build that prints the same as a normal one and a build that pipes its C
+class TestBuild(unittest.TestCase):
+    def test_flags(self):
+        self.assertEqual(["-O2"], build.compilerFlags())
+        self.assertEqual(["-O0", "-g"], build.compilerFlags("debug"))
+        self.assertEqual(
+            ["-O3", "-march=native", "-flto"], build.compilerFlags("native")
+        )
+        # Explicit flags come after the preset, so the compiler uses them
+        self.assertEqual(["-O0", "-g", "-O3"], build.compilerFlags("debug", "3"))
+        self.assertEqual(
+            ["-O1", "-march=native", "-flto"], build.compilerFlags(None, "1", True, True)
+        )
+        self.assertEqual(["-flto", "-O2"], build.compilerFlags(lto=True))
+
+    def test_compiler_family(self):
+        families = {
+            "gcc (GCC) 13.2.0": "gcc",
+            "Apple clang version 15.0.0": "clang",
+            "cc (Debian 12.2.0-14) 12.2.0": "gcc",
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            command = os.path.join(directory, "cc")
+            for version, family in families.items():
+                with open(command, "w") as script:
+                    script.write("#!/bin/sh\necho '" + version + "'\n")
+                os.chmod(command, 0o755)
+                self.assertEqual(family, build.compilerFamily(command))
+
+    @unittest.skipIf(shutil.which("gcc") is None, "gcc is not installed")
+    def test_pgo(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sourcePath = os.path.join(directory, "loop.yolo")
+            with open(sourcePath, "w") as sourceFile:
+                sourceFile.write(LOOP_SOURCE)
+            trainPath = os.path.join(directory, "train.in")
+            with open(trainPath, "w") as trainFile:
+                trainFile.write("500\n")
+            cPath = os.path.join(directory, "loop.c")
+            compileFile(sourcePath, cPath, Options())
+            flags = build.compilerFlags()
+
+            plain = os.path.join(directory, "plain")
+            build.buildExecutable(cPath, plain, command="gcc", flags=flags)
+            optimized = os.path.join(directory, "pgo")
+            build.buildWithProfile(cPath, optimized, "gcc", flags, [trainPath], 60, 1)
+
+            outputs = []
+            for exePath in (plain, optimized):
+                result = subprocess.run(
+                    [exePath], input="700\n", capture_output=True, text=True, check=True
+                )
+                outputs.append(result.stdout)
+            self.assertEqual("244650.00\n", outputs[0])
+            self.assertEqual(outputs[0], outputs[1])
+
+    # build.py --pipe: the C goes straight into the C compiler, no .c file is written
+    @unittest.skipIf(shutil.which("cc") is None, "cc is not installed")
+    def test_pipe(self):
+        base = "./unitTests/run/3"
+        with open(base + ".yolo", "r") as sourceFile:
+            program = parseProgram(sourceFile.read(), Options())
+        with open(base + ".in", "r") as inputFile:
+            stdin = inputFile.read()
+        with open(base + ".out", "r") as outputFile:
+            expected = outputFile.read()
+        with tempfile.TemporaryDirectory() as directory:
+            exePath = os.path.join(directory, "program")
+            pipeExecutable(program, exePath, Options())
+            self.assertEqual(["program"], os.listdir(directory))
+            result = subprocess.run(
+                [exePath], input=stdin, capture_output=True, text=True, check=True
+            )
+            self.assertEqual(expected, result.stdout)
+
+
+# The compiler daemon serves the client the same C and report as compileSource, and a
+# compile error as a failed answer
+class TestDaemon(unittest.TestCase):
+    def test_compile_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "yolo.sock")
+            daemon = subprocess.Popen(
+                [sys.executable, "daemon.py", "--socket", path, "-j", "1"],
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                client = self.connect(path, daemon)
+                answer = client.compile(TOOL_SOURCE, {"dce": True})
+                expected = compileSource(TOOL_SOURCE, Options(dce=True))
+                self.assertTrue(answer["ok"])
+                self.assertEqual(expected.code, answer["c"])
+                self.assertEqual(len(expected.diagnostics), len(answer["report"]))
+
+                answer = client.compile("PRINT (\n")
+                self.assertFalse(answer["ok"])
+                self.assertEqual("parse", answer["diagnostic"]["phase"])
+
+                self.assertTrue(client.request({"command": "shutdown"})["ok"])
+                client.close()
+                self.assertEqual(0, daemon.wait(10))
+            finally:
+                if daemon.poll() is None:
+                    daemon.kill()
+                    daemon.wait()
+
+    # Wait for the daemon to listen, it starts its workers first
+    def connect(self, path, daemon):
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                return DaemonClient(path)
+            except OSError:
+                if daemon.poll() is not None or time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+
 def load_tests(loader, tests, pattern):
     base_dirs = ["./unitTests/yolo/", "./unitTests/c/"]
 
@@ -53,18 +465,57 @@ def load_tests(loader, tests, pattern):
                 continue
             yoloFilePath = dirPath + "/" + filePath
             cFilePath = yoloFilePath.replace("yolo", "c")
-            test_method = create_test_method(yoloFilePath, cFilePath)
-            test_name = "test_{}".format(
-                os.path.relpath(yoloFilePath, "./unitTests/yolo/")
-                .replace("/", "_")
-                .replace(".yolo", "")
-            )
-            print(test_name)
-            test_case = TestCompilerOutputs()
-            setattr(test_case, test_name, test_method)
-            # Add a method called 'runTest' that is the test method we just added
-            setattr(test_case, "runTest", MethodType(test_method, test_case))
-            suite.addTest(test_case)
+            dirName = os.path.basename(dirPath)
+            for parserClass in DIR_PARSERS.get(dirName, PARSERS):
+                for lexerClass in LEXERS:
+                    passes = DIR_PASSES.get(dirName, [])
+                    generator = DIR_GENERATORS.get(dirName, CGenerator)
+                    test_method = create_test_method(
+                        yoloFilePath, cFilePath, lexerClass, passes, generator, parserClass
+                    )
+                    test_name = "test_{}_{}".format(
+                        os.path.relpath(yoloFilePath, "./unitTests/yolo/")
+                        .replace("/", "_")
+                        .replace(".yolo", ""),
+                        lexerClass.__name__,
+                    )
+                    if parserClass is not Parser:
+                        test_name += "_" + parserClass.__name__
+                    print(test_name)
+                    test_case = TestCompilerOutputs()
+                    setattr(test_case, test_name, test_method)
+                    # Add a method called 'runTest' that is the test method we just added
+                    setattr(test_case, "runTest", MethodType(test_method, test_case))
+                    suite.addTest(test_case)
+
+    # unitTests/run/N.yolo runs in the VM with N.in as input and must print N.out
+    runDir = "./unitTests/run/"
+    for filePath in sorted(listdir(runDir)):
+        if not filePath.endswith(".yolo"):
+            continue
+        base = runDir + filePath[: -len(".yolo")]
+        test_method = create_run_test(base + ".yolo", base + ".in", base + ".out")
+        test_case = TestCompilerOutputs()
+        setattr(test_case, "runTest", MethodType(test_method, test_case))
+        suite.addTest(test_case)
+
+    # unitTests/errors/N.yolo does not compile, the error must read like N.err
+    errorDir = "./unitTests/errors/"
+    for filePath in sorted(listdir(errorDir)):
+        if not filePath.endswith(".yolo"):
+            continue
+        base = errorDir + filePath[: -len(".yolo")]
+        test_method = create_error_test(base + ".yolo", base + ".err")
+        test_case = TestCompilerOutputs()
+        setattr(test_case, "runTest", MethodType(test_method, test_case))
+        suite.addTest(test_case)
+
+    suite.addTests(loader.loadTestsFromTestCase(TestEmitter))
+    suite.addTests(loader.loadTestsFromTestCase(TestCompileCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestCompileStats))
+    suite.addTests(loader.loadTestsFromTestCase(TestBatch))
+    suite.addTests(loader.loadTestsFromTestCase(TestBuild))
+    suite.addTests(loader.loadTestsFromTestCase(TestDaemon))
     return suite
 
 
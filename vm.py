@@ -0,0 +1,823 @@
+import math
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from fractions import Fraction
+from ast_nodes import (
+    Let,
+    Print,
+    If,
+    While,
+    For,
+    Label,
+    Goto,
+    Input,
+    Unary,
+    Number,
+    Ident,
+    Index,
+    Group,
+    COMPARISON_OPS,
+)
+from optimize import literal
+
+# Runs a program without a C compiler. The AST is compiled to bytecode for a stack machine:
+# one flat array of opcodes, each followed by its operand if it has one, with GOTOs and
+# loops resolved to offsets in that array. Arithmetic follows the generated C: every
+# expression gets the C type of its operands (int literals are 32 bit ints, literals with
+# a "." doubles, vars floats or the types picked by type inference, FOR vars ints) and an
+# opcode for that type, so ints wrap and divide truncating and floats are rounded to 32
+# bits after every operation, exactly like the compiled program. An array is a list in
+# the slot of its name, and its indexes are always checked (like --bounds-check).
+(
+    CONST,  # push consts[operand]
+    LOAD,  # push slots[operand]
+    STORE,  # pop into slots[operand]
+    JUMP,  # continue at operand
+    JUMP_IF_FALSE,  # pop, continue at operand if it is 0
+    ADD_I,
+    SUB_I,
+    MUL_I,
+    DIV_I,
+    NEG_I,
+    ADD_L,
+    SUB_L,
+    MUL_L,
+    DIV_L,
+    NEG_L,
+    ADD_F,
+    SUB_F,
+    MUL_F,
+    DIV_F,
+    ADD_D,
+    SUB_D,
+    MUL_D,
+    DIV_D,
+    NEG_D,  # also negates floats, that is exact
+    EQ,
+    NE,
+    LT,
+    LE,
+    GT,
+    GE,
+    L2I,  # long long -> int, keeps the low 32 bits
+    D2I,  # float/double -> int, truncating
+    D2L,  # float/double -> long long, truncating
+    I2F,  # int/long long -> float
+    D2F,  # double -> float
+    I2D,  # int/long long -> double
+    PRINT_STR,  # write consts[operand]
+    PRINT_F,  # pop, write it with "%.2f"
+    PRINT_I,  # pop, write it with "%d.00"
+    INPUT_F,  # scanf("%f") into slots[operand]
+    INPUT_D,  # scanf("%lf") into slots[operand]
+    LOAD_ITEM,  # pop an index, push that element of the array in slots[operand]
+    STORE_ITEM,  # pop a value and an index, store the value in that element
+    INPUT_ITEM_F,  # pop an index, scanf("%f") into that element
+    INPUT_ITEM_D,  # pop an index, scanf("%lf") into that element
+    HALT,
+) = range(46)
+
+OPCODE_NAMES = (
+    "CONST LOAD STORE JUMP JUMP_IF_FALSE ADD_I SUB_I MUL_I DIV_I NEG_I ADD_L SUB_L MUL_L "
+    "DIV_L NEG_L ADD_F SUB_F MUL_F DIV_F ADD_D SUB_D MUL_D DIV_D NEG_D EQ NE LT LE GT GE "
+    "L2I D2I D2L I2F D2F I2D PRINT_STR PRINT_F PRINT_I INPUT_F INPUT_D LOAD_ITEM "
+    "STORE_ITEM INPUT_ITEM_F INPUT_ITEM_D HALT"
+).split()
+# Opcodes whose operand is a slot
+VAR_OPERAND = {
+    LOAD,
+    STORE,
+    INPUT_F,
+    INPUT_D,
+    LOAD_ITEM,
+    STORE_ITEM,
+    INPUT_ITEM_F,
+    INPUT_ITEM_D,
+}
+HAS_OPERAND = {CONST, JUMP, JUMP_IF_FALSE, PRINT_STR} | VAR_OPERAND
+
+RANK = {"int": 0, "long long": 1, "float": 2, "double": 3}
+ARITHMETIC = {
+    "int": {"+": ADD_I, "-": SUB_I, "*": MUL_I, "/": DIV_I},
+    "long long": {"+": ADD_L, "-": SUB_L, "*": MUL_L, "/": DIV_L},
+    "float": {"+": ADD_F, "-": SUB_F, "*": MUL_F, "/": DIV_F},
+    "double": {"+": ADD_D, "-": SUB_D, "*": MUL_D, "/": DIV_D},
+}
+NEGATE = {"int": NEG_I, "long long": NEG_L, "float": NEG_D, "double": NEG_D}
+COMPARE = {"==": EQ, "!=": NE, "<": LT, "<=": LE, ">": GT, ">=": GE}
+# Opcodes converting a value from one C type to another, None when nothing changes
+CONVERSIONS = {
+    ("int", "long long"): None,
+    ("int", "float"): I2F,
+    ("int", "double"): I2D,
+    ("long long", "int"): L2I,
+    ("long long", "float"): I2F,
+    ("long long", "double"): I2D,
+    ("float", "int"): D2I,
+    ("float", "long long"): D2L,
+    ("float", "double"): None,
+    ("double", "int"): D2I,
+    ("double", "long long"): D2L,
+    ("double", "float"): D2F,
+}
+
+INT_MIN = -(2**31)
+INT_MAX = 2**31 - 1
+LLONG_MIN = -(2**63)
+LLONG_MAX = 2**63 - 1
+INF = float("inf")
+NAN = INF - INF  # The NaN the FPU makes for 0/0, like the compiled program gets
+WHITESPACE = " \t\n\v\f\r"
+
+_float32 = array("f", [0.0])
+
+
+# Round a double to the nearest float, overflowing to inf like a C conversion
+def roundFloat32(value):
+    _float32[0] = value
+    return _float32[0]
+
+
+# Nearest float to an integer, without going through a double first
+def intToFloat32(value):
+    if -(2**53) <= value <= 2**53:
+        return roundFloat32(float(value))
+    magnitude = abs(value)
+    shift = magnitude.bit_length() - 24
+    mantissa, rest = magnitude >> shift, magnitude & ((1 << shift) - 1)
+    half = 1 << (shift - 1)
+    if rest > half or (rest == half and mantissa & 1):
+        mantissa += 1
+    return math.copysign(roundFloat32(float(mantissa << shift)), value)
+
+
+# Nearest float to a decimal number, as strtof rounds it (once, not via a double)
+def decimalToFloat32(text):
+    value = float(text)
+    result = roundFloat32(value)
+    if result == value or not math.isfinite(result):
+        return result
+    # Rounding twice only differs when the double falls exactly halfway between floats
+    bits = struct.unpack("<i", struct.pack("<f", result))[0]
+    step = 1 if (value > result) == (result > 0) else -1
+    other = struct.unpack("<f", struct.pack("<i", bits + step))[0]
+    if (result + other) / 2 != value:
+        return result
+    exact = Fraction(text)
+    if exact == value:
+        return result  # A real tie, already rounded to even
+    return other if (exact > value) == (other > value) else result
+
+
+# C conversion of a float or double to an integer type: truncation, and the x86
+# "integer indefinite" (the minimum) for nan and values out of range
+def truncate(value, minimum, maximum):
+    if value != value or not (minimum - 1 < value < maximum + 1):
+        return minimum
+    return int(value)
+
+
+# IEEE division, Python raises on a zero divisor instead
+def divide(left, right):
+    if right:
+        return left / right
+    if left != left:
+        return left
+    if not left:
+        return NAN
+    return INF if (math.copysign(1.0, left) > 0) == (math.copysign(1.0, right) > 0) else -INF
+
+
+# printf("%.2f\n", value), glibc writes the sign of a NaN. The VM makes the NaNs of an
+# x86 FPU (0/0 and inf - inf have the sign bit set), so on other CPUs (ARM makes positive
+# NaNs) or when the C compiler folds such an expression itself, the compiled program can
+# print "nan" where the VM prints "-nan" or the other way round.
+def formatFixed(value):
+    if value != value:
+        return "-nan\n" if math.copysign(1.0, value) < 0 else "nan\n"
+    return "%.2f\n" % value
+
+
+# Reads numbers from a text stream the way scanf("%f") does: leading whitespace is
+# skipped, then the longest prefix of a number is consumed even if it does not end up
+# being a valid number ("1e" fails after eating both chars)
+class InputReader:
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.buffer = ""
+        self.pos = 0
+
+    # Next char without consuming it, "" at the end of the input
+    def peek(self):
+        if self.pos >= len(self.buffer):
+            self.buffer = self.stream.readline()
+            self.pos = 0
+            if not self.buffer:
+                return ""
+        return self.buffer[self.pos]
+
+    def skipWhitespace(self):
+        char = self.peek()
+        while char and char in WHITESPACE:
+            self.pos += 1
+            char = self.peek()
+        return char
+
+    # Consume chars while they are in allowed, return them
+    def takeWhile(self, allowed):
+        text = []
+        char = self.peek()
+        while char and char in allowed:
+            text.append(char)
+            self.pos += 1
+            char = self.peek()
+        return "".join(text)
+
+    # Consume the longest prefix of word (case-insensitive), return its length
+    def takeWord(self, word):
+        count = 0
+        while count < len(word) and self.peek().lower() == word[count]:
+            self.pos += 1
+            count += 1
+        return count
+
+    # Return the text of the next number, "" if the input does not start with one and
+    # None at the end of the input
+    def scanNumber(self):
+        char = self.skipWhitespace()
+        if not char:
+            return None
+        sign = ""
+        if char in "+-":
+            sign = char
+            self.pos += 1
+            char = self.peek()
+        lower = char.lower()
+        if lower == "i" or lower == "n":
+            if lower == "i":
+                count = self.takeWord("infinity")
+                if count in (3, 8):
+                    return sign + "inf"
+            elif self.takeWord("nan") == 3:
+                return sign + "nan"
+            # Like glibc, a word that stops matching halfway is read up to the first char
+            # that does not match, that char included
+            if self.peek():
+                self.pos += 1
+            return ""
+        digits = self.takeWhile("0123456789")
+        if digits == "0" and self.peek() in ("x", "X"):
+            self.pos += 1
+            mantissa = self.takeWhile("0123456789abcdefABCDEF")
+            if self.peek() == ".":
+                self.pos += 1
+                fraction = self.takeWhile("0123456789abcdefABCDEF")
+                if not mantissa and not fraction:
+                    return sign + "0"  # glibc reads "0x." as 0
+                mantissa += "." + fraction
+            if not mantissa:
+                return ""
+            return sign + "0x" + mantissa + self.scanExponent("pP")
+        fraction = ""
+        if self.peek() == ".":
+            self.pos += 1
+            fraction = self.takeWhile("0123456789")
+        if not digits and not fraction:
+            return ""
+        return sign + (digits or "0") + "." + (fraction or "0") + self.scanExponent("eE")
+
+    # Exponent of a number, "" if there is none. Like glibc, a marker and sign without
+    # digits ("1e+") are consumed and ignored.
+    def scanExponent(self, markers):
+        if self.peek() not in markers or not self.peek():
+            return ""
+        self.pos += 1
+        exponentSign = ""
+        if self.peek() in ("+", "-") and self.peek():
+            exponentSign = self.peek()
+            self.pos += 1
+        exponent = self.takeWhile("0123456789")
+        if not exponent:
+            return ""
+        return markers[0] + exponentSign + exponent
+
+    # scanf("%*s"): skip one whitespace separated word
+    def skipWord(self) -> None:
+        char = self.skipWhitespace()
+        while char and char not in WHITESPACE:
+            self.pos += 1
+            char = self.peek()
+
+
+# Value of the text of a number read by InputReader, as a float or as a double
+def parseNumber(text, isFloat):
+    if "x" in text:
+        try:
+            value = float.fromhex(text)
+        except OverflowError:  # strtod gives HUGE_VAL
+            value = float("-inf") if text[0] == "-" else float("inf")
+        return roundFloat32(value) if isFloat else value
+    if isFloat and "n" not in text:
+        return decimalToFloat32(text)
+    value = float(text)
+    return roundFloat32(value) if isFloat else value
+
+
+# Compiled program: the code, its constants and one slot per var (each FOR var has its own)
+# or array
+class Bytecode:
+    def __init__(self) -> None:
+        self.code = array("q")
+        self.consts = []
+        self.slotNames = []
+        self.slotTypes = []  # C type of the var, or of the elements of an array
+        self.arraySizes = {}  # slot of an array -> its size
+        self.lines = array("q")  # offset where each statement starts ...
+        self.lineNumbers = array("q")  # ... and its source line
+
+    # Source line of the statement the code at offset belongs to
+    def lineAt(self, offset):
+        index = bisect_right(self.lines, offset) - 1
+        return self.lineNumbers[index] if index >= 0 else None
+
+    # Readable listing of the code, one instruction per line
+    def disassemble(self) -> str:
+        lines = []
+        offset = 0
+        while offset < len(self.code):
+            op = self.code[offset]
+            text = "{:6} {}".format(offset, OPCODE_NAMES[op])
+            if op in HAS_OPERAND:
+                operand = self.code[offset + 1]
+                if op == CONST or op == PRINT_STR:
+                    text += " " + repr(self.consts[operand])
+                elif op in VAR_OPERAND:
+                    text += " " + self.slotNames[operand]
+                else:
+                    text += " " + str(operand)
+                offset += 2
+            else:
+                offset += 1
+            lines.append(text)
+        return "\n".join(lines)
+
+
+class BytecodeCompiler:
+    def __init__(self) -> None:
+        self.bytecode = Bytecode()
+        self.code = self.bytecode.code
+        self.constIndex = {}  # (type, value) -> index in consts
+        self.slots = {}  # var -> slot, for vars that are not FOR vars
+        self.scopes = []  # (name, slot) of the FOR loops we are in
+        self.labels = {}  # label -> offset
+        self.gotos = []  # (offset of the operand, label)
+        self.types = None
+        self.temps = {}  # vars made by passes -> C type
+        self.exprTypes = {}  # id(expression) -> its C type
+
+    def run(self, program):
+        self.types = program.types
+        self.temps = program.temps
+        for name, size in program.arrays.items():
+            self.slots[name] = self.newSlot(name, self.declaredType(name))
+            self.bytecode.arraySizes[self.slots[name]] = size
+        self.block(program.body)
+        self.emit(HALT)
+        for offset, label in self.gotos:
+            self.code[offset] = self.labels[label]
+        return self.bytecode
+
+    def emit(self, op, operand=None) -> int:
+        self.code.append(op)
+        if operand is not None:
+            self.code.append(operand)
+        return len(self.code) - 1  # Offset of the operand, for jumps patched later
+
+    def const(self, value, ctype) -> int:
+        if ctype == "str":
+            key = value
+        else:
+            # 0.0 == -0.0, the sign keeps them apart
+            key = (ctype, value, math.copysign(1.0, value))
+        if key not in self.constIndex:
+            self.constIndex[key] = len(self.bytecode.consts)
+            self.bytecode.consts.append(value)
+        return self.constIndex[key]
+
+    # C type of a var that is not a FOR var
+    def declaredType(self, name):
+        if name in self.temps:
+            return self.temps[name]
+        if self.types is None:
+            return "float"
+        return self.types.vars.get(name, "double")
+
+    # (slot, C type) of a var, FOR vars shadow the others
+    def slot(self, name):
+        for scopeName, slot in reversed(self.scopes):
+            if scopeName == name:
+                return slot, "int"
+        if name not in self.slots:
+            self.slots[name] = self.newSlot(name, self.declaredType(name))
+        return self.slots[name], self.declaredType(name)
+
+    def newSlot(self, name, ctype) -> int:
+        self.bytecode.slotNames.append(name)
+        self.bytecode.slotTypes.append(ctype)
+        return len(self.bytecode.slotNames) - 1
+
+    def convert(self, fromType, toType) -> None:
+        if fromType != toType:
+            op = CONVERSIONS[(fromType, toType)]
+            if op is not None:
+                self.emit(op)
+
+    # Statements
+    # --------------------------------------
+
+    def block(self, body) -> None:
+        for node in body:
+            self.statement(node)
+
+    def statement(self, node) -> None:
+        kind = type(node)
+        self.bytecode.lines.append(len(self.code))
+        self.bytecode.lineNumbers.append(node.line or 0)
+        if kind is Let:
+            if node.index is not None:
+                slot, ctype = self.element(node.name, node.index)
+                self.convert(self.expression(node.value), ctype)
+                self.emit(STORE_ITEM, slot)
+            else:
+                slot, ctype = self.slot(node.name)
+                self.convert(self.expression(node.value), ctype)
+                self.emit(STORE, slot)
+        elif kind is Print:
+            if isinstance(node.value, str):
+                self.emit(PRINT_STR, self.const(node.value + "\n", "str"))
+            elif self.types is None:
+                # printf("%.2f\n", (float)(value))
+                self.convert(self.expression(node.value), "float")
+                self.emit(PRINT_F)
+            else:
+                # The format follows the type inference saw, printf reads the value as that
+                ctype = self.types.printTypes[id(node)]
+                self.convert(self.expression(node.value), ctype)
+                self.emit(PRINT_I if ctype in ("int", "long long") else PRINT_F)
+        elif kind is If:
+            self.expression(node.condition)
+            end = self.emit(JUMP_IF_FALSE, 0)
+            self.block(node.body)
+            self.code[end] = len(self.code)
+        elif kind is While:
+            top = len(self.code)
+            self.expression(node.condition)
+            end = self.emit(JUMP_IF_FALSE, 0)
+            self.block(node.body)
+            self.emit(JUMP, top)
+            self.code[end] = len(self.code)
+        elif kind is For:
+            # for(int name=start;condition;stepName=step), the var is in scope from start on
+            slot = self.newSlot(node.name, "int")
+            self.scopes.append((node.name, slot))
+            self.convert(self.expression(node.start), "int")
+            self.emit(STORE, slot)
+            top = len(self.code)
+            self.expression(node.condition)
+            end = self.emit(JUMP_IF_FALSE, 0)
+            self.block(node.body)
+            stepSlot, stepType = self.slot(node.stepName)
+            self.convert(self.expression(node.step), stepType)
+            self.emit(STORE, stepSlot)
+            self.emit(JUMP, top)
+            self.code[end] = len(self.code)
+            self.scopes.pop()
+        elif kind is Label:
+            self.labels[node.name] = len(self.code)
+        elif kind is Goto:
+            self.gotos.append((self.emit(JUMP, 0), node.name))
+        elif kind is Input:
+            if node.index is not None:
+                slot, ctype = self.element(node.name, node.index)
+                self.emit(INPUT_ITEM_F if ctype == "float" else INPUT_ITEM_D, slot)
+            else:
+                slot, ctype = self.slot(node.name)
+                self.emit(INPUT_F if ctype == "float" else INPUT_D, slot)
+
+    # Push the index of an array element, converted to an integer like C does, and return
+    # (slot of the array, C type of its elements)
+    def element(self, name, index):
+        indexType = self.expression(index)
+        if indexType not in ("int", "long long"):
+            self.convert(indexType, "long long")
+        return self.slot(name)
+
+    # Expressions
+    # --------------------------------------
+
+    # C type of an expression, like the C compiler sees the generated code
+    def typeOf(self, node):
+        key = id(node)
+        if key in self.exprTypes:
+            return self.exprTypes[key]
+        kind = type(node)
+        if kind is Number:
+            value, ctype = literal(node.text)
+            if ctype == "int" and value > INT_MAX:
+                ctype = "long long"  # Too big for an int, C makes it a long
+        elif kind is Ident or kind is Index:
+            ctype = self.slot(node.name)[1]
+        elif kind is Group:
+            ctype = self.typeOf(node.expr)
+        elif kind is Unary:
+            ctype = self.typeOf(node.operand)
+        elif node.op in COMPARISON_OPS:
+            ctype = "int"
+        elif self.isRealDivision(node):
+            ctype = "double"
+        else:
+            ctype = self.commonType(self.typeOf(node.left), self.typeOf(node.right))
+        self.exprTypes[key] = ctype
+        return ctype
+
+    def commonType(self, left, right):
+        return left if RANK[left] >= RANK[right] else right
+
+    # Divisions the code generator writes as (double)left/right
+    def isRealDivision(self, node):
+        return self.types is not None and id(node) in self.types.realDivisions
+
+    # Emit the code pushing the value of an expression, return its C type
+    def expression(self, node):
+        kind = type(node)
+        if kind is Number:
+            value, ctype = literal(node.text)
+            ctype = self.typeOf(node)
+            if ctype == "float":
+                value = roundFloat32(value)
+            self.emit(CONST, self.const(value, ctype))
+            return ctype
+        if kind is Ident:
+            slot, ctype = self.slot(node.name)
+            self.emit(LOAD, slot)
+            return ctype
+        if kind is Index:
+            slot, ctype = self.element(node.name, node.index)
+            self.emit(LOAD_ITEM, slot)
+            return ctype
+        if kind is Group:
+            return self.expression(node.expr)
+        if kind is Unary:
+            ctype = self.expression(node.operand)
+            if node.op == "-":
+                self.emit(NEGATE[ctype])
+            return ctype
+
+        if self.isRealDivision(node):
+            operandType = "double"
+        else:
+            operandType = self.commonType(self.typeOf(node.left), self.typeOf(node.right))
+        self.convert(self.expression(node.left), operandType)
+        self.convert(self.expression(node.right), operandType)
+        if node.op in COMPARISON_OPS:
+            self.emit(COMPARE[node.op])
+            return "int"
+        self.emit(ARITHMETIC[operandType][node.op])
+        return operandType
+
+
+# Compile a program to bytecode, after any passes
+def compileBytecode(program) -> Bytecode:
+    return BytecodeCompiler().run(program)
+
+
+# Executes bytecode. Output is buffered and written when the program ends, when it
+# reads input and every few thousand PRINTs.
+class VM:
+    def __init__(self, bytecode, stdin=None, stdout=None) -> None:
+        self.bytecode = bytecode
+        self.input = InputReader(stdin if stdin is not None else sys.stdin)
+        self.stdout = stdout if stdout is not None else sys.stdout
+
+    def abort(self, message, offset) -> None:
+        line = self.bytecode.lineAt(offset)
+        if line:
+            message += " (line " + str(line) + ")"
+        sys.exit("Runtime error: " + message)
+
+    # scanf into target[key], a slot or an array element. At the end of the input the var
+    # keeps its value, if the input is not a number the var becomes 0 and the word is
+    # skipped.
+    def readInput(self, target, key, isFloat) -> None:
+        text = self.input.scanNumber()
+        if text is None:
+            return
+        if text:
+            target[key] = parseNumber(text, isFloat)
+        else:
+            target[key] = 0.0
+            self.input.skipWord()
+
+    # Stop with the message yolo_index prints for an index out of range
+    def indexError(self, slot, index, offset) -> None:
+        name = self.bytecode.slotNames[slot]
+        size = self.bytecode.arraySizes[slot]
+        self.abort(
+            "index " + str(index) + " out of bounds for " + name + "(" + str(size) + ")",
+            offset,
+        )
+
+    def run(self) -> None:
+        code = self.bytecode.code.tolist()
+        consts = self.bytecode.consts
+        slots = [0 if ctype in ("int", "long long") else 0.0 for ctype in self.bytecode.slotTypes]
+        for slot, size in self.bytecode.arraySizes.items():
+            slots[slot] = [slots[slot]] * size
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        output = []
+        write = output.append
+        stdout = self.stdout
+        float32 = array("f", [0.0])
+        pc = 0
+        # The most frequent opcodes are tested first
+        while True:
+            op = code[pc]
+            if op == LOAD:
+                push(slots[code[pc + 1]])
+                pc += 2
+            elif op == CONST:
+                push(consts[code[pc + 1]])
+                pc += 2
+            elif op == STORE:
+                slots[code[pc + 1]] = pop()
+                pc += 2
+            elif op == JUMP_IF_FALSE:
+                if pop():
+                    pc += 2
+                else:
+                    pc = code[pc + 1]
+            elif op == JUMP:
+                pc = code[pc + 1]
+            elif op == LOAD_ITEM:
+                items = slots[code[pc + 1]]
+                index = pop()
+                if not 0 <= index < len(items):
+                    stdout.write("".join(output))
+                    self.indexError(code[pc + 1], index, pc)
+                push(items[index])
+                pc += 2
+            elif op == STORE_ITEM:
+                items = slots[code[pc + 1]]
+                value = pop()
+                index = pop()
+                if not 0 <= index < len(items):
+                    stdout.write("".join(output))
+                    self.indexError(code[pc + 1], index, pc)
+                items[index] = value
+                pc += 2
+            elif op <= NEG_I:
+                right = pop()
+                if op == ADD_I:
+                    value = pop() + right
+                elif op == SUB_I:
+                    value = pop() - right
+                elif op == MUL_I:
+                    value = pop() * right
+                elif op == DIV_I:
+                    left = pop()
+                    if right == 0 or (left == INT_MIN and right == -1):
+                        stdout.write("".join(output))
+                        self.abort("integer division by zero or overflow", pc)
+                    value = abs(left) // abs(right)
+                    if (left < 0) != (right < 0):
+                        value = -value
+                else:
+                    value = -right
+                if value < INT_MIN or value > INT_MAX:
+                    value = (value - INT_MIN) % 2**32 + INT_MIN
+                push(value)
+                pc += 1
+            elif op <= NEG_L:
+                right = pop()
+                if op == ADD_L:
+                    value = pop() + right
+                elif op == SUB_L:
+                    value = pop() - right
+                elif op == MUL_L:
+                    value = pop() * right
+                elif op == DIV_L:
+                    left = pop()
+                    if right == 0 or (left == LLONG_MIN and right == -1):
+                        stdout.write("".join(output))
+                        self.abort("integer division by zero or overflow", pc)
+                    value = abs(left) // abs(right)
+                    if (left < 0) != (right < 0):
+                        value = -value
+                else:
+                    value = -right
+                if value < LLONG_MIN or value > LLONG_MAX:
+                    value = (value - LLONG_MIN) % 2**64 + LLONG_MIN
+                push(value)
+                pc += 1
+            elif op <= DIV_F:
+                # One float operation done in double and rounded is the float result
+                right = pop()
+                if op == ADD_F:
+                    float32[0] = pop() + right
+                elif op == SUB_F:
+                    float32[0] = pop() - right
+                elif op == MUL_F:
+                    float32[0] = pop() * right
+                else:
+                    float32[0] = divide(pop(), right)
+                push(float32[0])
+                pc += 1
+            elif op <= NEG_D:
+                right = pop()
+                if op == ADD_D:
+                    push(pop() + right)
+                elif op == SUB_D:
+                    push(pop() - right)
+                elif op == MUL_D:
+                    push(pop() * right)
+                elif op == DIV_D:
+                    push(divide(pop(), right))
+                else:
+                    push(-right)
+                pc += 1
+            elif op <= GE:
+                right = pop()
+                left = pop()
+                if op == EQ:
+                    push(1 if left == right else 0)
+                elif op == NE:
+                    push(1 if left != right else 0)
+                elif op == LT:
+                    push(1 if left < right else 0)
+                elif op == LE:
+                    push(1 if left <= right else 0)
+                elif op == GT:
+                    push(1 if left > right else 0)
+                else:
+                    push(1 if left >= right else 0)
+                pc += 1
+            elif op <= I2D:
+                value = pop()
+                if op == L2I:
+                    value = (value - INT_MIN) % 2**32 + INT_MIN
+                elif op == D2I:
+                    value = truncate(value, INT_MIN, INT_MAX)
+                elif op == D2L:
+                    value = truncate(value, LLONG_MIN, LLONG_MAX)
+                elif op == I2F:
+                    value = intToFloat32(value)
+                elif op == D2F:
+                    float32[0] = value
+                    value = float32[0]
+                else:
+                    value = float(value)
+                push(value)
+                pc += 1
+            elif op <= PRINT_I:
+                if op == PRINT_STR:
+                    write(consts[code[pc + 1]])
+                    pc += 2
+                elif op == PRINT_F:
+                    write(formatFixed(pop()))
+                    pc += 1
+                else:
+                    write(str(pop()) + ".00\n")
+                    pc += 1
+                if len(output) >= 4096:
+                    stdout.write("".join(output))
+                    output.clear()
+            elif op == INPUT_F or op == INPUT_D:
+                # Show what was printed so far, it usually asks for the input
+                stdout.write("".join(output))
+                stdout.flush()
+                output.clear()
+                self.readInput(slots, code[pc + 1], op == INPUT_F)
+                pc += 2
+            elif op == INPUT_ITEM_F or op == INPUT_ITEM_D:
+                items = slots[code[pc + 1]]
+                index = pop()
+                stdout.write("".join(output))
+                stdout.flush()
+                output.clear()
+                if not 0 <= index < len(items):
+                    self.indexError(code[pc + 1], index, pc)
+                self.readInput(items, index, op == INPUT_ITEM_F)
+                pc += 2
+            else:  # HALT
+                break
+        stdout.write("".join(output))
+        stdout.flush()
+
+
+# Compile a program to bytecode and run it
+def runProgram(program, stdin=None, stdout=None) -> None:
+    VM(compileBytecode(program), stdin, stdout).run()